@@ -0,0 +1,173 @@
+"""
+Benchmark de SheetsManager y del pipeline del dashboard sobre el backend falso
+
+Genera datasets sintéticos (por defecto 1k, 10k y 100k filas; se puede
+llegar a 1M), los carga en sheets_falso y mide cada paso: tiempo, solicitudes
+a la API, celdas transferidas y pico de memoria (tracemalloc).
+
+    python benchmark.py
+    python benchmark.py --filas 1000 1000000 --latencia 0.05 --json resultados.json
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from config import ENCABEZADOS
+from esquema import dataframe_desde_valores
+from estadisticas import calcular_estadisticas, construir_cubo
+from planificador import CubetaTokens, Planificador
+from sheets_falso import ClienteFalso
+from sheets_manager import SheetsManager
+
+ENCABEZADOS_BENCHMARK = list(ENCABEZADOS.values()) + ['Contestaron', 'Respuesta']
+RESPUESTAS = ['Apoya', 'No apoya', 'Indeciso', 'No contesta']
+MAX_FILAS_ESCRITURA = 10000
+
+
+def generar_valores(filas, iglesias=20, semilla=0):
+    """Valores de una hoja de Datos sintética (encabezados incluidos), como strings"""
+    aleatorio = random.Random(semilla)
+    nombres = [f"IGLESIA {i + 1:02d}" for i in range(iglesias)]
+    municipios = ['MEDELLIN', 'BOGOTA', 'CALI', 'BARRANQUILLA']
+    valores = [ENCABEZADOS_BENCHMARK]
+    for i in range(filas):
+        contactado = aleatorio.random() < 0.6
+        valores.append([
+            aleatorio.choice(nombres),
+            aleatorio.choice(municipios),
+            str(1000000 + i),
+            f"Persona {i}",
+            str(3000000000 + i),
+            'SI' if contactado else 'NO',
+            '2024-05-01' if contactado else '',
+            '',
+            aleatorio.choice(['SI', 'NO']),
+            str(aleatorio.choice([0, 0, 0, 1, 2, 3])),
+            str(aleatorio.choice([0, 0, 1])),
+            'SI' if contactado and aleatorio.random() < 0.7 else 'NO',
+            aleatorio.choice(RESPUESTAS) if contactado else ''
+        ])
+    return valores
+
+
+def _planificador_sin_limite():
+    # El benchmark mide el código, no la cuota: cubetas enormes y reintentos rápidos
+    return Planificador(
+        lecturas=CubetaTokens(tasa=1e9, capacidad=1e9),
+        escrituras=CubetaTokens(tasa=1e9, capacidad=1e9),
+        espera_base=0.01,
+        espera_maxima=0.1
+    )
+
+
+def medir(paso, filas, funcion, cliente, memoria=True):
+    """Ejecuta funcion() y devuelve sus métricas"""
+    cliente.reiniciar_contadores()
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        funcion()
+    finally:
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1] if memoria else None
+        if memoria:
+            tracemalloc.stop()
+
+    return {
+        'paso': paso,
+        'filas': filas,
+        'segundos': round(segundos, 4),
+        'solicitudes': cliente.solicitudes,
+        'por_metodo': dict(cliente.contador),
+        'celdas': cliente.celdas_transferidas,
+        'memoria_pico_mb': round(pico / 2 ** 20, 1) if pico is not None else None
+    }
+
+
+def ejecutar_benchmark(filas, latencia=0.0, latencia_por_celda=0.0, probabilidad_error_cuota=0.0,
+                       memoria=True, semilla=0):
+    """Mide todos los pasos para un dataset de `filas` filas. Devuelve una lista de métricas"""
+    valores = generar_valores(filas, semilla=semilla)
+    cliente = ClienteFalso(latencia, latencia_por_celda, probabilidad_error_cuota, semilla=semilla)
+    cliente.crear_spreadsheet("benchmark").hoja("Datos").cargar_valores(valores)
+
+    manager = SheetsManager(cliente=cliente, planificador=_planificador_sin_limite())
+    manager.conectar_sheet("benchmark")
+
+    resultados = []
+    estado = {}
+
+    def leer():
+        estado['df'] = manager.leer_datos()
+
+    def filtrar_iglesias():
+        df = estado['df']
+        for iglesia in df['Iglesia'].cat.categories:
+            calcular_estadisticas(df[df['Iglesia'] == iglesia])
+
+    escritura = min(filas, MAX_FILAS_ESCRITURA)
+    nuevas = [
+        {'iglesia': 'IGLESIA NUEVA', 'cedula': str(9000000 + i), 'nombre': f"Nueva {i}"}
+        for i in range(escritura)
+    ]
+    cambios = [
+        {'cedula': str(1000000 + i), 'contactado': 'SI', 'referidos_activos': 1}
+        for i in range(escritura)
+    ]
+
+    pasos = [
+        ('leer_datos', leer),
+        ('normalizar', lambda: dataframe_desde_valores(valores)),
+        ('estadisticas', lambda: manager.obtener_estadisticas_de_dataframe(estado['df'])),
+        ('estadisticas_por_bloques', lambda: manager.obtener_estadisticas_por_bloques()),
+        ('cubo', lambda: construir_cubo(estado['df'])),
+        ('filtrar_iglesias', filtrar_iglesias),
+        ('agregar_personas', lambda: manager.agregar_personas(nuevas)),
+        ('actualizar_personas', lambda: manager.actualizar_personas(cambios))
+    ]
+    for paso, funcion in pasos:
+        filas_paso = escritura if paso in ('agregar_personas', 'actualizar_personas') else filas
+        resultados.append(medir(paso, filas_paso, funcion, cliente, memoria))
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'paso':<26}{'filas':>10}{'segundos':>11}{'solicitudes':>13}{'celdas':>12}{'memoria MB':>12}")
+    for r in resultados:
+        memoria = '' if r['memoria_pico_mb'] is None else r['memoria_pico_mb']
+        print(f"{r['paso']:<26}{r['filas']:>10}{r['segundos']:>11.3f}{r['solicitudes']:>13}{r['celdas']:>12}{memoria:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de Cero Referidos sobre el backend falso")
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--latencia', type=float, default=0.0, help="segundos por solicitud")
+    parser.add_argument('--latencia-por-celda', type=float, default=0.0, help="segundos por celda transferida")
+    parser.add_argument('--error-cuota', type=float, default=0.0, help="probabilidad de 429 por solicitud")
+    parser.add_argument('--sin-memoria', action='store_true', help="no medir memoria (tracemalloc es lento)")
+    parser.add_argument('--json', help="guardar los resultados en este archivo")
+    args = parser.parse_args()
+
+    todos = []
+    for filas in args.filas:
+        resultados = ejecutar_benchmark(
+            filas,
+            latencia=args.latencia,
+            latencia_por_celda=args.latencia_por_celda,
+            probabilidad_error_cuota=args.error_cuota,
+            memoria=not args.sin_memoria
+        )
+        imprimir(resultados)
+        print()
+        todos.extend(resultados)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(todos, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Cache de datos compartida entre procesos a través del disco (Arrow/Feather)
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from config import CACHE_COMPARTIDA_DIR, CACHE_COMPARTIDA_TTL, CACHE_BLOQUEO_VENCIDO, CACHE_ESPERA_BLOQUEO
+from instrumentacion import contar
+
+
+def _tipo_pandas(tipo):
+    """dtype de pandas para un tipo Arrow: los diccionarios pasan a category, el resto sigue en Arrow"""
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(tipo):
+        return None
+    return pd.ArrowDtype(tipo)
+
+
+class CacheCompartida:
+    """DataFrame cacheado en disco y compartido por varios procesos (réplicas de Streamlit).
+
+    Archivos en el directorio de la cache:
+    - {nombre}-{id}.feather: los datos en Arrow IPC sin comprimir, que se
+      abren con memory map. Las columnas del DataFrame quedan respaldadas
+      por ese mapa (pd.ArrowDtype) en lugar de copiarse al heap de cada
+      proceso; solo las categorías se convierten (un byte por fila).
+    - {nombre}.json: el sello de versión {'id', 'creado'} que indica qué
+      archivo de datos es el vigente y cuándo se generó.
+    - {nombre}.lock: creado con O_EXCL por el proceso que está refrescando.
+
+    Solo un proceso a la vez descarga los datos; mientras tanto los demás
+    siguen usando la versión anterior o, si no hay ninguna, esperan a que
+    termine. Cada refresco escribe un archivo de datos nuevo en lugar de
+    reemplazar el vigente, porque en Windows no se puede reemplazar un
+    archivo que otro proceso tiene mapeado.
+    """
+
+    def __init__(self, nombre, directorio=CACHE_COMPARTIDA_DIR, ttl=CACHE_COMPARTIDA_TTL,
+                 bloqueo_vencido=CACHE_BLOQUEO_VENCIDO, espera_bloqueo=CACHE_ESPERA_BLOQUEO):
+        self.nombre = nombre
+        self.directorio = Path(directorio)
+        self.ttl = ttl
+        self.bloqueo_vencido = bloqueo_vencido
+        self.espera_bloqueo = espera_bloqueo
+        self.ruta_sello = self.directorio / f"{nombre}.json"
+        self.ruta_bloqueo = self.directorio / f"{nombre}.lock"
+        # Último DataFrame mapeado por este proceso y el id de su sello
+        self._id_cargado = None
+        self._df = None
+        self._lock = threading.Lock()
+
+    def _ruta_datos(self, id_datos):
+        return self.directorio / f"{self.nombre}-{id_datos}.feather"
+
+    # ------------------------------------------------------------
+    # Sello de versión
+    # ------------------------------------------------------------
+
+    def leer_sello(self):
+        """Devuelve el sello vigente o None si no hay datos en la cache"""
+        try:
+            with open(self.ruta_sello, encoding='utf-8') as f:
+                sello = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self._ruta_datos(sello.get('id')).exists():
+            return None
+        return sello
+
+    def _vigente(self, sello):
+        return sello is not None and time.time() - sello['creado'] < self.ttl
+
+    def invalidar(self):
+        """Marca la cache como vencida; el próximo acceso la refresca"""
+        try:
+            os.remove(self.ruta_sello)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------
+    # Bloqueo
+    # ------------------------------------------------------------
+
+    def _tomar_bloqueo(self):
+        """Intenta crear el lock file. Un lock más viejo que bloqueo_vencido se considera abandonado"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.ruta_bloqueo, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    edad = time.time() - os.path.getmtime(self.ruta_bloqueo)
+                except FileNotFoundError:
+                    continue
+                if edad < self.bloqueo_vencido:
+                    return False
+                # El proceso que lo creó murió a mitad del refresco
+                try:
+                    os.remove(self.ruta_bloqueo)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(f"{os.getpid()} {time.time()}")
+            return True
+        return False
+
+    def _soltar_bloqueo(self):
+        try:
+            os.remove(self.ruta_bloqueo)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------
+    # Lectura y escritura
+    # ------------------------------------------------------------
+
+    def _mapear(self, sello):
+        """DataFrame del sello dado, reutilizando el ya mapeado si es el mismo"""
+        with self._lock:
+            if sello['id'] != self._id_cargado:
+                import pyarrow.feather as feather
+                tabla = feather.read_table(self._ruta_datos(sello['id']), memory_map=True)
+                self._df = tabla.to_pandas(types_mapper=_tipo_pandas)
+                self._id_cargado = sello['id']
+            return self._df
+
+    def guardar(self, df):
+        """Escribe un archivo de datos nuevo y lo publica en el sello"""
+        import pyarrow.feather as feather
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        id_datos = uuid.uuid4().hex
+        ruta = self._ruta_datos(id_datos)
+        temporal = ruta.with_name(ruta.name + '.tmp')
+        feather.write_feather(df, temporal, compression='uncompressed')
+        os.replace(temporal, ruta)
+
+        temporal = self.ruta_sello.with_name(self.ruta_sello.name + '.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'id': id_datos, 'creado': time.time()}, f)
+        os.replace(temporal, self.ruta_sello)
+
+        self._borrar_anteriores(id_datos)
+        return id_datos
+
+    def _borrar_anteriores(self, id_vigente):
+        vigente = self._ruta_datos(id_vigente).name
+        for ruta in self.directorio.glob(f"{self.nombre}-*.feather"):
+            if ruta.name == vigente:
+                continue
+            try:
+                os.remove(ruta)
+            except OSError:
+                # Otro proceso todavía lo tiene mapeado (Windows); se borra en otro refresco
+                pass
+
+    def obtener(self, cargar):
+        """Devuelve los datos de la cache, llamando a cargar() si hace falta refrescarlos.
+
+        Si otro proceso está refrescando se usan los datos anteriores; si no
+        hay ninguno se espera hasta espera_bloqueo segundos y, pasado ese
+        tiempo, se cargan sin usar la cache.
+        """
+        sello = self.leer_sello()
+        if self._vigente(sello):
+            contar('cache.compartida.aciertos')
+            return self._mapear(sello)
+
+        contar('cache.compartida.fallos')
+        limite = time.time() + self.espera_bloqueo
+        while True:
+            if self._tomar_bloqueo():
+                try:
+                    # Otro proceso pudo terminar de refrescar justo antes
+                    sello = self.leer_sello()
+                    if self._vigente(sello):
+                        return self._mapear(sello)
+                    # También el proceso que refresca usa el archivo mapeado y suelta su copia
+                    return self._mapear({'id': self.guardar(cargar())})
+                finally:
+                    self._soltar_bloqueo()
+
+            if sello is not None:
+                return self._mapear(sello)
+            if time.time() >= limite:
+                return cargar()
+            time.sleep(0.2)
+            sello = self.leer_sello()
+            if self._vigente(sello):
+                return self._mapear(sello)
@@ -0,0 +1,217 @@
+"""
+Línea de comandos de Cero Referidos (sin Streamlit)
+
+    python -m cli estadisticas [--por-bloques] [--json]
+    python -m cli exportar datos.xlsx
+    python -m cli sincronizar [--completa]
+    python -m cli resumen
+    python -m cli importar listado.xlsx
+    python -m cli reporte-iglesias reporte.zip
+    python -m cli registrar-historial
+    python -m cli tendencia [--iglesia NOMBRE] [--dias 30]
+    python -m cli ordenar-por-iglesia
+
+Los módulos pesados (gspread, pandas) se importan dentro de cada comando,
+así `python -m cli --help` responde al instante.
+"""
+import argparse
+import json
+import sys
+
+
+def _manager(args):
+    from sheets_manager import SheetsManager
+
+    manager = SheetsManager()
+    manager.conectar_sheet(args.spreadsheet)
+    return manager
+
+
+def comando_estadisticas(args):
+    manager = _manager(args)
+    if args.por_bloques:
+        estadisticas = manager.obtener_estadisticas_por_bloques(args.hoja)
+    else:
+        estadisticas = manager.obtener_estadisticas_de_dataframe(manager.leer_datos(args.hoja))
+
+    if estadisticas is None:
+        print("La hoja no tiene datos")
+        return 1
+
+    if args.json:
+        print(json.dumps({
+            'general': estadisticas['general'],
+            'por_iglesia': estadisticas['por_iglesia'].to_dict('records')
+        }, ensure_ascii=False, indent=2, default=int))
+        return 0
+
+    for clave, valor in estadisticas['general'].items():
+        print(f"{clave:<22}{valor:>10}")
+    print()
+    print(estadisticas['por_iglesia'].to_string(index=False))
+    return 0
+
+
+def comando_exportar(args):
+    manager = _manager(args)
+    df = manager.leer_datos(args.hoja)
+
+    salida = args.salida.lower()
+    if salida.endswith('.xlsx'):
+        df.to_excel(args.salida, index=False)
+    elif salida.endswith('.parquet'):
+        df.to_parquet(args.salida, index=False)
+    else:
+        df.to_csv(args.salida, index=False)
+    print(f"{len(df)} filas exportadas a {args.salida}")
+    return 0
+
+
+def comando_sincronizar(args):
+    from instrumentacion import registro
+
+    manager = _manager(args)
+    antes = registro.resumen()['contadores']
+    df = manager.leer_datos_sincronizados(args.hoja, forzar_completa=args.completa)
+    despues = registro.resumen()['contadores']
+
+    def diferencia(clave):
+        return despues.get(clave, 0) - antes.get(clave, 0)
+
+    tipo = next((c.split('.', 1)[1] for c in despues if c.startswith('snapshot.') and diferencia(c)), '')
+    print(f"Snapshot al día ({tipo}): {len(df)} filas, {diferencia('api.solicitudes')} solicitudes")
+    return 0
+
+
+def comando_resumen(args):
+    from config import HISTORIAL_AUTOMATICO
+    from historial import Historial
+    from resumen import materializar_resumen
+
+    filas = materializar_resumen(_manager(args), historial=Historial() if HISTORIAL_AUTOMATICO else None)
+    print(f"Resumen actualizado ({filas} filas)")
+    return 0
+
+
+def comando_importar(args):
+    from importador import importar
+
+    def al_avanzar(resumen):
+        print(f"  {resumen['leidas']} leídas: {resumen['agregadas']} agregadas, "
+              f"{resumen['actualizadas']} actualizadas, {resumen['errores']} errores", flush=True)
+
+    resumen = importar(_manager(args), args.archivo, hoja=args.hoja, hoja_archivo=args.hoja_archivo, al_avanzar=al_avanzar)
+    print(f"Importación terminada: {resumen['agregadas']} agregadas, {resumen['actualizadas']} actualizadas, "
+          f"{resumen['sin_cambios']} sin cambios, {resumen['omitidas']} sin cédula, {resumen['errores']} errores")
+    for error in resumen['detalle_errores']:
+        print(f"  fila {error['fila']} ({error['cedula']}): {error['error']}")
+    return 1 if resumen['errores'] else 0
+
+
+def comando_reporte_iglesias(args):
+    from estadisticas import calcular_estadisticas
+    from exportador import exportar_zip
+
+    df = _manager(args).leer_datos(args.hoja)
+    if df.empty:
+        print("La hoja no tiene datos")
+        return 1
+    cantidad = exportar_zip(df, calcular_estadisticas(df), args.salida, iglesias=args.iglesia, max_procesos=args.procesos)
+    print(f"{cantidad} libros exportados a {args.salida}")
+    return 0
+
+
+def comando_registrar_historial(args):
+    from historial import Historial
+
+    df = _manager(args).leer_datos(args.hoja)
+    if df.empty:
+        print("La hoja no tiene datos")
+        return 1
+    resultado = Historial().registrar(df)
+    if resultado is None:
+        print("Otro proceso está registrando el historial")
+        return 1
+    print(f"Historial del {resultado['fecha']}: {resultado['iglesias']} iglesias, {resultado['cambios']} cambios")
+    return 0
+
+
+def comando_tendencia(args):
+    import pandas as pd
+    from historial import Historial
+
+    desde = pd.Timestamp.today().normalize() - pd.Timedelta(days=args.dias)
+    tendencia = Historial().tendencia(args.iglesia, desde=desde)
+    if tendencia.empty:
+        print("No hay historial en ese rango")
+        return 1
+    if args.json:
+        tendencia.index = tendencia.index.strftime('%Y-%m-%d')
+        print(json.dumps(tendencia.to_dict('index'), ensure_ascii=False, indent=2, default=int))
+        return 0
+    print(tendencia.to_string())
+    return 0
+
+
+def comando_ordenar_por_iglesia(args):
+    manager = _manager(args)
+    manager.ordenar_por_iglesia(args.hoja)
+    iglesias = manager.directorio_iglesias(args.hoja).iglesias()
+    print(f"Hoja ordenada: {len(iglesias)} iglesias, una por tramo de filas")
+    return 0
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Cero Referidos sin dashboard")
+    parser.add_argument('--spreadsheet', help="ID del spreadsheet (por defecto config.SPREADSHEET_ID)")
+    parser.add_argument('--hoja', default="Datos")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    estadisticas = comandos.add_parser('estadisticas', help="estadísticas generales y por iglesia")
+    estadisticas.add_argument('--por-bloques', action='store_true', help="leer por bloques, con memoria acotada")
+    estadisticas.add_argument('--json', action='store_true', help="salida en JSON")
+    estadisticas.set_defaults(funcion=comando_estadisticas)
+
+    exportar = comandos.add_parser('exportar', help="exportar la hoja a .csv, .xlsx o .parquet")
+    exportar.add_argument('salida')
+    exportar.set_defaults(funcion=comando_exportar)
+
+    sincronizar = comandos.add_parser('sincronizar', help="poner al día el snapshot local")
+    sincronizar.add_argument('--completa', action='store_true', help="forzar una descarga completa")
+    sincronizar.set_defaults(funcion=comando_sincronizar)
+
+    resumen = comandos.add_parser('resumen', help="materializar estadísticas en la hoja Resumen")
+    resumen.set_defaults(funcion=comando_resumen)
+
+    importar = comandos.add_parser('importar', help="importar un listado .xlsx o .csv a la hoja")
+    importar.add_argument('archivo')
+    importar.add_argument('--hoja-archivo', help="hoja del Excel (por defecto la activa)")
+    importar.set_defaults(funcion=comando_importar)
+
+    reporte = comandos.add_parser('reporte-iglesias', help="un Excel por iglesia (datos + resumen) en un .zip")
+    reporte.add_argument('salida')
+    reporte.add_argument('--iglesia', action='append', help="solo esta iglesia (se puede repetir)")
+    reporte.add_argument('--procesos', type=int, help="procesos en paralelo (por defecto uno por núcleo)")
+    reporte.set_defaults(funcion=comando_reporte_iglesias)
+
+    registrar = comandos.add_parser('registrar-historial', help="guardar el avance del día en el historial")
+    registrar.set_defaults(funcion=comando_registrar_historial)
+
+    tendencia = comandos.add_parser('tendencia', help="avance diario según el historial (sin consultar Sheets)")
+    tendencia.add_argument('--iglesia', help="solo esta iglesia (por defecto todas sumadas)")
+    tendencia.add_argument('--dias', type=int, default=30)
+    tendencia.add_argument('--json', action='store_true', help="salida en JSON")
+    tendencia.set_defaults(funcion=comando_tendencia)
+
+    ordenar = comandos.add_parser('ordenar-por-iglesia', help="ordenar la hoja por iglesia para leer cada iglesia de un tramo")
+    ordenar.set_defaults(funcion=comando_ordenar_por_iglesia)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
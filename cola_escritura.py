@@ -0,0 +1,320 @@
+"""
+Escritura diferida (write-behind) de contactos con diario en disco
+"""
+import itertools
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+from config import (
+    DIARIO_ESCRITURAS_DIR, DIARIO_ESCRITURAS_VENCIDO, ESCRITURA_DIFERIDA_INTERVALO, ESCRITURA_DIFERIDA_MAX_ITEMS
+)
+from indice_cedulas import normalizar_cedula
+
+logger = logging.getLogger(__name__)
+
+ERROR_CEDULA_NO_ENCONTRADA = "Cédula no encontrada"
+
+
+def _serializable(valor):
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return str(valor)
+
+
+class _Operacion:
+    """Escritura pendiente: un agregar o un actualizar (ya fusionado) de una cédula"""
+
+    def __init__(self, id, tipo, cedula, datos):
+        self.id = id
+        self.tipo = tipo
+        self.cedula = cedula
+        self.datos = dict(datos)
+        self.futuros = []
+
+    def como_dict(self):
+        return {'id': self.id, 'tipo': self.tipo, 'cedula': self.cedula, 'datos': self.datos}
+
+
+class ColaEscritura:
+    """Cola de escrituras con vaciado por lotes en un hilo de fondo.
+
+    Cada escritura se anota primero en un diario JSONL (con fsync) y se
+    devuelve un Future que se resuelve con el resultado por fila de
+    agregar_personas / actualizar_personas. Un hilo vacía la cola cada
+    `intervalo` segundos o al juntar `max_items` operaciones. Varias
+    actualizaciones de la misma cédula se fusionan en una; una actualización
+    de una persona que aún no se agregó se fusiona en el agregar.
+
+    Si el vaciado falla (p. ej. cuota agotada) las operaciones vuelven a la
+    cola y se reintentan en el siguiente ciclo.
+
+    Cada cola tiene su propio diario (varias réplicas, la CLI y el importador
+    pueden escribir la misma hoja a la vez) y lo toca en cada ciclo. Un
+    diario de la misma hoja que no se tocó en DIARIO_ESCRITURAS_VENCIDO
+    segundos es de un proceso que terminó: la cola lo adopta al crearse y en
+    cada ciclo, así un cierre inesperado no pierde escrituras (la entrega es
+    "al menos una vez").
+    """
+
+    def __init__(self, manager, hoja="Datos", directorio_diario=DIARIO_ESCRITURAS_DIR,
+                 intervalo=ESCRITURA_DIFERIDA_INTERVALO, max_items=ESCRITURA_DIFERIDA_MAX_ITEMS,
+                 diario_vencido=DIARIO_ESCRITURAS_VENCIDO):
+        self.manager = manager
+        self.hoja = hoja
+        self.intervalo = intervalo
+        self.max_items = max_items
+        self.diario_vencido = diario_vencido
+        self.directorio_diario = Path(directorio_diario)
+        self._base_diario = f"escrituras_{manager.spreadsheet.id}_{hoja}"
+        propio = f"{socket.gethostname()}@{os.getpid()}@{uuid.uuid4().hex[:8]}"
+        self.ruta_diario = self.directorio_diario / f"{self._base_diario}@{propio}.jsonl"
+
+        self._lock = threading.RLock()
+        self._pendientes = {}
+        self._por_cedula = {}
+        self._ids = itertools.count(1)
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._vaciando = threading.Lock()
+
+        self._recuperar_diario()
+        self._hilo = threading.Thread(target=self._ciclo, name="cola-escritura", daemon=True)
+        self._hilo.start()
+
+    # ------------------------------------------------------------
+    # Diario en disco
+    # ------------------------------------------------------------
+
+    def _recuperar_diario(self):
+        self.directorio_diario.mkdir(parents=True, exist_ok=True)
+        self._compactar_diario()
+        self._adoptar_diarios()
+
+    def _diarios_vencidos(self):
+        """Diarios de esta hoja de procesos que ya no los actualizan"""
+        limite = time.time() - self.diario_vencido
+        for ruta in self.directorio_diario.iterdir():
+            nombre = ruta.name
+            # El diario compartido de versiones anteriores también se adopta
+            de_la_hoja = nombre == f"{self._base_diario}.jsonl" or (
+                nombre.startswith(f"{self._base_diario}@") and nombre.endswith('.jsonl')
+            )
+            if not de_la_hoja or ruta == self.ruta_diario:
+                continue
+            try:
+                if ruta.stat().st_mtime < limite:
+                    yield ruta
+            except FileNotFoundError:
+                pass
+
+    def _adoptar_diarios(self):
+        """Pasa a esta cola las escrituras de los diarios vencidos"""
+        for ruta in self._diarios_vencidos():
+            # Renombrar es atómico: si dos procesos lo intentan, solo uno lo adopta
+            adoptado = self.ruta_diario.with_name(f"{self.ruta_diario.name}.{uuid.uuid4().hex[:8]}.adoptado")
+            try:
+                os.rename(ruta, adoptado)
+            except FileNotFoundError:
+                continue
+
+            with open(adoptado, encoding='utf-8') as f:
+                lineas = f.readlines()
+            cantidad = 0
+            for linea in lineas:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Línea truncada por un cierre a mitad de escritura
+                    continue
+                self._encolar(entrada['tipo'], entrada['cedula'], entrada['datos'], anotar=False)
+                cantidad += 1
+
+            # Primero quedan en el diario propio y después se borra el adoptado
+            self._compactar_diario()
+            os.remove(adoptado)
+            logger.warning("Se recuperaron %d escrituras del diario %s", cantidad, ruta.name)
+
+    def _anotar(self, operacion):
+        with open(self.ruta_diario, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(operacion, ensure_ascii=False, default=_serializable) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compactar_diario(self):
+        """Reescribe el diario propio con solo las operaciones pendientes"""
+        with self._lock:
+            lineas = [
+                json.dumps(op.como_dict(), ensure_ascii=False, default=_serializable) + '\n'
+                for op in self._pendientes.values()
+            ]
+            descriptor, temporal = tempfile.mkstemp(
+                dir=self.directorio_diario, prefix=self.ruta_diario.name + '.', suffix='.tmp'
+            )
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    f.writelines(lineas)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporal, self.ruta_diario)
+            except BaseException:
+                try:
+                    os.remove(temporal)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    def _marcar_activo(self):
+        # El diario propio se toca en cada ciclo para que nadie lo adopte
+        try:
+            os.utime(self.ruta_diario)
+        except FileNotFoundError:
+            self._compactar_diario()
+
+    # ------------------------------------------------------------
+    # Encolar
+    # ------------------------------------------------------------
+
+    def _encolar(self, tipo, cedula, datos, anotar=True, futuros=()):
+        cedula = normalizar_cedula(cedula)
+        with self._lock:
+            if anotar:
+                self._anotar({'tipo': tipo, 'cedula': cedula, 'datos': datos})
+
+            existente = self._pendientes.get(self._por_cedula.get(cedula)) if cedula else None
+            if tipo == 'actualizar' and existente is not None:
+                existente.datos.update(datos)
+                operacion = existente
+            else:
+                operacion = _Operacion(next(self._ids), tipo, cedula, datos)
+                self._pendientes[operacion.id] = operacion
+                if cedula:
+                    self._por_cedula[cedula] = operacion.id
+
+            operacion.futuros.extend(futuros)
+            if len(self._pendientes) >= self.max_items:
+                self._despertar.set()
+            return operacion
+
+    def agregar(self, datos):
+        """Encola una persona nueva. Devuelve un Future con su resultado"""
+        futuro = Future()
+        self._encolar('agregar', datos.get('cedula', ''), datos, futuros=[futuro])
+        return futuro
+
+    def actualizar(self, cedula, datos):
+        """Encola cambios de una persona existente. Devuelve un Future con su resultado"""
+        futuro = Future()
+        self._encolar('actualizar', cedula, datos, futuros=[futuro])
+        return futuro
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pendientes)
+
+    # ------------------------------------------------------------
+    # Vaciado
+    # ------------------------------------------------------------
+
+    def _tomar_pendientes(self):
+        with self._lock:
+            operaciones = list(self._pendientes.values())
+            self._pendientes = {}
+            self._por_cedula = {}
+            return operaciones
+
+    def _reencolar(self, operaciones):
+        """Devuelve operaciones fallidas a la cola, antes de las que llegaron después"""
+        with self._lock:
+            posteriores = list(self._pendientes.values())
+            self._pendientes = {}
+            self._por_cedula = {}
+            for op in operaciones + posteriores:
+                self._encolar(op.tipo, op.cedula, op.datos, anotar=False, futuros=op.futuros)
+
+    def vaciar(self):
+        """Envía ahora todas las operaciones pendientes. Devuelve cuántas se resolvieron"""
+        with self._vaciando:
+            operaciones = self._tomar_pendientes()
+            if not operaciones:
+                return 0
+
+            agregar = [op for op in operaciones if op.tipo == 'agregar']
+            actualizar = [op for op in operaciones if op.tipo == 'actualizar']
+            resueltas = set()
+            fallidas = []
+
+            try:
+                if agregar:
+                    resultados = self.manager.agregar_personas(
+                        [op.datos for op in agregar], hoja=self.hoja
+                    )
+                    for op, resultado in zip(agregar, resultados):
+                        if resultado['exito']:
+                            self._resolver(op, resultado)
+                            resueltas.add(op.id)
+                        else:
+                            fallidas.append(op)
+
+                if actualizar:
+                    resultados = self.manager.actualizar_personas(
+                        [dict(op.datos, cedula=op.cedula) for op in actualizar], hoja=self.hoja
+                    )
+                    for op, resultado in zip(actualizar, resultados):
+                        # Una cédula inexistente no se arregla reintentando
+                        if resultado['exito'] or resultado['error'] == ERROR_CEDULA_NO_ENCONTRADA:
+                            self._resolver(op, resultado)
+                            resueltas.add(op.id)
+                        else:
+                            fallidas.append(op)
+            except Exception:
+                logger.exception("Error al vaciar la cola de escritura")
+                fallidas = [op for op in operaciones if op.id not in resueltas]
+
+            if fallidas:
+                logger.warning("%d escrituras quedan pendientes para el siguiente intento", len(fallidas))
+                self._reencolar(fallidas)
+
+            self._compactar_diario()
+            return len(resueltas)
+
+    def _resolver(self, operacion, resultado):
+        for futuro in operacion.futuros:
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                self._marcar_activo()
+                self._adoptar_diarios()
+                self.vaciar()
+            except Exception:
+                logger.exception("Error en el hilo de la cola de escritura")
+
+    def detener(self, vaciar=True):
+        """Detiene el hilo de fondo; por defecto vacía antes lo pendiente.
+
+        Si no queda nada pendiente se borra el diario propio; si quedó algo,
+        el diario se conserva y otro proceso lo adoptará cuando venza.
+        """
+        self._detener.set()
+        self._despertar.set()
+        self._hilo.join()
+        if vaciar:
+            self.vaciar()
+        with self._lock:
+            if not self._pendientes:
+                try:
+                    os.remove(self.ruta_diario)
+                except FileNotFoundError:
+                    pass
@@ -7,6 +7,9 @@ from pathlib import Path
 # Rutas
 BASE_DIR = Path(__file__).resolve().parent
 SERVICE_ACCOUNT_FILE = BASE_DIR / "service_account.json"
+# Alternativa al archivo (servidores, cron): variable de entorno con el JSON de
+# la cuenta de servicio o con la ruta a ese archivo
+VARIABLE_CREDENCIALES = "CERO_REFERIDOS_CREDENCIALES"
 
 # Configuración de Google Sheets
 SCOPES = [
@@ -18,6 +21,12 @@ SCOPES = [
 # Para obtener el ID: ejecuta crear_plantilla.py y copia el ID que te muestra
 SPREADSHEET_ID = "1H9WAG5t6rDYPym1VraZR0Cci6tVTScA1V9DPAOrUCo8"
 
+# Spreadsheets que agrega el dashboard (p. ej. uno por región o municipio). Con
+# más de uno, los datos se leen en paralelo y cada fila lleva en la columna
+# COLUMNA_FUENTE el título del spreadsheet del que viene.
+SPREADSHEET_IDS = [SPREADSHEET_ID]
+COLUMNA_FUENTE = 'Fuente'
+
 # Nombre de las hojas
 SHEET_NAMES = {
     'DATOS': 'Datos',
@@ -38,3 +47,96 @@ COLUMNAS = {
     'REFERIDOS_ACTIVOS': 9,
     'REFERIDOS_INACTIVOS': 10
 }
+
+# Encabezados de la hoja de datos (mismo orden que COLUMNAS)
+ENCABEZADOS = {
+    'IGLESIA': 'Iglesia',
+    'MUNICIPIO': 'Municipio',
+    'CEDULA': 'Cédula',
+    'NOMBRE': 'Nombre',
+    'CELULAR': 'Celular',
+    'CONTACTADO': 'Contactado',
+    'FECHA_CONTACTO': 'Fecha Contacto',
+    'OBSERVACIONES': 'Observaciones',
+    'ESTA_EN_INFOMIRA': '¿Está en InfoMIRA?',
+    'REFERIDOS_ACTIVOS': 'Referidos Activos',
+    'REFERIDOS_INACTIVOS': 'Referidos Inactivos'
+}
+
+# Segundos que el índice de cédulas se considera vigente antes de releer la columna
+INDICE_CEDULAS_TTL = 300
+
+# Snapshot local de los datos (sincronización incremental)
+USAR_SNAPSHOT_LOCAL = True
+SNAPSHOT_DIR = BASE_DIR / ".cache" / "snapshots"
+# Cada cuántos segundos se fuerza una descarga completa (capta ediciones en
+# Iglesia, Municipio, Cédula, Nombre o Celular, que la incremental no relee)
+SNAPSHOT_RESINCRONIZACION_COMPLETA = 6 * 60 * 60
+
+# Cuotas de la API de Google Sheets por usuario (cuenta de servicio) y por minuto
+CUOTA_LECTURAS_POR_MINUTO = 60
+CUOTA_ESCRITURAS_POR_MINUTO = 60
+# Solicitudes que se permiten de una vez antes de espaciar al ritmo sostenido
+RAFAGA_SOLICITUDES = 10
+# Reintentos ante errores 429/5xx, con espera exponencial (segundos) y jitter
+REINTENTOS_API = 5
+ESPERA_BASE_REINTENTO = 1.0
+ESPERA_MAXIMA_REINTENTO = 64.0
+
+# Escritura diferida: cada cuántos segundos o con cuántas operaciones se vacía
+# la cola, y dónde se guarda su diario. Cada proceso tiene su propio diario;
+# uno que no se actualiza hace DIARIO_ESCRITURAS_VENCIDO segundos es de un
+# proceso que terminó y otro proceso recupera sus escrituras.
+ESCRITURA_DIFERIDA_INTERVALO = 5
+ESCRITURA_DIFERIDA_MAX_ITEMS = 50
+DIARIO_ESCRITURAS_DIR = BASE_DIR / ".cache" / "escrituras"
+DIARIO_ESCRITURAS_VENCIDO = 120
+
+# Resumen materializado: el dashboard lo usa en lugar de leer Datos mientras
+# el spreadsheet siga en la versión que dejó su escritura (ver resumen.py)
+USAR_RESUMEN = True
+
+# Lectura por bloques: filas por solicitud e hilos concurrentes (las hojas con
+# más de TAMANO_BLOQUE_LECTURA filas se leen en paralelo)
+TAMANO_BLOQUE_LECTURA = 5000
+MAX_HILOS_LECTURA = 4
+
+# Spreadsheets que se leen a la vez cuando hay varias fuentes
+MAX_HILOS_FUENTES = 4
+
+# Cache compartida en disco para varias réplicas del dashboard (alternativa a
+# la cache por proceso de Streamlit): vigencia de los datos, segundos tras los
+# que un lock se considera abandonado y espera máxima por el primer refresco
+USAR_CACHE_COMPARTIDA = False
+CACHE_COMPARTIDA_DIR = BASE_DIR / ".cache" / "compartida"
+CACHE_COMPARTIDA_TTL = 300
+CACHE_BLOQUEO_VENCIDO = 120
+CACHE_ESPERA_BLOQUEO = 60
+
+# Instrumentación (instrumentacion.py): medir tiempos y contadores, mostrar el
+# panel de diagnóstico en el sidebar y escribir las mediciones en el log tras
+# cada ejecución del dashboard
+INSTRUMENTACION_ACTIVA = True
+MOSTRAR_DIAGNOSTICO = False
+INSTRUMENTACION_LOG = False
+
+# Exportación de libros por iglesia: procesos en paralelo (None = uno por núcleo)
+MAX_PROCESOS_EXPORTACION = None
+
+# Historial diario del avance (historial.py). Fuera de .cache para que no se
+# pierda al limpiar las caches. Con HISTORIAL_AUTOMATICO el job del Resumen
+# (`python -m cli resumen` o `python resumen.py`, desde un cron) registra el
+# día la primera vez que corre; si no, se registra con
+# `python -m cli registrar-historial`. El dashboard solo lo lee.
+HISTORIAL_DIR = BASE_DIR / "historial"
+HISTORIAL_AUTOMATICO = True
+HISTORIAL_DIAS_GRAFICO = 90
+
+# Lectura de una sola iglesia (directorio_iglesias.py): el directorio de filas
+# por iglesia se considera vigente DIRECTORIO_IGLESIAS_TTL segundos y las
+# lecturas van en solicitudes batch_get de hasta MAX_RANGOS_POR_SOLICITUD
+# rangos. Con FILTRADO_EN_SERVIDOR el dashboard descarga solo la iglesia
+# seleccionada
+DIRECTORIO_IGLESIAS_TTL = 300
+MAX_RANGOS_POR_SOLICITUD = 100
+FILTRADO_EN_SERVIDOR = True
@@ -0,0 +1,62 @@
+"""
+Proveedores de credenciales de la cuenta de servicio
+"""
+import json
+import os
+import sys
+
+from google.oauth2.service_account import Credentials
+
+from config import SERVICE_ACCOUNT_FILE, SCOPES, VARIABLE_CREDENCIALES
+
+
+def desde_archivo(ruta=SERVICE_ACCOUNT_FILE):
+    """Credenciales del archivo service_account.json (desarrollo local)"""
+    if not os.path.exists(ruta):
+        return None
+    return Credentials.from_service_account_file(str(ruta), scopes=SCOPES)
+
+
+def desde_variable_entorno(nombre=VARIABLE_CREDENCIALES):
+    """Credenciales de una variable de entorno con el JSON de la cuenta o la ruta al archivo"""
+    valor = os.environ.get(nombre, '').strip()
+    if not valor:
+        return None
+    if valor.startswith('{'):
+        return Credentials.from_service_account_info(json.loads(valor), scopes=SCOPES)
+    return Credentials.from_service_account_file(valor, scopes=SCOPES)
+
+
+def desde_streamlit():
+    """Credenciales de Streamlit Secrets (Cloud).
+
+    Solo se consulta si streamlit ya está importado, es decir, dentro del
+    dashboard: un script o un cron no paga el costo de importarlo.
+    """
+    st = sys.modules.get('streamlit')
+    if st is None:
+        return None
+    try:
+        if 'gcp_service_account' not in st.secrets:
+            return None
+        return Credentials.from_service_account_info(dict(st.secrets['gcp_service_account']), scopes=SCOPES)
+    except FileNotFoundError:
+        # No hay secrets.toml
+        return None
+
+
+# Orden en que se prueban los proveedores
+PROVEEDORES = [desde_archivo, desde_variable_entorno, desde_streamlit]
+
+
+def cargar_credenciales(proveedores=None):
+    """Devuelve las credenciales del primer proveedor que las tenga"""
+    for proveedor in proveedores or PROVEEDORES:
+        credenciales = proveedor()
+        if credenciales is not None:
+            return credenciales
+
+    raise ValueError(
+        "No se encontraron credenciales de Google Cloud. Agrega service_account.json, "
+        f"define la variable {VARIABLE_CREDENCIALES} o configura Streamlit Secrets"
+    )
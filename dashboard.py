@@ -2,12 +2,20 @@
 Dashboard visual para Cero Referidos
 """
 import streamlit as st
+import io
+import time
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from sheets_manager import SheetsManager
-from datetime import datetime
-from config import SPREADSHEET_ID
+from estadisticas import calcular_estadisticas, construir_cubo, COLUMNAS_CUBO, TODAS
+from config import (
+    SPREADSHEET_ID, SPREADSHEET_IDS, USAR_SNAPSHOT_LOCAL, USAR_RESUMEN,
+    USAR_CACHE_COMPARTIDA, MOSTRAR_DIAGNOSTICO, INSTRUMENTACION_LOG,
+    HISTORIAL_DIAS_GRAFICO, FILTRADO_EN_SERVIDOR
+)
+from cache_compartida import CacheCompartida
+from historial import Historial
+from instrumentacion import Cronometro, contar, exportar_json, medir, registrar_en_log, registro
+from resumen import resumen_vigente
 
 # Configuración de la página
 st.set_page_config(
@@ -16,34 +24,199 @@ st.set_page_config(
     layout="wide"
 )
 
-# Inicializar el gestor de sheets
+# Inicializar el gestor de sheets (uno por proceso, compartido entre sesiones y reruns)
+@st.cache_resource
 def get_sheets_manager():
-    return SheetsManager()
+    manager = SheetsManager()
+    manager.conectar_sheet()
+    return manager
+
+# Cache compartida en disco (una por proceso, apunta a los mismos archivos en todas las réplicas)
+@st.cache_resource
+def get_cache_compartida():
+    return CacheCompartida("datos")
+
+# Historial diario del avance (en disco, no consulta la API de Sheets)
+@st.cache_resource
+def get_historial():
+    return Historial()
+
+def leer_datos():
+    """Lee los datos del Google Sheet (o de todas las fuentes configuradas)"""
+    manager = get_sheets_manager()
+    # Varias fuentes: se leen en paralelo y se unen (columna Fuente)
+    if len(SPREADSHEET_IDS) > 1:
+        df, errores = manager.leer_datos_fuentes(SPREADSHEET_IDS)
+        for spreadsheet_id, error in errores.items():
+            st.warning(f"No se pudieron cargar los datos de {spreadsheet_id}: {error}")
+        return df
+    # Los datos ya vienen tipados (esquema.py): categorías, SI/NO como
+    # booleanos y referidos como enteros. Con el snapshot local, si la hoja
+    # no cambió solo se consulta su fecha de modificación en Drive.
+    if USAR_SNAPSHOT_LOCAL:
+        return manager.leer_datos_sincronizados()
+    return manager.leer_datos()
 
 # Cargar datos
 @st.cache_data(ttl=300)
+def cargar_datos_proceso():
+    """Carga los datos del Google Sheet con la cache propia de este proceso"""
+    # Solo se ejecuta cuando no está en la cache de Streamlit
+    contar('cache.datos.fallos')
+    try:
+        return leer_datos()
+    except Exception as e:
+        st.error(f"Error al cargar datos: {e}")
+        return pd.DataFrame()
+
 def cargar_datos():
     """Carga los datos del Google Sheet"""
+    contar('cache.datos.consultas')
+    if not USAR_CACHE_COMPARTIDA:
+        return cargar_datos_proceso()
+    # Con varias réplicas, una sola refresca los datos y las demás los mapean del disco
     try:
-        manager = get_sheets_manager()
-        manager.conectar_sheet()
-        df = manager.leer_datos()
+        return get_cache_compartida().obtener(leer_datos)
+    except Exception as e:
+        st.error(f"Error al cargar datos: {e}")
+        return pd.DataFrame()
 
-        # Convertir columnas numéricas a tipo numérico
-        if not df.empty:
-            df['Referidos Activos'] = pd.to_numeric(df['Referidos Activos'], errors='coerce').fillna(0)
-            df['Referidos Inactivos'] = pd.to_numeric(df['Referidos Inactivos'], errors='coerce').fillna(0)
+# Cubo de métricas por iglesia (se calcula una vez por carga de datos)
+TTL_CUBO = 300
+
+# Momento (time.monotonic) en que este proceso armó el cubo completo por última vez
+@st.cache_resource
+def get_estado_cubo():
+    return {}
+
+def cubo_completo_en_cache():
+    """Indica si cargar_cubo() ya está en la cache del proceso (no lee filas)"""
+    cargado = get_estado_cubo().get('cargado')
+    return cargado is not None and time.monotonic() - cargado < TTL_CUBO
+
+@st.cache_data(ttl=TTL_CUBO)
+def cargar_cubo():
+    """Precalcula las métricas del dashboard para cada iglesia y para Todas.
+
+    El cubo lleva una 'version' que cambia con cada carga: es la clave con
+    la que se memorizan las secciones ya armadas.
+    """
+    contar('cache.cubo.fallos')
+    # Camino rápido: el cubo materializado en la hoja Resumen, si es reciente
+    cubo = cargar_resumen()
+    if cubo is None:
+        # Si no, se leen los datos fila a fila
+        df = cargar_datos()
+        if df.empty:
+            return None
+        with medir('dashboard.construir_cubo'):
+            cubo = construir_cubo(df)
+    cubo['version'] = time.time_ns()
+    get_estado_cubo()['cargado'] = time.monotonic()
+    return cubo
 
-            # Asegurar que las columnas de contacto sean texto limpio
-            if 'Contactado' in df.columns:
-                df['Contactado'] = df['Contactado'].astype(str).str.strip().str.upper()
-            if 'Contestaron' in df.columns:
-                df['Contestaron'] = df['Contestaron'].astype(str).str.strip().str.upper()
+@st.cache_data(ttl=300)
+def cargar_resumen():
+    """Cubo materializado en la hoja Resumen si está al día (None si no)"""
+    # El resumen es de un solo spreadsheet, no sirve con varias fuentes
+    if not USAR_RESUMEN or len(SPREADSHEET_IDS) > 1:
+        return None
+    # Tras pulsar Actualizar se leen los datos aunque el resumen parezca vigente
+    if get_estado_cubo().pop('omitir_resumen', False):
+        return None
+    try:
+        manager = get_sheets_manager()
+        resumen = manager.leer_resumen()
+        if resumen and resumen_vigente(manager, resumen):
+            contar('resumen.aciertos')
+            return resumen['cubo']
+    except Exception:
+        pass
+    return None
+
+# Filtrado en el servidor: con una iglesia seleccionada se descargan solo sus
+# filas y las columnas del cubo, en lugar de la hoja completa
+@st.cache_data(ttl=300)
+def cargar_directorio():
+    """Iglesias de la hoja y meta de la primera barra, sin descargar los datos (None si no se puede)"""
+    if not FILTRADO_EN_SERVIDOR or len(SPREADSHEET_IDS) > 1:
+        return None
+    try:
+        directorio = get_sheets_manager().directorio_iglesias()
+        iglesias = directorio.iglesias()
+    except Exception:
+        return None
+    if not iglesias:
+        return None
+    return {'iglesias': iglesias, 'promedio_lideres_cero': directorio.promedio_lideres_cero()}
 
-        return df
+@st.cache_data(ttl=300)
+def cargar_cubo_iglesia(iglesia, promedio_lideres_cero):
+    """Cubo de métricas de una sola iglesia, leyendo solo sus filas"""
+    contar('cache.cubo_iglesia.fallos')
+    try:
+        df = get_sheets_manager().leer_datos_iglesia(iglesia, columnas=COLUMNAS_CUBO)
     except Exception as e:
         st.error(f"Error al cargar datos: {e}")
-        return pd.DataFrame()
+        return None
+    if df.empty:
+        return None
+    with medir('dashboard.construir_cubo_iglesia'):
+        cubo = construir_cubo(df)
+    # La meta de la primera barra se calcula sobre todas las iglesias
+    cubo['promedio_lideres_cero'] = promedio_lideres_cero
+    cubo['version'] = time.time_ns()
+    return cubo
+
+# Reporte por iglesia: un Excel por iglesia en un zip (se genera una vez por carga de datos)
+@st.cache_data(ttl=300)
+def generar_reporte_iglesias(iglesia):
+    """Zip con los libros de Excel de la iglesia seleccionada o de todas"""
+    from exportador import exportar_zip
+
+    df = cargar_datos()
+    if df.empty:
+        return None
+    buffer = io.BytesIO()
+    with medir('dashboard.reporte_iglesias'):
+        exportar_zip(df, calcular_estadisticas(df), buffer, iglesias=None if iglesia == TODAS else [iglesia])
+    return buffer.getvalue()
+
+@st.cache_data(ttl=300)
+def cargar_tendencia(iglesia, dias, ultimo_dia):
+    """Serie diaria de avance de la iglesia (o de todas) en los últimos días"""
+    # ultimo_dia es parte de la clave de la cache: un registro nuevo la invalida
+    desde = pd.Timestamp.today().normalize() - pd.Timedelta(days=dias)
+    return get_historial().tendencia(
+        iglesia, ['contactados', 'activaron', 'lideres_cero_referidos'], desde=desde
+    )
+
+@st.fragment
+def mostrar_tendencia(iglesia):
+    """Gráfico de evolución diaria a partir del historial.
+
+    Es un fragmento: cambiar el rango vuelve a ejecutar solo esta sección.
+    """
+    rangos = sorted({30, 90, 365, HISTORIAL_DIAS_GRAFICO})
+    dias = st.session_state.get('dias_tendencia', HISTORIAL_DIAS_GRAFICO)
+    tendencia = cargar_tendencia(iglesia, dias, get_historial().ultimo_dia())
+    # Con un solo día todavía no hay curva que mostrar (si el usuario acortó
+    # el rango, el selector se deja para que lo pueda ampliar)
+    if len(tendencia) < 2 and dias == HISTORIAL_DIAS_GRAFICO:
+        return
+    st.subheader("📈 Evolución")
+    st.selectbox(
+        "Rango",
+        rangos,
+        key='dias_tendencia',
+        index=rangos.index(HISTORIAL_DIAS_GRAFICO),
+        format_func=lambda d: f"Últimos {d} días"
+    )
+    st.line_chart(tendencia.rename(columns={
+        'contactados': 'Contactados',
+        'activaron': 'Activaron',
+        'lideres_cero_referidos': 'Líderes con cero referidos'
+    }))
 
 def crear_barra_progreso(valor, total, label, color="#1E88E5", mostrar_porcentaje_abajo=True):
     """Crea una barra de progreso horizontal con porcentaje"""
@@ -56,8 +229,120 @@ def crear_barra_progreso(valor, total, label, color="#1E88E5", mostrar_porcentaj
     html = f"""<div style="margin: 20px 0;"><div style="display: flex; justify-content: space-between; margin-bottom: 5px;"><span style="font-weight: bold; font-size: 1.1em;">{label}</span><span style="font-weight: bold; font-size: 1.1em; color: {color};">{valor} / {total} ({porcentaje:.1f}%)</span></div><div style="width: 100%; background-color: #e0e0e0; border-radius: 10px; height: 30px; position: relative;"><div style="width: {porcentaje}%; background-color: {color}; height: 100%; border-radius: 10px; transition: width 0.3s ease;"></div>{porcentaje_html}</div></div>"""
     return html
 
-def mostrar_vista_general_visual(df, promedio_lideres):
-    """Muestra la vista general con flujo visual del proceso"""
+@st.fragment
+def mostrar_reporte(iglesia):
+    """Sección del reporte por iglesia; su botón vuelve a ejecutar solo este fragmento"""
+    st.header("📦 Reporte")
+    if st.button("📦 Preparar reporte por iglesia", use_container_width=True):
+        with st.spinner("Generando reporte..."):
+            reporte = generar_reporte_iglesias(iglesia)
+        if reporte:
+            nombre = "iglesias" if iglesia == TODAS else iglesia
+            st.download_button(
+                "⬇️ Descargar reporte (.zip)",
+                reporte,
+                file_name=f"reporte_{nombre}.zip",
+                mime="application/zip",
+                use_container_width=True
+            )
+
+def crear_figura_respuestas(respuestas, contactados):
+    """Barras horizontales de la distribución de respuestas en una sola traza"""
+    # Plotly se importa solo cuando hay gráfica que dibujar (arranque más rápido)
+    import plotly.graph_objects as go
+
+    colores = ['#1E88E5', '#43A047', '#FB8C00', '#E53935', '#8E24AA', '#00ACC1']
+    nombres = [respuesta for respuesta, _ in respuestas]
+    cantidades = [cantidad for _, cantidad in respuestas]
+
+    fig_respuestas = go.Figure(go.Bar(
+        y=nombres,
+        x=cantidades,
+        orientation='h',
+        text=[f"{cantidad} ({cantidad / contactados * 100:.1f}%)" for cantidad in cantidades],
+        textposition='auto',
+        marker_color=[colores[i % len(colores)] for i in range(len(cantidades))],
+        hovertemplate="%{y}: %{x}<extra></extra>"
+    ))
+
+    fig_respuestas.update_layout(
+        showlegend=False,
+        height=250,
+        margin=dict(l=10, r=10, t=10, b=10),
+        xaxis_title="Cantidad de Líderes",
+        yaxis_title="",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(size=11)
+    )
+    return fig_respuestas
+
+def _tarjetas_grupo(grupo):
+    """HTML de las tarjetas de activación y referidos de un grupo (contestaron / no contestaron)"""
+    activaron = grupo['activaron']
+    sin_activar = grupo['sin_activar']
+    pct_activaron = (activaron / grupo['total'] * 100) if grupo['total'] > 0 else 0
+
+    activacion = f"""
+            <div style='background-color: #f5f5f5; padding: 12px; border-radius: 8px; margin-bottom: 8px;'>
+                <h4 style='color: #424242; margin-top: 0; margin-bottom: 8px; font-size: 1.1em;'>👥 Activación de Referidos</h4>
+                <p style='font-size: 1.1em; margin: 5px 0;'>
+                    <strong style='color: #43A047;'>{activaron}</strong> activaron referidos
+                    <span style='color: #666;'>({pct_activaron:.1f}%)</span>
+                </p>
+                <p style='font-size: 1.1em; margin: 5px 0;'>
+                    <strong style='color: #E53935;'>{sin_activar}</strong> sin activar
+                    <span style='color: #666;'>({100-pct_activaron:.1f}%)</span>
+                </p>
+            </div>
+        """
+
+    referidos = f"""
+            <div style='background-color: #f5f5f5; padding: 12px; border-radius: 8px;'>
+                <h4 style='color: #424242; margin-top: 0; margin-bottom: 8px; font-size: 1.1em;'>📈 Referidos</h4>
+                <p style='font-size: 1.2em; margin: 5px 0;'>
+                    <strong style='color: #1E88E5;'>{grupo['referidos_activos']}</strong> referidos activos
+                </p>
+                <p style='font-size: 1em; margin: 5px 0; color: #666;'>
+                    {grupo['referidos_inactivos']} referidos inactivos
+                </p>
+            </div>
+        """
+    return activacion, referidos
+
+# Secciones ya armadas por (versión de datos, iglesia): volver a una iglesia
+# ya vista no reconstruye el HTML ni la figura
+@st.cache_data(max_entries=200)
+def secciones_vista_general(version, iglesia, _metricas, promedio_lideres):
+    """HTML de las tarjetas y figura de respuestas de una iglesia.
+
+    _metricas no forma parte de la clave de la cache: lo identifican
+    version (la carga de datos) e iglesia.
+    """
+    metricas = _metricas
+    total_lideres = metricas['total_lideres']
+    # Contactabilidad - el cubo usa la columna "Contestaron" si existe, sino "Contactado"
+    contactados = metricas['contactados']
+
+    return {
+        'cero_referidos': crear_barra_progreso(
+            metricas['lideres_cero_referidos'], promedio_lideres, "Líderes con Cero Referidos",
+            "#E53935", mostrar_porcentaje_abajo=False
+        ),
+        'contestaron': crear_barra_progreso(
+            contactados, total_lideres, "Contestaron", "#43A047", mostrar_porcentaje_abajo=False
+        ),
+        'no_contestaron': crear_barra_progreso(
+            metricas['no_contactados'], total_lideres, "No Contestaron", "#FB8C00", mostrar_porcentaje_abajo=False
+        ),
+        'tarjetas_contestaron': _tarjetas_grupo(metricas['contestaron']),
+        'tarjetas_no_contestaron': _tarjetas_grupo(metricas['no_contestaron']),
+        'figura_respuestas': crear_figura_respuestas(metricas['respuestas'], contactados) if contactados > 0 else None
+    }
+
+def mostrar_vista_general_visual(secciones):
+    """Muestra la vista general con flujo visual del proceso (secciones ya armadas)"""
+    cronometro = Cronometro('dashboard.vista_general')
 
     # Título principal con estilo
     st.markdown("""
@@ -66,25 +351,12 @@ def mostrar_vista_general_visual(df, promedio_lideres):
         </h1>
     """, unsafe_allow_html=True)
 
-    # CÁLCULOS GENERALES
-    total_lideres = len(df)
-    lideres_cero_referidos = len(df[df['Referidos Activos'] == 0])
-
-    # Contactabilidad - usar la columna "Contestaron" si existe, sino usar "Contactado"
-    columna_contacto = 'Contestaron' if 'Contestaron' in df.columns else 'Contactado'
-    contactados = len(df[df[columna_contacto] == 'SI'])
-    no_contactados = len(df[df[columna_contacto] != 'SI'])
-
     # ============================================================
     # SECCIÓN 1: LÍDERES CON CERO REFERIDOS (SIN PORCENTAJE ABAJO)
     # ============================================================
-    st.markdown(crear_barra_progreso(
-        lideres_cero_referidos,
-        promedio_lideres,
-        "Líderes con Cero Referidos",
-        "#E53935",
-        mostrar_porcentaje_abajo=False
-    ), unsafe_allow_html=True)
+    st.markdown(secciones['cero_referidos'], unsafe_allow_html=True)
+
+    cronometro.marcar('cero_referidos')
 
     # ============================================================
     # SECCIÓN 2: CONTACTABILIDAD (SIN PORCENTAJE ABAJO)
@@ -98,100 +370,26 @@ def mostrar_vista_general_visual(df, promedio_lideres):
     col1, col2 = st.columns(2)
 
     with col1:
-        st.markdown(crear_barra_progreso(
-            contactados,
-            total_lideres,
-            "Contestaron",
-            "#43A047",
-            mostrar_porcentaje_abajo=False
-        ), unsafe_allow_html=True)
+        st.markdown(secciones['contestaron'], unsafe_allow_html=True)
 
     with col2:
-        st.markdown(crear_barra_progreso(
-            no_contactados,
-            total_lideres,
-            "No Contestaron",
-            "#FB8C00",
-            mostrar_porcentaje_abajo=False
-        ), unsafe_allow_html=True)
+        st.markdown(secciones['no_contestaron'], unsafe_allow_html=True)
+
+    cronometro.marcar('contactabilidad')
 
     # ============================================================
     # SECCIÓN 3: ACTIVACIÓN DE REFERIDOS (DEBAJO DE CONTACTABILIDAD)
     # ============================================================
-
-    # Calcular métricas para CONTESTARON
-    df_contestaron = df[df[columna_contacto] == 'SI'].copy()
-    contestaron_activaron = len(df_contestaron[df_contestaron['Referidos Activos'] > 0])
-    contestaron_sin_activar = len(df_contestaron[df_contestaron['Referidos Activos'] == 0])
-    contestaron_total_refs_activos = int(df_contestaron['Referidos Activos'].sum())
-    contestaron_total_refs_inactivos = int(df_contestaron['Referidos Inactivos'].sum())
-    contestaron_pct_activaron = (contestaron_activaron / len(df_contestaron) * 100) if len(df_contestaron) > 0 else 0
-
-    # Calcular métricas para NO CONTESTARON
-    df_no_contestaron = df[df[columna_contacto] != 'SI'].copy()
-    no_contestaron_activaron = len(df_no_contestaron[df_no_contestaron['Referidos Activos'] > 0])
-    no_contestaron_sin_activar = len(df_no_contestaron[df_no_contestaron['Referidos Activos'] == 0])
-    no_contestaron_total_refs_activos = int(df_no_contestaron['Referidos Activos'].sum())
-    no_contestaron_total_refs_inactivos = int(df_no_contestaron['Referidos Inactivos'].sum())
-    no_contestaron_pct_activaron = (no_contestaron_activaron / len(df_no_contestaron) * 100) if len(df_no_contestaron) > 0 else 0
-
     col_contest, col_no_contest = st.columns(2)
 
-    # COLUMNA CONTESTARON
-    with col_contest:
-        st.markdown(f"""
-            <div style='background-color: #f5f5f5; padding: 12px; border-radius: 8px; margin-bottom: 8px;'>
-                <h4 style='color: #424242; margin-top: 0; margin-bottom: 8px; font-size: 1.1em;'>👥 Activación de Referidos</h4>
-                <p style='font-size: 1.1em; margin: 5px 0;'>
-                    <strong style='color: #43A047;'>{contestaron_activaron}</strong> activaron referidos
-                    <span style='color: #666;'>({contestaron_pct_activaron:.1f}%)</span>
-                </p>
-                <p style='font-size: 1.1em; margin: 5px 0;'>
-                    <strong style='color: #E53935;'>{contestaron_sin_activar}</strong> sin activar
-                    <span style='color: #666;'>({100-contestaron_pct_activaron:.1f}%)</span>
-                </p>
-            </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown(f"""
-            <div style='background-color: #f5f5f5; padding: 12px; border-radius: 8px;'>
-                <h4 style='color: #424242; margin-top: 0; margin-bottom: 8px; font-size: 1.1em;'>📈 Referidos</h4>
-                <p style='font-size: 1.2em; margin: 5px 0;'>
-                    <strong style='color: #1E88E5;'>{contestaron_total_refs_activos}</strong> referidos activos
-                </p>
-                <p style='font-size: 1em; margin: 5px 0; color: #666;'>
-                    {contestaron_total_refs_inactivos} referidos inactivos
-                </p>
-            </div>
-        """, unsafe_allow_html=True)
-
-    # COLUMNA NO CONTESTARON
-    with col_no_contest:
-        st.markdown(f"""
-            <div style='background-color: #f5f5f5; padding: 12px; border-radius: 8px; margin-bottom: 8px;'>
-                <h4 style='color: #424242; margin-top: 0; margin-bottom: 8px; font-size: 1.1em;'>👥 Activación de Referidos</h4>
-                <p style='font-size: 1.1em; margin: 5px 0;'>
-                    <strong style='color: #43A047;'>{no_contestaron_activaron}</strong> activaron referidos
-                    <span style='color: #666;'>({no_contestaron_pct_activaron:.1f}%)</span>
-                </p>
-                <p style='font-size: 1.1em; margin: 5px 0;'>
-                    <strong style='color: #E53935;'>{no_contestaron_sin_activar}</strong> sin activar
-                    <span style='color: #666;'>({100-no_contestaron_pct_activaron:.1f}%)</span>
-                </p>
-            </div>
-        """, unsafe_allow_html=True)
+    # COLUMNA CONTESTARON / COLUMNA NO CONTESTARON
+    for columna, tarjetas in ((col_contest, secciones['tarjetas_contestaron']),
+                              (col_no_contest, secciones['tarjetas_no_contestaron'])):
+        with columna:
+            for tarjeta in tarjetas:
+                st.markdown(tarjeta, unsafe_allow_html=True)
 
-        st.markdown(f"""
-            <div style='background-color: #f5f5f5; padding: 12px; border-radius: 8px;'>
-                <h4 style='color: #424242; margin-top: 0; margin-bottom: 8px; font-size: 1.1em;'>📈 Referidos</h4>
-                <p style='font-size: 1.2em; margin: 5px 0;'>
-                    <strong style='color: #1E88E5;'>{no_contestaron_total_refs_activos}</strong> referidos activos
-                </p>
-                <p style='font-size: 1em; margin: 5px 0; color: #666;'>
-                    {no_contestaron_total_refs_inactivos} referidos inactivos
-                </p>
-            </div>
-        """, unsafe_allow_html=True)
+    cronometro.marcar('activacion')
 
     # ============================================================
     # SECCIÓN 3: DISTRIBUCIÓN DE RESPUESTAS (Solo contestaron)
@@ -202,45 +400,43 @@ def mostrar_vista_general_visual(df, promedio_lideres):
         </h2>
     """, unsafe_allow_html=True)
 
-    df_contactados_full = df[df[columna_contacto] == 'SI'].copy()
-
-    if len(df_contactados_full) > 0:
-        # Contar respuestas
-        respuestas_count = df_contactados_full['Respuesta'].value_counts().reset_index()
-        respuestas_count.columns = ['Respuesta', 'Cantidad']
-
-        # Crear gráfica de barras horizontal
-        fig_respuestas = go.Figure()
-
-        colores = ['#1E88E5', '#43A047', '#FB8C00', '#E53935', '#8E24AA', '#00ACC1']
-
-        for idx, row in respuestas_count.iterrows():
-            porcentaje = (row['Cantidad'] / contactados * 100)
-            fig_respuestas.add_trace(go.Bar(
-                y=[row['Respuesta']],
-                x=[row['Cantidad']],
-                orientation='h',
-                text=f"{row['Cantidad']} ({porcentaje:.1f}%)",
-                textposition='auto',
-                marker_color=colores[idx % len(colores)],
-                name=row['Respuesta']
-            ))
-
-        fig_respuestas.update_layout(
-            showlegend=False,
-            height=250,
-            margin=dict(l=10, r=10, t=10, b=10),
-            xaxis_title="Cantidad de Líderes",
-            yaxis_title="",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=11)
-        )
-
-        st.plotly_chart(fig_respuestas, use_container_width=True)
+    if secciones['figura_respuestas'] is not None:
+        st.plotly_chart(secciones['figura_respuestas'], use_container_width=True)
+        cronometro.marcar('envio_grafico')
     else:
         st.info("No hay líderes contactados aún")
 
+@st.fragment
+def mostrar_diagnostico():
+    """Panel del sidebar con los tiempos y contadores de instrumentacion.py"""
+    resumen = registro.resumen()
+    with st.expander("🩺 Diagnóstico"):
+        operaciones = pd.DataFrame.from_dict(resumen['operaciones'], orient='index')
+        if not operaciones.empty:
+            operaciones['promedio'] = operaciones['segundos'] / operaciones['llamadas']
+            operaciones = operaciones.sort_values('segundos', ascending=False)
+            st.dataframe(operaciones[['llamadas', 'segundos', 'promedio', 'ultimo', 'filas', 'bytes', 'errores']].round(4))
+
+        if resumen['contadores']:
+            st.dataframe(pd.Series(resumen['contadores'], name='cantidad'))
+
+        st.download_button(
+            "⬇️ Exportar JSON",
+            exportar_json(indent=2),
+            file_name="diagnostico.json",
+            mime="application/json"
+        )
+        if st.button("Reiniciar mediciones"):
+            registro.reiniciar()
+
+def terminar_ejecucion():
+    """Publica las mediciones de esta ejecución (panel y/o log)"""
+    if MOSTRAR_DIAGNOSTICO:
+        with st.sidebar:
+            mostrar_diagnostico()
+    if INSTRUMENTACION_LOG:
+        registrar_en_log()
+
 
 def main():
     # Botón de actualizar datos en la esquina
@@ -248,20 +444,37 @@ def main():
     with col_refresh:
         if st.button("🔄 Actualizar", use_container_width=True):
             st.cache_data.clear()
+            get_estado_cubo().clear()
+            get_estado_cubo()['omitir_resumen'] = True
+            # El directorio de iglesias vive en el manager, fuera de las caches de Streamlit
+            get_sheets_manager().directorio_iglesias().invalidar()
+            if USAR_CACHE_COMPARTIDA:
+                get_cache_compartida().invalidar()
             st.rerun()
 
-    # Cargar datos
-    df = cargar_datos()
+    cronometro = Cronometro('dashboard.main')
 
-    if df.empty:
+    # Cargar el cubo de métricas (datos + agregados por iglesia). Si el cubo
+    # completo o un resumen reciente ya están a mano, cambiar de iglesia no lee
+    # filas. Si no (arranque en frío), la lista de iglesias sale del directorio
+    # y el cubo se arma más abajo solo con la iglesia seleccionada.
+    contar('cache.cubo.consultas')
+    directorio = None
+    if not cubo_completo_en_cache() and cargar_resumen() is None:
+        directorio = cargar_directorio()
+    cubo = cargar_cubo() if directorio is None else None
+    cronometro.marcar('cargar_cubo')
+
+    if cubo is None and directorio is None:
         st.warning("No hay datos disponibles. Verifica la configuración del Google Sheet.")
         st.info("Asegúrate de haber configurado el SPREADSHEET_ID en config.py")
+        terminar_ejecucion()
         return
 
     # Filtro por iglesia en el sidebar
     st.sidebar.header("🔍 Filtros")
 
-    iglesias = ['Todas'] + sorted(df['Iglesia'].unique().tolist())
+    iglesias = [TODAS] + (cubo['iglesias'] if cubo is not None else directorio['iglesias'])
 
     # Definir valor por defecto: SAN DIEGO si existe, sino el primero disponible
     default_iglesia = "SAN DIEGO" if "SAN DIEGO" in iglesias else iglesias[0]
@@ -269,23 +482,28 @@ def main():
 
     iglesia_seleccionada = st.sidebar.selectbox("Seleccionar Iglesia", iglesias, index=default_index)
 
-    # Calcular el promedio de la columna "Cantidad de lideres" si existe en el Excel
-    if 'Cantidad de lideres' in df.columns:
-        # Convertir a numérico y calcular el promedio
-        promedio_lideres_cero = int(pd.to_numeric(df['Cantidad de lideres'], errors='coerce').mean())
-    else:
-        # Si no existe la columna, calcular el promedio contando líderes con cero referidos por iglesia
-        lideres_cero_por_iglesia = df[df['Referidos Activos'] == 0].groupby('Iglesia').size()
-        promedio_lideres_cero = int(lideres_cero_por_iglesia.mean())
-
-    # Filtrar dataframe según selección
-    if iglesia_seleccionada != 'Todas':
-        df_filtrado = df[df['Iglesia'] == iglesia_seleccionada].copy()
-    else:
-        df_filtrado = df.copy()
-
-    # Mostrar el dashboard con los datos filtrados
-    mostrar_vista_general_visual(df_filtrado, promedio_lideres_cero)
+    if cubo is None:
+        if iglesia_seleccionada == TODAS:
+            cubo = cargar_cubo()
+        else:
+            cubo = cargar_cubo_iglesia(iglesia_seleccionada, directorio['promedio_lideres_cero'])
+        cronometro.marcar('cargar_cubo_iglesia')
+        if cubo is None:
+            st.warning("No hay datos disponibles para la iglesia seleccionada.")
+            terminar_ejecucion()
+            return
+
+    # Mostrar el dashboard con las métricas de la iglesia seleccionada
+    secciones = secciones_vista_general(
+        cubo['version'], iglesia_seleccionada, cubo['por_iglesia'][iglesia_seleccionada], cubo['promedio_lideres_cero']
+    )
+    cronometro.marcar('secciones')
+    mostrar_vista_general_visual(secciones)
+    cronometro.marcar('vista_general')
+
+    # Evolución diaria (historial en disco, lo registra el job del Resumen)
+    mostrar_tendencia(iglesia_seleccionada)
+    cronometro.marcar('tendencia')
 
     # Separador
     st.markdown("---")
@@ -293,7 +511,7 @@ def main():
     # Botón para ver datos en Google Sheets
     st.markdown("<br>", unsafe_allow_html=True)
     sheet_url = f"https://docs.google.com/spreadsheets/d/{SPREADSHEET_ID}"
-    titulo_boton = "VER DATOS COMPLETOS EN EXCEL" if iglesia_seleccionada == 'Todas' else f"VER DATOS DE {iglesia_seleccionada} EN EXCEL"
+    titulo_boton = "VER DATOS COMPLETOS EN EXCEL" if iglesia_seleccionada == TODAS else f"VER DATOS DE {iglesia_seleccionada} EN EXCEL"
     st.markdown(f"""
     <div style="text-align: center; padding: 30px;">
         <a href="{sheet_url}" target="_blank" style="text-decoration: none;">
@@ -319,5 +537,12 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    # Reporte descargable: un libro por iglesia (datos + resumen) en un zip
+    with st.sidebar:
+        mostrar_reporte(iglesia_seleccionada)
+    cronometro.marcar('reporte')
+
+    terminar_ejecucion()
+
 if __name__ == "__main__":
     main()
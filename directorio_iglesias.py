@@ -0,0 +1,123 @@
+"""
+Directorio de filas por iglesia para leer una sola iglesia de la hoja
+"""
+import threading
+import time
+from itertools import groupby
+
+import pandas as pd
+
+from config import COLUMNAS, DIRECTORIO_IGLESIAS_TTL
+from esquema import convertir_columna
+from estadisticas import promedio_lideres_cero
+from lectura import letra_columna
+
+
+def _texto(valor):
+    return str(valor).strip()
+
+
+class DirectorioIglesias:
+    """Tramos de filas contiguas de cada iglesia, leyendo solo unas pocas columnas.
+
+    Se carga con una solicitud batch_get de los encabezados y de las
+    columnas Iglesia y Referidos Activos (más Cantidad de lideres si la
+    hoja la tiene, para la meta de la primera barra del dashboard). Con la
+    hoja ordenada por iglesia cada iglesia es un solo tramo; si no, son
+    varios. Las filas agregadas por el manager se registran sin volver a
+    leer, como en IndiceCedulas.
+    """
+
+    def __init__(self, worksheet, ttl=DIRECTORIO_IGLESIAS_TTL):
+        self.worksheet = worksheet
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._tramos = {}
+        self._encabezados = []
+        self._promedio_lideres_cero = 0
+        self._cargado_en = None
+
+    def cargar(self):
+        """Relee las columnas del directorio y lo reconstruye"""
+        col_iglesia = letra_columna(COLUMNAS['IGLESIA'] + 1)
+        col_activos = letra_columna(COLUMNAS['REFERIDOS_ACTIVOS'] + 1)
+        encabezados, iglesias, activos = self.worksheet.batch_get([
+            '1:1', f"{col_iglesia}2:{col_iglesia}", f"{col_activos}2:{col_activos}"
+        ])
+        encabezados = [_texto(e) for e in encabezados[0]] if encabezados else []
+        # La API recorta las celdas vacías del final: las columnas pueden tener
+        # largos distintos y se llevan todas al de la más larga
+        total = max(len(iglesias), len(activos))
+        iglesias = [_texto(fila[0]) if fila else '' for fila in iglesias] + [''] * (total - len(iglesias))
+        activos = [fila[0] if fila else '' for fila in activos] + [''] * (total - len(activos))
+
+        tramos = {}
+        fila = 2
+        for iglesia, grupo in groupby(iglesias):
+            cantidad = sum(1 for _ in grupo)
+            if iglesia:
+                tramos.setdefault(iglesia, []).append((fila, fila + cantidad - 1))
+            fila += cantidad
+
+        # Meta de la primera barra, igual que en construir_cubo
+        columnas = {
+            'Iglesia': convertir_columna('Iglesia', [i or None for i in iglesias]),
+            'Referidos Activos': convertir_columna('Referidos Activos', activos)
+        }
+        if 'Cantidad de lideres' in encabezados:
+            letra = letra_columna(encabezados.index('Cantidad de lideres') + 1)
+            cantidades = [f[0] if f else '' for f in self.worksheet.get_values(f"{letra}2:{letra}")]
+            columnas['Cantidad de lideres'] = convertir_columna(
+                'Cantidad de lideres', cantidades[:total] + [''] * (total - len(cantidades))
+            )
+        promedio = promedio_lideres_cero(pd.DataFrame(columnas))
+
+        with self._lock:
+            self._tramos = tramos
+            self._encabezados = encabezados
+            self._promedio_lideres_cero = promedio
+            self._cargado_en = time.monotonic()
+
+    def invalidar(self):
+        """Marca el directorio como vencido; la próxima consulta lo recarga"""
+        with self._lock:
+            self._cargado_en = None
+
+    def _asegurar_vigente(self):
+        if self._cargado_en is None or time.monotonic() - self._cargado_en > self.ttl:
+            self.cargar()
+
+    def iglesias(self):
+        """Nombres de las iglesias de la hoja, ordenados"""
+        with self._lock:
+            self._asegurar_vigente()
+            return sorted(self._tramos)
+
+    def tramos(self, iglesia):
+        """Lista de (primera fila, última fila) de la iglesia; vacía si no está"""
+        with self._lock:
+            self._asegurar_vigente()
+            return list(self._tramos.get(_texto(iglesia), []))
+
+    def encabezados(self):
+        with self._lock:
+            self._asegurar_vigente()
+            return list(self._encabezados)
+
+    def promedio_lideres_cero(self):
+        """Meta de la primera barra del dashboard calculada sobre toda la hoja"""
+        with self._lock:
+            self._asegurar_vigente()
+            return self._promedio_lideres_cero
+
+    def registrar(self, iglesia, fila):
+        """Agrega al directorio una fila recién escrita por el manager"""
+        iglesia = _texto(iglesia)
+        with self._lock:
+            if self._cargado_en is None or not iglesia:
+                return
+            tramos = self._tramos.setdefault(iglesia, [])
+            if tramos and tramos[-1][1] == fila - 1:
+                tramos[-1] = (tramos[-1][0], fila)
+            else:
+                tramos.append((fila, fila))
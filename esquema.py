@@ -0,0 +1,196 @@
+"""
+Esquema tipado de la hoja de Datos y construcción columnar de DataFrames
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from config import COLUMNAS, ENCABEZADOS, COLUMNA_FUENTE
+from instrumentacion import instrumentar
+
+# Tipos lógicos de cada columna de config.COLUMNAS
+TIPOS_COLUMNAS = {
+    'IGLESIA': 'categoria',
+    'MUNICIPIO': 'categoria',
+    'CEDULA': 'texto',
+    'NOMBRE': 'texto',
+    'CELULAR': 'texto',
+    'CONTACTADO': 'si_no',
+    'FECHA_CONTACTO': 'texto',
+    'OBSERVACIONES': 'texto',
+    'ESTA_EN_INFOMIRA': 'si_no',
+    'REFERIDOS_ACTIVOS': 'entero',
+    'REFERIDOS_INACTIVOS': 'entero'
+}
+
+# Esquema por nombre de encabezado. Incluye columnas opcionales que tienen
+# algunas hojas de campaña además de las de la plantilla; cualquier otra
+# columna se carga como texto.
+ESQUEMA = {ENCABEZADOS[clave]: TIPOS_COLUMNAS[clave] for clave in COLUMNAS}
+ESQUEMA.update({
+    'Contestaron': 'si_no',
+    'Respuesta': 'categoria',
+    'Cantidad de lideres': 'numero',
+    COLUMNA_FUENTE: 'categoria'
+})
+
+VALORES_SI = {'SI', 'SÍ'}
+
+
+def _a_texto(valores):
+    return np.array(['' if v is None else str(v) for v in valores], dtype=object)
+
+
+def _a_categoria(valores):
+    # Los valores nulos (solo posibles en DataFrames externos) quedan como NaN
+    return pd.Categorical([v if pd.isna(v) else str(v).strip() for v in valores])
+
+
+def _a_si_no(valores):
+    # Los booleanos (p. ej. de una columna ya convertida que pasó a object) se conservan
+    return np.fromiter(
+        (v is True or v is np.True_ or str(v).strip().upper() in VALORES_SI for v in valores),
+        dtype=bool,
+        count=len(valores)
+    )
+
+
+def _a_entero(valores):
+    serie = pd.to_numeric(pd.Series(valores, dtype=object), errors='coerce').fillna(0)
+    return pd.to_numeric(serie, downcast='integer').to_numpy()
+
+
+def _a_numero(valores):
+    return pd.to_numeric(pd.Series(valores, dtype=object), errors='coerce').to_numpy()
+
+
+CONVERSORES = {
+    'texto': _a_texto,
+    'categoria': _a_categoria,
+    'si_no': _a_si_no,
+    'entero': _a_entero,
+    'numero': _a_numero
+}
+
+# dtype que deja cada conversor, para saber si una columna ya está normalizada
+_DTYPES = {
+    'categoria': 'category',
+    'si_no': 'bool',
+    'entero': 'integer',
+    'numero': 'numeric'
+}
+
+
+def convertir_columna(nombre, valores):
+    """Convierte los valores crudos de una columna según el esquema"""
+    return CONVERSORES[ESQUEMA.get(nombre, 'texto')](valores)
+
+
+@instrumentar()
+def construir_dataframe(encabezados, filas, fila_inicial=None):
+    """Construye un DataFrame tipado, columna por columna, a partir de valores crudos.
+
+    encabezados es la fila 1 de la hoja y filas la lista de filas de datos
+    tal como las devuelve get_values (listas de strings, posiblemente de
+    distinto largo). Si se indica fila_inicial (número de fila en la hoja
+    de la primera fila recibida), el índice del DataFrame es el número de
+    fila de cada registro.
+    """
+    encabezados = [str(e).strip() for e in encabezados]
+    ancho = len(encabezados)
+
+    # Descartar filas completamente vacías y rellenar las cortas
+    numeros = []
+    completas = []
+    for numero, fila in enumerate(filas):
+        if any(str(v).strip() for v in fila):
+            numeros.append(numero)
+            completas.append(list(fila[:ancho]) + [''] * (ancho - len(fila)))
+    filas = completas
+
+    columnas = list(zip(*filas)) if filas else [()] * ancho
+    datos = {}
+    for nombre, valores in zip(encabezados, columnas):
+        if not nombre or nombre in datos:
+            continue
+        datos[nombre] = convertir_columna(nombre, valores)
+
+    indice = None
+    if fila_inicial is not None:
+        indice = pd.Index([fila_inicial + n for n in numeros], dtype='int64')
+
+    return pd.DataFrame(datos, index=indice, copy=False)
+
+
+def dataframe_desde_valores(valores):
+    """Como construir_dataframe, recibiendo la matriz completa con encabezados"""
+    if not valores:
+        return pd.DataFrame()
+    return construir_dataframe(valores[0], valores[1:])
+
+
+def _ya_normalizada(serie, tipo):
+    dtype = _DTYPES.get(tipo)
+    if dtype is None:
+        return True
+    if dtype == 'category':
+        return isinstance(serie.dtype, pd.CategoricalDtype)
+    if dtype == 'bool':
+        return pd.api.types.is_bool_dtype(serie)
+    if dtype == 'integer':
+        return pd.api.types.is_integer_dtype(serie)
+    return pd.api.types.is_numeric_dtype(serie)
+
+
+def normalizar_dataframe(df):
+    """Aplica el esquema a un DataFrame ya construido (p. ej. de get_all_records).
+
+    Solo convierte las columnas que no tienen todavía el tipo del esquema; las
+    demás se reutilizan sin copiar. Un DataFrame que viene de
+    construir_dataframe se devuelve tal cual.
+    """
+    convertidas = {}
+    for nombre in df.columns:
+        tipo = ESQUEMA.get(nombre)
+        if tipo and not _ya_normalizada(df[nombre], tipo):
+            convertidas[nombre] = convertir_columna(nombre, df[nombre].tolist())
+
+    if not convertidas:
+        return df
+
+    return pd.DataFrame(
+        {nombre: convertidas.get(nombre, df[nombre]) for nombre in df.columns},
+        index=df.index,
+        copy=False
+    )
+
+
+def _completar_columnas(df, columnas):
+    faltantes = {nombre: convertir_columna(nombre, [''] * len(df)) for nombre in columnas if nombre not in df.columns}
+    return df.assign(**faltantes) if faltantes else df
+
+
+def concatenar(frames):
+    """Concatena DataFrames tipados conservando las columnas categóricas.
+
+    pd.concat convierte a object las categóricas con categorías distintas;
+    aquí se unen las categorías primero. Las columnas del esquema que le
+    faltan a un DataFrame (p. ej. una fuente sin "Contestaron") se agregan
+    como si estuvieran vacías en la hoja, así conservan su tipo en lugar de
+    quedar como object con NaN.
+    """
+    frames = [f for f in frames if len(f.columns)]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    columnas = [nombre for nombre in dict.fromkeys(c for f in frames for c in f.columns) if nombre in ESQUEMA]
+    frames = [_completar_columnas(f, columnas) for f in frames]
+
+    resultado = pd.concat(frames, copy=False)
+    for nombre in resultado.columns:
+        partes = [f[nombre] for f in frames if nombre in f.columns]
+        if partes and all(isinstance(p.dtype, pd.CategoricalDtype) for p in partes) and len(partes) == len(frames):
+            resultado[nombre] = union_categoricals([p.array for p in partes], sort_categories=True)
+    return resultado
@@ -0,0 +1,248 @@
+"""
+Cálculo de estadísticas de Cero Referidos
+"""
+import pandas as pd
+
+from esquema import normalizar_dataframe
+
+# Agregaciones por iglesia, todas sumables: una sola pasada de groupby con
+# funciones nativas de pandas (sin lambdas) calcula la tabla por iglesia y de
+# ella salen también los totales generales.
+AGREGACIONES = {
+    'Filas': ('Iglesia', 'size'),
+    'Total Personas': ('Cédula', 'count'),
+    'Contactados': ('Contactado', 'sum'),
+    'En InfoMIRA': ('¿Está en InfoMIRA?', 'sum'),
+    'Referidos Activos': ('Referidos Activos', 'sum'),
+    'Referidos Inactivos': ('Referidos Inactivos', 'sum')
+}
+
+COLUMNAS_POR_IGLESIA = [
+    'Iglesia',
+    'Total Personas',
+    'Contactados',
+    'En InfoMIRA',
+    'Referidos Activos',
+    'Referidos Inactivos',
+    'No Contactados',
+    'Total Referidos'
+]
+
+
+def tabla_por_iglesia(df):
+    """Agregados por iglesia de un DataFrame, incluyendo filas sin iglesia (NaN)"""
+    df = normalizar_dataframe(df)
+    return df.groupby('Iglesia', observed=True, dropna=False).agg(**AGREGACIONES)
+
+
+def resultado_desde_tabla(tabla):
+    """Arma el dict {'general', 'por_iglesia'} a partir de la tabla de agregados"""
+    totales = tabla.sum()
+
+    por_iglesia = tabla[tabla.index.notna()].drop(columns='Filas').reset_index()
+    por_iglesia['Iglesia'] = por_iglesia['Iglesia'].astype(object)
+    por_iglesia['No Contactados'] = por_iglesia['Total Personas'] - por_iglesia['Contactados']
+    por_iglesia['Total Referidos'] = por_iglesia['Referidos Activos'] + por_iglesia['Referidos Inactivos']
+
+    total_personas = int(totales['Filas'])
+    contactados = int(totales['Contactados'])
+    referidos_activos = int(totales['Referidos Activos'])
+    referidos_inactivos = int(totales['Referidos Inactivos'])
+
+    return {
+        'general': {
+            'total_personas': total_personas,
+            'contactados': contactados,
+            'no_contactados': total_personas - contactados,
+            'en_infomira': int(totales['En InfoMIRA']),
+            'referidos_activos': referidos_activos,
+            'referidos_inactivos': referidos_inactivos,
+            'total_referidos': referidos_activos + referidos_inactivos
+        },
+        'por_iglesia': por_iglesia[COLUMNAS_POR_IGLESIA]
+    }
+
+
+def calcular_estadisticas(df):
+    """Estadísticas generales y por iglesia de un DataFrame (None si está vacío)"""
+    if df.empty:
+        return None
+    return resultado_desde_tabla(tabla_por_iglesia(df))
+
+
+class AcumuladorEstadisticas:
+    """Estadísticas calculadas por partes (bloques de filas o fuentes distintas).
+
+    Cada bloque se reduce a su tabla de agregados por iglesia, que es
+    sumable, así que solo se guarda una fila por iglesia sin importar
+    cuántas filas tenga la hoja. resultado() coincide con
+    calcular_estadisticas del DataFrame completo.
+    """
+
+    def __init__(self):
+        self.tabla = None
+
+    def agregar(self, df):
+        """Suma un bloque de filas"""
+        if not df.empty:
+            self._sumar(tabla_por_iglesia(df))
+        return self
+
+    def combinar(self, otro):
+        """Suma lo acumulado por otro acumulador"""
+        if otro.tabla is not None:
+            self._sumar(otro.tabla)
+        return self
+
+    def _sumar(self, tabla):
+        if self.tabla is None:
+            self.tabla = tabla
+            return
+        # Los bloques pueden traer categorías distintas: se agrupa por el nombre como texto
+        tablas = [t.set_axis(t.index.astype(object), axis=0) for t in (self.tabla, tabla)]
+        self.tabla = pd.concat(tablas).groupby(level=0, dropna=False).sum()
+        self.tabla.index.name = 'Iglesia'
+
+    def resultado(self):
+        """Dict {'general', 'por_iglesia'} de todo lo acumulado (None si no hubo filas)"""
+        if self.tabla is None:
+            return None
+        return resultado_desde_tabla(self.tabla)
+
+
+# ============================================================
+# CUBO DE MÉTRICAS DEL DASHBOARD
+# ============================================================
+
+TODAS = 'Todas'
+
+# Columnas que usa construir_cubo (las que no estén en la hoja se omiten)
+COLUMNAS_CUBO = [
+    'Iglesia',
+    'Contactado',
+    'Contestaron',
+    'Respuesta',
+    'Referidos Activos',
+    'Referidos Inactivos',
+    'Cantidad de lideres'
+]
+
+
+def columna_contacto(df):
+    """Columna que indica si el líder contestó ("Contestaron" si existe, sino "Contactado")"""
+    return 'Contestaron' if 'Contestaron' in df.columns else 'Contactado'
+
+
+def _metricas_grupo(fila):
+    total = int(fila['total'])
+    activaron = int(fila['activaron'])
+    return {
+        'total': total,
+        'activaron': activaron,
+        'sin_activar': total - activaron,
+        'referidos_activos': int(fila['referidos_activos']),
+        'referidos_inactivos': int(fila['referidos_inactivos'])
+    }
+
+
+def _metricas_iglesia(contestaron, no_contestaron, respuestas):
+    total_lideres = contestaron['total'] + no_contestaron['total']
+    return {
+        'total_lideres': total_lideres,
+        'lideres_cero_referidos': contestaron['sin_activar'] + no_contestaron['sin_activar'],
+        'contactados': contestaron['total'],
+        'no_contactados': no_contestaron['total'],
+        'contestaron': contestaron,
+        'no_contestaron': no_contestaron,
+        'respuestas': respuestas
+    }
+
+
+def promedio_lideres_cero(df):
+    """Meta de líderes con cero referidos que usa la primera barra del dashboard.
+
+    Solo necesita las columnas Iglesia, Referidos Activos y, si existe,
+    Cantidad de lideres.
+    """
+    # Si la hoja trae la columna "Cantidad de lideres" se usa su promedio
+    if 'Cantidad de lideres' in df.columns:
+        promedio = df['Cantidad de lideres'].mean()
+    else:
+        # Si no, el promedio de líderes con cero referidos por iglesia
+        sin_activar = df['Referidos Activos'] <= 0
+        cero_por_iglesia = sin_activar.groupby(df['Iglesia'], observed=True).sum()
+        promedio = cero_por_iglesia[cero_por_iglesia > 0].mean()
+    return 0 if promedio != promedio else int(promedio)
+
+
+def construir_cubo(df):
+    """Precalcula las métricas del dashboard para cada iglesia y para "Todas".
+
+    Con una agrupación por (Iglesia, contestó) se obtienen conteos de
+    contacto, activación y referidos; con otra, la distribución de
+    Respuesta entre quienes contestaron. Cambiar de iglesia en el dashboard
+    solo consulta este dict, sin tocar los datos fila a fila.
+
+    Devuelve {'iglesias', 'por_iglesia', 'promedio_lideres_cero'}, donde
+    por_iglesia tiene una entrada por iglesia más TODAS.
+    """
+    df = normalizar_dataframe(df)
+    contesto = df[columna_contacto(df)]
+    referidos_activos = df['Referidos Activos']
+
+    base = pd.DataFrame({
+        'Iglesia': df['Iglesia'],
+        'Contesto': contesto,
+        'Activo': referidos_activos > 0,
+        'Referidos Activos': referidos_activos,
+        'Referidos Inactivos': df['Referidos Inactivos']
+    }, copy=False)
+
+    tabla = base.groupby(['Iglesia', 'Contesto'], observed=True).agg(
+        total=('Activo', 'size'),
+        activaron=('Activo', 'sum'),
+        referidos_activos=('Referidos Activos', 'sum'),
+        referidos_inactivos=('Referidos Inactivos', 'sum')
+    )
+
+    # Distribución de respuestas entre quienes contestaron
+    if 'Respuesta' in df.columns:
+        respuestas = (
+            pd.DataFrame({'Iglesia': df['Iglesia'], 'Respuesta': df['Respuesta']}, copy=False)[contesto]
+            .groupby(['Iglesia', 'Respuesta'], observed=True)
+            .size()
+        )
+    else:
+        respuestas = pd.Series(dtype='int64', index=pd.MultiIndex.from_tuples([], names=['Iglesia', 'Respuesta']))
+
+    vacio = pd.Series({'total': 0, 'activaron': 0, 'referidos_activos': 0, 'referidos_inactivos': 0})
+
+    def metricas(tabla_grupo, respuestas_grupo):
+        por_contesto = {bool(c): fila for c, fila in tabla_grupo.iterrows()}
+        ordenadas = respuestas_grupo[respuestas_grupo > 0].sort_values(ascending=False, kind='stable')
+        return _metricas_iglesia(
+            _metricas_grupo(por_contesto.get(True, vacio)),
+            _metricas_grupo(por_contesto.get(False, vacio)),
+            [(str(r), int(n)) for r, n in ordenadas.items()]
+        )
+
+    iglesias = sorted(str(i) for i in tabla.index.get_level_values('Iglesia').unique())
+    por_iglesia = {}
+    for iglesia in iglesias:
+        tabla_iglesia = tabla.xs(iglesia, level='Iglesia')
+        if iglesia in respuestas.index.get_level_values('Iglesia'):
+            respuestas_iglesia = respuestas.xs(iglesia, level='Iglesia')
+        else:
+            respuestas_iglesia = respuestas.iloc[:0].droplevel('Iglesia')
+        por_iglesia[iglesia] = metricas(tabla_iglesia, respuestas_iglesia)
+
+    por_iglesia[TODAS] = metricas(
+        tabla.groupby(level='Contesto').sum(),
+        respuestas.groupby(level='Respuesta', observed=True).sum()
+    )
+
+    return {
+        'iglesias': iglesias,
+        'por_iglesia': por_iglesia,
+        'promedio_lideres_cero': promedio_lideres_cero(df)
+    }
@@ -0,0 +1,142 @@
+"""
+Exportación de un libro de Excel por iglesia (datos + resumen)
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from config import MAX_PROCESOS_EXPORTACION
+from estadisticas import COLUMNAS_POR_IGLESIA
+
+
+def nombre_archivo(iglesia):
+    """Nombre de archivo seguro para el libro de una iglesia"""
+    limpio = re.sub(r'[^\w\- ]+', '', str(iglesia), flags=re.UNICODE).strip()
+    return f"{limpio or 'iglesia'}.xlsx"
+
+
+def nombres_archivo(iglesias):
+    """{iglesia: nombre de archivo} sin repetidos ("IGLESIA #1" e "IGLESIA 1" no pueden pisarse)"""
+    nombres = {}
+    usados = set()
+    for iglesia in iglesias:
+        nombre = nombre_archivo(iglesia)
+        base = nombre[:-len('.xlsx')]
+        numero = 2
+        # Sin distinguir mayúsculas: en Windows y macOS serían el mismo archivo
+        while nombre.lower() in usados:
+            nombre = f"{base} ({numero}).xlsx"
+            numero += 1
+        usados.add(nombre.lower())
+        nombres[iglesia] = nombre
+    return nombres
+
+
+def _celda(valor):
+    # Los SI/NO están como booleanos en el DataFrame; en el Excel se ven como en la hoja
+    if isinstance(valor, bool):
+        return 'SI' if valor else 'NO'
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+        if isinstance(valor, bool):
+            return 'SI' if valor else 'NO'
+    if valor != valor:
+        return None
+    return valor
+
+
+def escribir_libro(ruta, iglesia, datos, resumen):
+    """Escribe el libro de una iglesia con openpyxl en modo write_only.
+
+    Las filas van directo al archivo a medida que se agregan, sin armar el
+    libro en memoria. Hoja "Resumen" con las métricas de la iglesia y hoja
+    "Datos" con sus filas. Se ejecuta en un proceso aparte.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+
+    hoja_resumen = libro.create_sheet("Resumen")
+    hoja_resumen.append(["Iglesia", str(iglesia)])
+    hoja_resumen.append(["Generado", datetime.now().strftime("%Y-%m-%d %H:%M")])
+    hoja_resumen.append([])
+    for metrica, valor in resumen.items():
+        hoja_resumen.append([metrica, _celda(valor)])
+
+    hoja_datos = libro.create_sheet("Datos")
+    hoja_datos.append(list(datos.columns))
+    for fila in datos.itertuples(index=False, name=None):
+        hoja_datos.append([_celda(v) for v in fila])
+
+    libro.save(ruta)
+    return ruta
+
+
+def _resumenes(estadisticas):
+    """{iglesia: {métrica: valor}} a partir de obtener_estadisticas"""
+    tabla = estadisticas['por_iglesia'][COLUMNAS_POR_IGLESIA]
+    return {
+        fila['Iglesia']: {metrica: fila[metrica] for metrica in COLUMNAS_POR_IGLESIA[1:]}
+        for fila in tabla.to_dict('records')
+    }
+
+
+def exportar_iglesias(df, estadisticas, directorio, iglesias=None, max_procesos=MAX_PROCESOS_EXPORTACION):
+    """Escribe un libro por iglesia en `directorio` usando un pool de procesos.
+
+    df son los datos ya cargados y estadisticas el resultado de
+    obtener_estadisticas sobre ellos. Con iglesias se limita a esas. Genera
+    (iglesia, ruta) a medida que cada libro queda listo; las iglesias más
+    grandes se envían primero para repartir mejor la carga.
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    resumenes = _resumenes(estadisticas)
+
+    grupos = [
+        (iglesia, grupo)
+        for iglesia, grupo in df.groupby('Iglesia', observed=True, sort=False)
+        if iglesias is None or iglesia in iglesias
+    ]
+    grupos.sort(key=lambda par: len(par[1]), reverse=True)
+    # Por orden alfabético, así cada iglesia conserva su nombre de una exportación a otra
+    nombres = nombres_archivo(sorted((iglesia for iglesia, _ in grupos), key=str))
+
+    if max_procesos == 1:
+        for iglesia, grupo in grupos:
+            yield iglesia, escribir_libro(directorio / nombres[iglesia], iglesia, grupo, resumenes.get(iglesia, {}))
+        return
+
+    # spawn y no fork: el proceso del dashboard ya tiene hilos (servidor, cola de
+    # escritura, planificador) y un hijo creado con fork puede quedar bloqueado
+    # en un lock que otro hilo tenía tomado
+    with ProcessPoolExecutor(max_workers=max_procesos, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futuros = {
+            pool.submit(escribir_libro, directorio / nombres[iglesia], iglesia, grupo, resumenes.get(iglesia, {})): iglesia
+            for iglesia, grupo in grupos
+        }
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+
+
+def exportar_zip(df, estadisticas, destino, iglesias=None, max_procesos=MAX_PROCESOS_EXPORTACION):
+    """Exporta los libros por iglesia y los empaqueta en un zip.
+
+    destino es una ruta o un archivo abierto en binario (p. ej. io.BytesIO).
+    Cada libro se agrega al zip apenas está listo y se borra del disco, así
+    nunca están todos los libros a la vez ni en memoria ni en disco.
+    Devuelve la cantidad de libros.
+    """
+    cantidad = 0
+    with tempfile.TemporaryDirectory(prefix="cero_referidos_") as temporal:
+        with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+            for _, ruta in exportar_iglesias(df, estadisticas, temporal, iglesias, max_procesos):
+                archivo_zip.write(ruta, arcname=Path(ruta).name)
+                os.remove(ruta)
+                cantidad += 1
+    return cantidad
@@ -0,0 +1,350 @@
+"""
+Historial diario del avance de la campaña (agregados por iglesia y cambios por cédula)
+"""
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from config import HISTORIAL_DIR, CACHE_BLOQUEO_VENCIDO
+from estadisticas import columna_contacto, TODAS
+from esquema import normalizar_dataframe
+from indice_cedulas import normalizar_cedula
+from instrumentacion import contar, instrumentar
+
+# Columnas de seguimiento cuyos cambios se guardan fila a fila. Los datos
+# personales (nombre, celular, observaciones) no entran al historial.
+CAMPOS_HISTORIAL = [
+    'Iglesia',
+    'Contactado',
+    'Fecha Contacto',
+    '¿Está en InfoMIRA?',
+    'Referidos Activos',
+    'Referidos Inactivos',
+    'Contestaron',
+    'Respuesta'
+]
+
+METRICAS = [
+    'lideres',
+    'contactados',
+    'contestaron',
+    'en_infomira',
+    'activaron',
+    'lideres_cero_referidos',
+    'referidos_activos',
+    'referidos_inactivos'
+]
+
+# Valores de 'campo' para las cédulas que aparecen o desaparecen de la hoja
+ALTA = '(alta)'
+BAJA = '(baja)'
+
+
+def _fecha(valor=None):
+    return pd.Timestamp(valor if valor is not None else date.today()).normalize()
+
+
+def _columna_fecha(fecha, filas):
+    # Siempre en ns: pandas concatena mal columnas de fecha con distinta unidad
+    return pd.Series(fecha, index=filas, dtype='datetime64[ns]')
+
+
+def _mes(fecha):
+    return fecha.strftime('%Y-%m')
+
+
+def agregados_del_dia(df, fecha=None):
+    """Una fila por iglesia con las métricas de avance del día"""
+    df = normalizar_dataframe(df)
+    activo = df['Referidos Activos'] > 0
+    base = pd.DataFrame({
+        'iglesia': df['Iglesia'].astype('category'),
+        'contactados': df['Contactado'],
+        'contestaron': df[columna_contacto(df)],
+        'en_infomira': df['¿Está en InfoMIRA?'],
+        'activaron': activo,
+        'referidos_activos': df['Referidos Activos'],
+        'referidos_inactivos': df['Referidos Inactivos']
+    }, copy=False)
+
+    tabla = base.groupby('iglesia', observed=True).agg(
+        lideres=('activaron', 'size'),
+        contactados=('contactados', 'sum'),
+        contestaron=('contestaron', 'sum'),
+        en_infomira=('en_infomira', 'sum'),
+        activaron=('activaron', 'sum'),
+        referidos_activos=('referidos_activos', 'sum'),
+        referidos_inactivos=('referidos_inactivos', 'sum')
+    )
+    tabla['lideres_cero_referidos'] = tabla['lideres'] - tabla['activaron']
+    tabla = tabla[METRICAS].astype('int32').reset_index()
+    tabla['iglesia'] = tabla['iglesia'].astype(str).astype('category')
+    tabla.insert(0, 'fecha', _columna_fecha(_fecha(fecha), tabla.index))
+    return tabla
+
+
+def _a_texto(serie):
+    if serie.dtype == bool:
+        return serie.map({True: 'SI', False: 'NO'})
+    return serie.astype(object).where(serie.notna(), '').astype(str)
+
+
+def estado_por_cedula(df):
+    """Campos de seguimiento como texto (SI/NO como en la hoja), indexados por cédula normalizada"""
+    df = normalizar_dataframe(df)
+    estado = pd.DataFrame({
+        campo: _a_texto(df[campo]) for campo in CAMPOS_HISTORIAL if campo in df.columns
+    })
+    estado.index = pd.Index([normalizar_cedula(c) for c in df['Cédula']], name='cedula')
+    estado = estado[estado.index != '']
+    return estado[~estado.index.duplicated(keep='last')]
+
+
+def diferencias(anterior, actual, fecha=None):
+    """Cambios entre dos estados por cédula, en formato largo.
+
+    Columnas: fecha, cedula, iglesia, campo, anterior, nuevo. Las cédulas
+    nuevas van con campo ALTA y las que ya no están con BAJA.
+    """
+    fecha = _fecha(fecha)
+    partes = []
+
+    altas = actual.index.difference(anterior.index)
+    if len(altas):
+        partes.append(pd.DataFrame({
+            'cedula': altas, 'iglesia': actual.loc[altas, 'Iglesia'].to_numpy(),
+            'campo': ALTA, 'anterior': '', 'nuevo': actual.loc[altas, 'Iglesia'].to_numpy()
+        }))
+
+    bajas = anterior.index.difference(actual.index)
+    if len(bajas):
+        partes.append(pd.DataFrame({
+            'cedula': bajas, 'iglesia': anterior.loc[bajas, 'Iglesia'].to_numpy(),
+            'campo': BAJA, 'anterior': anterior.loc[bajas, 'Iglesia'].to_numpy(), 'nuevo': ''
+        }))
+
+    comunes = actual.index.intersection(anterior.index)
+    antes = anterior.loc[comunes]
+    despues = actual.loc[comunes]
+    for campo in despues.columns:
+        valores_antes = antes[campo] if campo in antes.columns else pd.Series('', index=comunes)
+        cambiaron = (valores_antes != despues[campo]).to_numpy()
+        if cambiaron.any():
+            partes.append(pd.DataFrame({
+                'cedula': comunes[cambiaron], 'iglesia': despues['Iglesia'].to_numpy()[cambiaron],
+                'campo': campo, 'anterior': valores_antes.to_numpy()[cambiaron],
+                'nuevo': despues[campo].to_numpy()[cambiaron]
+            }))
+
+    if not partes:
+        cambios = pd.DataFrame(columns=['cedula', 'iglesia', 'campo', 'anterior', 'nuevo'])
+    else:
+        cambios = pd.concat(partes, ignore_index=True)
+    cambios.insert(0, 'fecha', _columna_fecha(fecha, cambios.index))
+    return cambios.astype({c: 'category' for c in ('iglesia', 'campo', 'anterior', 'nuevo')})
+
+
+class Historial:
+    """Historial en disco, en Parquet comprimido con codificación de diccionario.
+
+    Archivos en el directorio:
+    - agregados/AAAA-MM.parquet: una fila por (fecha, iglesia) con METRICAS.
+    - cambios/AAAA-MM.parquet: cambios por cédula (ver diferencias).
+    - estado.parquet: los campos de seguimiento del último registro, contra
+      el que se calculan los cambios del siguiente.
+    - historial.json: fecha y hora del último registro.
+
+    Los archivos están partidos por mes: registrar un día reescribe solo el
+    mes en curso y una consulta por rango lee solo los meses que cubre.
+    """
+
+    def __init__(self, directorio=HISTORIAL_DIR):
+        self.directorio = Path(directorio)
+        self.ruta_estado = self.directorio / "estado.parquet"
+        self.ruta_meta = self.directorio / "historial.json"
+        self.ruta_bloqueo = self.directorio / "historial.lock"
+
+    # ------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------
+
+    def _escribir(self, df, ruta):
+        """Escribe un Parquet de forma atómica, comprimido y con diccionarios"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.name + '.tmp')
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(tabla, temporal, compression='zstd', use_dictionary=True)
+        os.replace(temporal, ruta)
+
+    def _leer(self, ruta, filtros=None):
+        try:
+            df = pd.read_parquet(ruta, filters=filtros)
+        except (OSError, ValueError):
+            return None
+        if 'fecha' in df.columns:
+            df['fecha'] = df['fecha'].astype('datetime64[ns]')
+        return df
+
+    def _tomar_bloqueo(self):
+        """Lock file con O_EXCL; otra réplica registrando el mismo día lo tiene tomado"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(self.ruta_bloqueo, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.ruta_bloqueo) < CACHE_BLOQUEO_VENCIDO:
+                    return False
+                os.remove(self.ruta_bloqueo)
+            except FileNotFoundError:
+                pass
+            return self._tomar_bloqueo()
+        with os.fdopen(fd, 'w') as f:
+            f.write(f"{os.getpid()} {time.time()}")
+        return True
+
+    def _soltar_bloqueo(self):
+        try:
+            os.remove(self.ruta_bloqueo)
+        except FileNotFoundError:
+            pass
+
+    @instrumentar()
+    def registrar(self, df, fecha=None):
+        """Guarda los agregados del día y los cambios desde el registro anterior.
+
+        Registrar otra vez el mismo día reemplaza los agregados de ese día y
+        agrega los cambios ocurridos desde el registro previo. El primer
+        registro solo guarda el estado de partida, sin cambios. Devuelve
+        {'fecha', 'iglesias', 'cambios'} o None si otro proceso está
+        registrando en ese momento.
+        """
+        fecha = _fecha(fecha)
+        if not self._tomar_bloqueo():
+            return None
+        try:
+            agregados = agregados_del_dia(df, fecha)
+            ruta = self.directorio / "agregados" / f"{_mes(fecha)}.parquet"
+            anteriores = self._leer(ruta)
+            if anteriores is not None:
+                anteriores = anteriores[anteriores['fecha'] != fecha]
+                agregados = pd.concat([anteriores, agregados], ignore_index=True)
+                agregados['iglesia'] = agregados['iglesia'].astype(str).astype('category')
+            self._escribir(agregados.sort_values(['fecha', 'iglesia'], kind='stable'), ruta)
+
+            estado = estado_por_cedula(df)
+            estado_anterior = self._leer(self.ruta_estado)
+            cantidad = 0
+            if estado_anterior is not None:
+                cambios = diferencias(estado_anterior.set_index('cedula'), estado, fecha)
+                cantidad = len(cambios)
+                if cantidad:
+                    ruta = self.directorio / "cambios" / f"{_mes(fecha)}.parquet"
+                    previos = self._leer(ruta)
+                    if previos is not None:
+                        cambios = pd.concat([previos.astype(object), cambios.astype(object)], ignore_index=True)
+                        cambios = cambios.astype({c: 'category' for c in ('iglesia', 'campo', 'anterior', 'nuevo')})
+                    self._escribir(cambios, ruta)
+            self._escribir(estado.reset_index(), self.ruta_estado)
+
+            temporal = self.ruta_meta.with_name(self.ruta_meta.name + '.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'ultimo_dia': fecha.date().isoformat(), 'registrado': time.time()}, f)
+            os.replace(temporal, self.ruta_meta)
+        finally:
+            self._soltar_bloqueo()
+
+        contar('historial.registros')
+        return {'fecha': fecha.date().isoformat(), 'iglesias': int(agregados['fecha'].eq(fecha).sum()), 'cambios': cantidad}
+
+    def ultimo_dia(self):
+        """Fecha (texto AAAA-MM-DD) del último registro o None"""
+        try:
+            with open(self.ruta_meta, encoding='utf-8') as f:
+                return json.load(f).get('ultimo_dia')
+        except (OSError, ValueError):
+            return None
+
+    def registrado_hoy(self):
+        return self.ultimo_dia() == date.today().isoformat()
+
+    # ------------------------------------------------------------
+    # Consultas (sin tocar la API de Sheets)
+    # ------------------------------------------------------------
+
+    def _rango(self, carpeta, desde, hasta, filtros):
+        """Concatena los meses de la carpeta que cubren [desde, hasta]"""
+        desde = _fecha(desde) if desde is not None else None
+        hasta = _fecha(hasta) if hasta is not None else None
+        filtros = list(filtros)
+        if desde is not None:
+            filtros.append(('fecha', '>=', desde))
+        if hasta is not None:
+            filtros.append(('fecha', '<=', hasta))
+
+        partes = []
+        for ruta in sorted((self.directorio / carpeta).glob("*.parquet")):
+            mes = ruta.stem
+            if (desde is not None and mes < _mes(desde)) or (hasta is not None and mes > _mes(hasta)):
+                continue
+            parte = self._leer(ruta, filtros or None)
+            if parte is not None and not parte.empty:
+                partes.append(parte.astype({c: object for c in parte.columns if isinstance(parte[c].dtype, pd.CategoricalDtype)}))
+        if not partes:
+            return None
+        return pd.concat(partes, ignore_index=True)
+
+    @instrumentar()
+    def agregados(self, desde=None, hasta=None, iglesias=None):
+        """Agregados diarios por iglesia en el rango (fechas inclusive)"""
+        filtros = [('iglesia', 'in', list(iglesias))] if iglesias else []
+        df = self._rango("agregados", desde, hasta, filtros)
+        if df is None:
+            return pd.DataFrame(columns=['fecha', 'iglesia'] + METRICAS)
+        return df
+
+    def tendencia(self, iglesia=None, metricas=None, desde=None, hasta=None):
+        """Serie diaria de las métricas (índice fecha, una columna por métrica).
+
+        Sin iglesia (o con TODAS) suma todas las iglesias de cada día.
+        """
+        metricas = metricas or METRICAS
+        una = iglesia is not None and iglesia != TODAS
+        df = self.agregados(desde, hasta, [iglesia] if una else None)
+        if df.empty:
+            return pd.DataFrame(columns=metricas, index=pd.DatetimeIndex([], name='fecha'))
+        return df.groupby('fecha')[metricas].sum().sort_index()
+
+    def variacion(self, desde, hasta=None):
+        """Cuánto cambió cada métrica por iglesia entre el primer y el último día del rango"""
+        df = self.agregados(desde, hasta)
+        if df.empty:
+            return pd.DataFrame(columns=['iglesia'] + METRICAS)
+        df = df.sort_values('fecha', kind='stable')
+        por_iglesia = df.groupby('iglesia')[METRICAS]
+        return (por_iglesia.last() - por_iglesia.first()).reset_index()
+
+    @instrumentar()
+    def cambios(self, desde=None, hasta=None, cedula=None, iglesia=None, campo=None):
+        """Cambios por cédula en el rango, opcionalmente de una cédula, iglesia o campo"""
+        filtros = []
+        if cedula is not None:
+            filtros.append(('cedula', '=', normalizar_cedula(cedula)))
+        if iglesia is not None and iglesia != TODAS:
+            filtros.append(('iglesia', '=', iglesia))
+        if campo is not None:
+            filtros.append(('campo', '=', campo))
+        df = self._rango("cambios", desde, hasta, filtros)
+        if df is None:
+            return pd.DataFrame(columns=['fecha', 'cedula', 'iglesia', 'campo', 'anterior', 'nuevo'])
+        return df
+
+    def tamano_en_disco(self):
+        """Bytes que ocupa el historial"""
+        return sum(ruta.stat().st_size for ruta in self.directorio.rglob("*.parquet"))
@@ -0,0 +1,235 @@
+"""
+Importación masiva de listados de líderes (Excel o CSV) a la hoja de Datos
+"""
+import csv
+import unicodedata
+from datetime import date, datetime
+from pathlib import Path
+
+from config import COLUMNAS, ENCABEZADOS
+from indice_cedulas import normalizar_cedula
+from sheets_manager import CAMPOS_ACTUALIZABLES, TAMANO_LOTE_ESCRITURA
+
+# Otros nombres de columna que aparecen en los listados de las campañas
+ALIAS_ENCABEZADOS = {
+    'cc': 'cedula',
+    'documento': 'cedula',
+    'numerodocumento': 'cedula',
+    'nodocumento': 'cedula',
+    'nocedula': 'cedula',
+    'numerocedula': 'cedula',
+    'numerodeidentificacion': 'cedula',
+    'identificacion': 'cedula',
+    'nombres': 'nombre',
+    'nombrecompleto': 'nombre',
+    'telefono': 'celular',
+    'movil': 'celular',
+    'fecha': 'fecha_contacto',
+    'infomira': 'esta_en_infomira'
+}
+
+# Campos SI/NO: en Excel suelen venir como casillas (TRUE/FALSE) o con tilde
+CAMPOS_SI_NO = ('contactado', 'esta_en_infomira')
+VALORES_SI = {'SI', 'SÍ', 'S', 'X', 'TRUE', 'VERDADERO', '1'}
+
+# Filas que se revisan buscando los encabezados (los listados suelen traer títulos arriba)
+MAX_FILAS_ANTES_DE_ENCABEZADOS = 20
+
+# Errores que se guardan con detalle; del resto solo se lleva la cuenta
+MAX_ERRORES_DETALLE = 100
+
+
+def _clave_encabezado(texto):
+    """Encabezado sin tildes, mayúsculas, espacios ni signos: '¿Está en InfoMIRA?' -> 'estaeninfomira'"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode('ascii')
+    return ''.join(c for c in texto.lower() if c.isalnum())
+
+
+def _encabezados_conocidos():
+    conocidos = dict(ALIAS_ENCABEZADOS)
+    for clave in COLUMNAS:
+        campo = clave.lower()
+        conocidos[_clave_encabezado(ENCABEZADOS[clave])] = campo
+        conocidos[_clave_encabezado(campo)] = campo
+    return conocidos
+
+
+def mapear_encabezados(encabezados):
+    """Devuelve {posición de la columna en el archivo: campo} para las columnas reconocidas"""
+    conocidos = _encabezados_conocidos()
+    mapeo = {}
+    for posicion, encabezado in enumerate(encabezados):
+        campo = conocidos.get(_clave_encabezado(encabezado))
+        if campo and campo not in mapeo.values():
+            mapeo[posicion] = campo
+    return mapeo
+
+
+def _valor(valor):
+    """Valor de una celda del archivo listo para la hoja ('' si está vacía)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.date().isoformat() if valor.time() == datetime.min.time() else valor.isoformat(sep=' ')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str):
+        return valor.strip()
+    return valor
+
+
+def filas_xlsx(ruta, hoja=None):
+    """Recorre las filas de un .xlsx en modo read_only (sin cargar el libro en memoria)"""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        worksheet = libro[hoja] if hoja else libro.active
+        for fila in worksheet.iter_rows(values_only=True):
+            yield list(fila)
+    finally:
+        libro.close()
+
+
+def filas_csv(ruta, encoding='utf-8-sig'):
+    """Recorre las filas de un CSV detectando el separador (coma o punto y coma)"""
+    with open(ruta, newline='', encoding=encoding) as f:
+        muestra = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(f, dialecto)
+
+
+def leer_archivo(ruta, hoja=None):
+    """Filas de un .xlsx/.xlsm o .csv según la extensión"""
+    extension = Path(ruta).suffix.lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return filas_xlsx(ruta, hoja)
+    if extension in ('.csv', '.txt'):
+        return filas_csv(ruta)
+    raise ValueError(f"Formato no soportado: {extension} (use .xlsx o .csv)")
+
+
+def registros(filas):
+    """Convierte las filas del archivo en dicts de persona.
+
+    La fila de encabezados es la primera que tiene una columna de cédula
+    reconocible; lo que está encima (títulos) se ignora. Devuelve pares
+    (número de fila en el archivo, dict) y omite las filas vacías.
+    """
+    mapeo = None
+    for numero, fila in enumerate(filas, start=1):
+        valores = [_valor(v) for v in fila]
+        if not any(v != '' for v in valores):
+            continue
+        if mapeo is None:
+            candidato = mapear_encabezados(valores)
+            if 'cedula' in candidato.values():
+                mapeo = candidato
+            elif numero >= MAX_FILAS_ANTES_DE_ENCABEZADOS:
+                raise ValueError("El archivo no tiene una columna de cédula reconocible")
+            continue
+
+        datos = {
+            campo: valores[posicion]
+            for posicion, campo in mapeo.items()
+            if posicion < len(valores) and valores[posicion] != ''
+        }
+        for campo in CAMPOS_SI_NO:
+            if campo in datos:
+                datos[campo] = _si_no(datos[campo])
+        yield numero, datos
+
+
+def _si_no(valor):
+    if isinstance(valor, str):
+        return 'SI' if valor.upper() in VALORES_SI else 'NO'
+    return 'SI' if valor else 'NO'
+
+
+def _anotar_error(resumen, numero, cedula, error):
+    resumen['errores'] += 1
+    if len(resumen['detalle_errores']) < MAX_ERRORES_DETALLE:
+        resumen['detalle_errores'].append({'fila': numero, 'cedula': cedula, 'error': error})
+
+
+def _procesar_lote(manager, lote, hoja, resumen):
+    """Decide por cédula entre agregar y actualizar, y escribe el lote"""
+    indice = manager._indice(hoja)
+    cedulas = [normalizar_cedula(datos['cedula']) for _, datos in lote]
+    filas = indice.buscar_varias(cedulas)
+
+    # Una cédula repetida dentro del lote se agrega una sola vez con los datos combinados
+    nuevas = {}
+    actualizaciones = []
+    for (numero, datos), cedula, fila in zip(lote, cedulas, filas):
+        datos = dict(datos, cedula=cedula)
+        if fila is not None:
+            cambios = {campo: datos[campo] for campo in CAMPOS_ACTUALIZABLES if campo in datos}
+            if cambios:
+                actualizaciones.append((numero, dict(cambios, cedula=cedula)))
+            else:
+                resumen['sin_cambios'] += 1
+        elif cedula in nuevas:
+            nuevas[cedula][1].update(datos)
+            resumen['sin_cambios'] += 1
+        else:
+            nuevas[cedula] = (numero, datos)
+
+    if nuevas:
+        pendientes = list(nuevas.values())
+        for (numero, datos), resultado in zip(pendientes, manager.agregar_personas([d for _, d in pendientes], hoja=hoja)):
+            if resultado['exito']:
+                resumen['agregadas'] += 1
+            else:
+                _anotar_error(resumen, numero, datos['cedula'], resultado['error'])
+
+    if actualizaciones:
+        for (numero, datos), resultado in zip(actualizaciones, manager.actualizar_personas([d for _, d in actualizaciones], hoja=hoja)):
+            if resultado['exito']:
+                resumen['actualizadas'] += 1
+            else:
+                _anotar_error(resumen, numero, datos['cedula'], resultado['error'])
+
+
+def importar(manager, ruta, hoja="Datos", hoja_archivo=None, tamano_lote=TAMANO_LOTE_ESCRITURA, al_avanzar=None):
+    """Importa un listado de líderes a la hoja de Datos.
+
+    El archivo se lee fila a fila y se escribe por lotes de tamano_lote: en
+    memoria solo está el lote actual, así que sirve para archivos de cientos
+    de miles de filas. Cada cédula que ya está en la hoja actualiza sus
+    campos de seguimiento (CAMPOS_ACTUALIZABLES); las demás se agregan con
+    append_rows. Las filas sin cédula se omiten.
+
+    al_avanzar(resumen) se llama después de cada lote. Devuelve el resumen:
+    {'leidas', 'agregadas', 'actualizadas', 'sin_cambios', 'omitidas',
+    'errores', 'detalle_errores'}.
+    """
+    resumen = {
+        'leidas': 0, 'agregadas': 0, 'actualizadas': 0, 'sin_cambios': 0,
+        'omitidas': 0, 'errores': 0, 'detalle_errores': []
+    }
+
+    lote = []
+    for numero, datos in registros(leer_archivo(ruta, hoja_archivo)):
+        resumen['leidas'] += 1
+        if not normalizar_cedula(datos.get('cedula')):
+            resumen['omitidas'] += 1
+            continue
+        lote.append((numero, datos))
+        if len(lote) >= tamano_lote:
+            _procesar_lote(manager, lote, hoja, resumen)
+            lote = []
+            if al_avanzar:
+                al_avanzar(resumen)
+
+    if lote:
+        _procesar_lote(manager, lote, hoja, resumen)
+        if al_avanzar:
+            al_avanzar(resumen)
+    return resumen
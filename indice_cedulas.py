@@ -0,0 +1,142 @@
+"""
+Índice en memoria cédula → fila para la hoja de Datos
+"""
+import threading
+import time
+
+from config import COLUMNAS, INDICE_CEDULAS_TTL, MAX_RANGOS_POR_SOLICITUD
+from lectura import letra_columna, tramos_de_columnas, unir_tramos
+
+# Tras una búsqueda fallida no se relee la columna más de una vez por este intervalo
+SEGUNDOS_ENTRE_RECARGAS = 1.0
+
+
+def normalizar_cedula(cedula):
+    """Representación de texto de una cédula, igual a como se lee de la hoja"""
+    if cedula is None:
+        return ''
+    if hasattr(cedula, 'item'):
+        cedula = cedula.item()
+    if isinstance(cedula, float):
+        if cedula != cedula:
+            return ''
+        if cedula.is_integer():
+            cedula = int(cedula)
+    return str(cedula).strip()
+
+
+class IndiceCedulas:
+    """Mapea cada cédula a su fila leyendo una sola vez la columna Cédula.
+
+    Las búsquedas son O(1) y solo miran esa columna (un número en Celular u
+    Observaciones nunca coincide). Las filas agregadas por el manager se
+    registran sin volver a leer; el índice se recarga (otra lectura de la
+    columna, no de la hoja completa) cuando supera su TTL o cuando una cédula
+    no aparece y el índice ya no es reciente.
+    """
+
+    def __init__(self, worksheet, ttl=INDICE_CEDULAS_TTL):
+        self.worksheet = worksheet
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._filas = {}
+        self._ultima_fila = 1
+        self._cargado_en = None
+
+    def cargar(self):
+        """Relee la columna Cédula y reconstruye el índice"""
+        columna = self.worksheet.col_values(COLUMNAS['CEDULA'] + 1)
+        filas = {}
+        for fila, valor in enumerate(columna[1:], start=2):
+            cedula = normalizar_cedula(valor)
+            if cedula:
+                # Si hay duplicados se conserva la primera fila, como hacía find
+                filas.setdefault(cedula, fila)
+
+        with self._lock:
+            self._filas = filas
+            self._ultima_fila = max(len(columna), 1)
+            self._cargado_en = time.monotonic()
+
+    def invalidar(self):
+        """Marca el índice como vencido; la próxima búsqueda lo recarga"""
+        with self._lock:
+            self._cargado_en = None
+
+    def _edad(self):
+        if self._cargado_en is None:
+            return None
+        return time.monotonic() - self._cargado_en
+
+    def _asegurar_vigente(self):
+        edad = self._edad()
+        if edad is None or edad > self.ttl:
+            self.cargar()
+
+    def buscar(self, cedula):
+        """Devuelve la fila (1-indexada) de la cédula o None si no existe"""
+        return self.buscar_varias([cedula])[0]
+
+    def buscar_varias(self, cedulas):
+        """Como buscar, pero recarga como máximo una vez para todo el grupo"""
+        cedulas = [normalizar_cedula(c) for c in cedulas]
+        with self._lock:
+            self._asegurar_vigente()
+            filas = [self._filas.get(c) for c in cedulas]
+
+            # Alguna cédula pudo agregarse desde otro lado después de cargar
+            if None in filas and self._edad() > SEGUNDOS_ENTRE_RECARGAS:
+                self.cargar()
+                filas = [self._filas.get(c) for c in cedulas]
+
+        return filas
+
+    def verificar(self, cedulas, filas):
+        """Comprueba con una sola lectura que cada cédula sigue en su fila.
+
+        Sirve para detectar filas insertadas o borradas por otros editores
+        antes de escribir. Si algo no coincide el índice queda vencido. Las
+        filas se piden como tramos de la columna Cédula, unidos hasta
+        MAX_RANGOS_POR_SOLICITUD para que la URL de la solicitud no crezca
+        con el tamaño del lote.
+        """
+        pares = [(normalizar_cedula(c), f) for c, f in zip(cedulas, filas) if f]
+        if not pares:
+            return True
+
+        letra = letra_columna(COLUMNAS['CEDULA'] + 1)
+        tramos = unir_tramos(tramos_de_columnas(f for _, f in pares), MAX_RANGOS_POR_SOLICITUD)
+        valores = self.worksheet.batch_get([f"{letra}{inicio}:{letra}{fin}" for inicio, fin in tramos])
+
+        leidas = {}
+        for (inicio, _), tramo in zip(tramos, valores):
+            for fila, valor in enumerate(tramo, start=inicio):
+                leidas[fila] = normalizar_cedula(valor[0]) if valor else ''
+        for cedula, fila in pares:
+            if leidas.get(fila, '') != cedula:
+                self.invalidar()
+                return False
+        return True
+
+    def registrar(self, cedula, fila):
+        """Agrega al índice una fila recién escrita por el manager"""
+        cedula = normalizar_cedula(cedula)
+        with self._lock:
+            if self._cargado_en is None:
+                return
+            if cedula:
+                self._filas.setdefault(cedula, fila)
+            self._ultima_fila = max(self._ultima_fila, fila)
+
+    @property
+    def ultima_fila(self):
+        """Última fila con datos conocida por el índice"""
+        with self._lock:
+            return self._ultima_fila
+
+    def __len__(self):
+        with self._lock:
+            return len(self._filas)
+
+    def __contains__(self, cedula):
+        return self.buscar(cedula) is not None
@@ -0,0 +1,150 @@
+"""
+Instrumentación: tiempos, filas, bytes, aciertos de cache y solicitudes a la API
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import INSTRUMENTACION_ACTIVA
+
+logger = logging.getLogger(__name__)
+
+
+class Registro:
+    """Acumula las mediciones del proceso.
+
+    Por cada operación guarda llamadas, errores, segundos (total y máximo),
+    filas y bytes; además lleva contadores sueltos (aciertos y fallos de
+    cache, solicitudes a la API por método, reintentos...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operaciones = {}
+        self._contadores = Counter()
+        self._desde = datetime.now(timezone.utc)
+
+    def registrar(self, nombre, segundos, filas=None, bytes=None, error=False):
+        with self._lock:
+            operacion = self._operaciones.get(nombre)
+            if operacion is None:
+                operacion = self._operaciones[nombre] = {
+                    'llamadas': 0, 'errores': 0, 'segundos': 0.0, 'maximo': 0.0,
+                    'ultimo': 0.0, 'filas': 0, 'bytes': 0
+                }
+            operacion['llamadas'] += 1
+            operacion['errores'] += int(error)
+            operacion['segundos'] += segundos
+            operacion['maximo'] = max(operacion['maximo'], segundos)
+            operacion['ultimo'] = segundos
+            operacion['filas'] += filas or 0
+            operacion['bytes'] += bytes or 0
+
+    def contar(self, nombre, cantidad=1):
+        with self._lock:
+            self._contadores[nombre] += cantidad
+
+    def resumen(self):
+        """Copia de todo lo medido, serializable a JSON"""
+        with self._lock:
+            return {
+                'desde': self._desde.isoformat(timespec='seconds'),
+                'generado': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'operaciones': {nombre: dict(datos) for nombre, datos in sorted(self._operaciones.items())},
+                'contadores': dict(sorted(self._contadores.items()))
+            }
+
+    def reiniciar(self):
+        with self._lock:
+            self._operaciones.clear()
+            self._contadores.clear()
+            self._desde = datetime.now(timezone.utc)
+
+
+# Registro compartido por todo el proceso
+registro = Registro()
+
+
+def registrar(nombre, segundos, filas=None, bytes=None, error=False):
+    if INSTRUMENTACION_ACTIVA:
+        registro.registrar(nombre, segundos, filas, bytes, error)
+
+
+def contar(nombre, cantidad=1):
+    if INSTRUMENTACION_ACTIVA:
+        registro.contar(nombre, cantidad)
+
+
+def tamano(resultado):
+    """(filas, bytes) de un resultado: DataFrames con su memoria, listas con su largo"""
+    if hasattr(resultado, 'memory_usage'):
+        return len(resultado), int(resultado.memory_usage(index=False).sum())
+    if isinstance(resultado, tuple) and resultado and hasattr(resultado[0], 'memory_usage'):
+        return tamano(resultado[0])
+    if isinstance(resultado, list):
+        return len(resultado), None
+    return None, None
+
+
+@contextmanager
+def medir(nombre):
+    """Mide el bloque. Se puede anotar 'filas' y 'bytes' en el dict que entrega"""
+    datos = {}
+    inicio = time.perf_counter()
+    error = False
+    try:
+        yield datos
+    except BaseException:
+        error = True
+        raise
+    finally:
+        registrar(nombre, time.perf_counter() - inicio, datos.get('filas'), datos.get('bytes'), error)
+
+
+def instrumentar(nombre=None):
+    """Decorador que mide cada llamada; las filas y bytes salen del valor devuelto"""
+    def decorador(funcion):
+        clave = nombre or f"{funcion.__module__}.{funcion.__qualname__}"
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not INSTRUMENTACION_ACTIVA:
+                return funcion(*args, **kwargs)
+            with medir(clave) as datos:
+                resultado = funcion(*args, **kwargs)
+                datos['filas'], datos['bytes'] = tamano(resultado)
+                return resultado
+        return envoltura
+    return decorador
+
+
+class Cronometro:
+    """Mide tramos consecutivos de una función sin reindentar su código.
+
+    Cada marcar(tramo) registra el tiempo desde la marca anterior como
+    '{prefijo}.{tramo}'.
+    """
+
+    def __init__(self, prefijo):
+        self.prefijo = prefijo
+        self._anterior = time.perf_counter()
+
+    def marcar(self, tramo):
+        ahora = time.perf_counter()
+        registrar(f"{self.prefijo}.{tramo}", ahora - self._anterior)
+        self._anterior = ahora
+
+
+def exportar_json(indent=None):
+    """Todo lo medido como texto JSON (para descargar o para un scraper)"""
+    return json.dumps(registro.resumen(), ensure_ascii=False, indent=indent)
+
+
+def registrar_en_log(nivel=logging.INFO):
+    """Escribe lo medido en el log como una línea JSON"""
+    logger.log(nivel, "instrumentacion %s", exportar_json())
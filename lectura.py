@@ -0,0 +1,179 @@
+"""
+Lectura de hojas grandes por bloques de filas en paralelo
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from config import TAMANO_BLOQUE_LECTURA, MAX_HILOS_LECTURA, MAX_RANGOS_POR_SOLICITUD
+from esquema import construir_dataframe, concatenar
+from instrumentacion import instrumentar
+
+
+def letra_columna(columna):
+    """Letra de una columna (1-indexada) en notación A1"""
+    return rowcol_to_a1(1, columna)[:-1]
+
+
+def rangos_por_bloques(total_filas, total_columnas, tamano_bloque, fila_inicial=2):
+    """Divide las filas de datos en rangos A1 de tamano_bloque filas.
+
+    El último rango queda abierto (sin fila final) para incluir filas
+    agregadas después de leer las dimensiones de la hoja.
+    Devuelve una lista de (fila de inicio, rango).
+    """
+    ultima_col = letra_columna(max(total_columnas, 1))
+    rangos = []
+    inicio = fila_inicial
+    while True:
+        fin = inicio + tamano_bloque - 1
+        if fin >= total_filas:
+            rangos.append((inicio, f"A{inicio}:{ultima_col}"))
+            return rangos
+        rangos.append((inicio, f"A{inicio}:{ultima_col}{fin}"))
+        inicio = fin + 1
+
+
+def _leer_encabezados(worksheet):
+    primera = worksheet.get_values('1:1')
+    return [str(e).strip() for e in primera[0]] if primera else []
+
+
+@instrumentar()
+def leer_hoja(worksheet, tamano_bloque=TAMANO_BLOQUE_LECTURA, max_hilos=MAX_HILOS_LECTURA):
+    """Lee una hoja completa y la devuelve tipada.
+
+    Las hojas con más de tamano_bloque filas se leen por bloques: los
+    encabezados primero y luego los bloques de filas en paralelo, con un
+    pool acotado de hilos (cada solicitud pasa por el planificador, que
+    respeta la cuota). Cada bloque se convierte en columnas tipadas apenas
+    llega, mientras los demás siguen descargándose, y al final se
+    concatenan. Las hojas chicas se leen con un solo get_values.
+
+    Devuelve (df indexado por número de fila, encabezados, última fila con datos).
+    """
+    if worksheet.row_count <= tamano_bloque + 1:
+        valores = worksheet.get_values()
+        if not valores:
+            return pd.DataFrame(), [], 1
+        encabezados = [str(e).strip() for e in valores[0]]
+        return construir_dataframe(encabezados, valores[1:], fila_inicial=2), encabezados, len(valores)
+
+    encabezados = _leer_encabezados(worksheet)
+    if not encabezados:
+        return pd.DataFrame(), [], 1
+
+    bloques = rangos_por_bloques(worksheet.row_count, len(encabezados), tamano_bloque)
+    frames = []
+    ultima_fila = 1
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        futuros = [(inicio, pool.submit(worksheet.get_values, rango)) for inicio, rango in bloques]
+        for inicio, futuro in futuros:
+            valores = futuro.result()
+            if valores:
+                frames.append(construir_dataframe(encabezados, valores, fila_inicial=inicio))
+                ultima_fila = inicio + len(valores) - 1
+
+    if not frames:
+        return construir_dataframe(encabezados, [], fila_inicial=2), encabezados, ultima_fila
+    return concatenar(frames), encabezados, ultima_fila
+
+
+def iterar_hoja(worksheet, tamano_bloque=TAMANO_BLOQUE_LECTURA):
+    """Recorre la hoja por bloques de tamano_bloque filas, devolviendo DataFrames tipados.
+
+    Solo hay en memoria el bloque actual y el siguiente, que se descarga
+    mientras se procesa el actual. Cada bloque conserva como índice el
+    número de fila en la hoja; los bloques vacíos se omiten.
+    """
+    encabezados = _leer_encabezados(worksheet)
+    if not encabezados:
+        return
+
+    bloques = rangos_por_bloques(worksheet.row_count, len(encabezados), tamano_bloque)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        siguiente = pool.submit(worksheet.get_values, bloques[0][1])
+        for i, (inicio, _) in enumerate(bloques):
+            valores = siguiente.result()
+            if i + 1 < len(bloques):
+                siguiente = pool.submit(worksheet.get_values, bloques[i + 1][1])
+            if valores:
+                yield construir_dataframe(encabezados, valores, fila_inicial=inicio)
+
+
+def tramos_de_columnas(posiciones):
+    """Agrupa posiciones de columna (0-indexadas) en tramos contiguos (inicio, fin)"""
+    tramos = []
+    for posicion in sorted(set(posiciones)):
+        if tramos and tramos[-1][1] == posicion - 1:
+            tramos[-1] = (tramos[-1][0], posicion)
+        else:
+            tramos.append((posicion, posicion))
+    return tramos
+
+
+def unir_tramos(tramos, maximo):
+    """Une tramos de filas (inicio, fin) saltando los huecos más chicos hasta dejar `maximo`"""
+    tramos = sorted(tramos)
+    if len(tramos) <= maximo:
+        return tramos
+    # Se conservan como cortes los maximo - 1 huecos más grandes
+    huecos = sorted(range(len(tramos) - 1), key=lambda i: tramos[i + 1][0] - tramos[i][1])
+    cortes = set(huecos[len(huecos) - (maximo - 1):]) if maximo > 1 else set()
+    unidos = [tramos[0]]
+    for i, (inicio, fin) in enumerate(tramos[1:]):
+        if i in cortes:
+            unidos.append((inicio, fin))
+        else:
+            unidos[-1] = (unidos[-1][0], fin)
+    return unidos
+
+
+def _rellenar(valores, filas, ancho):
+    """Matriz de filas x ancho a partir de lo que devuelve la API (sin relleno)"""
+    valores = list(valores)[:filas]
+    return [list(f) + [''] * (ancho - len(f)) for f in valores] + [[''] * ancho] * (filas - len(valores))
+
+
+@instrumentar()
+def leer_tramos(worksheet, encabezados, tramos_filas, columnas=None,
+                max_rangos=MAX_RANGOS_POR_SOLICITUD, max_hilos=MAX_HILOS_LECTURA):
+    """Lee solo algunas filas y columnas de una hoja y las devuelve tipadas.
+
+    tramos_filas es una lista de (primera fila, última fila) y columnas los
+    encabezados pedidos (todos si es None; los que no están en la hoja se
+    omiten). Cada tramo de filas se pide por cada tramo de columnas
+    contiguas, en solicitudes batch_get de hasta max_rangos rangos que van
+    en paralelo, como máximo max_hilos solicitudes. Si hay más tramos de
+    los que caben, se unen los separados por menos filas: el resultado
+    puede traer filas de más (las de los huecos) y el que llama las filtra.
+    Devuelve un DataFrame indexado por número de fila, con las columnas en
+    el orden de la hoja.
+    """
+    posiciones = [i for i, e in enumerate(encabezados) if columnas is None or e in columnas]
+    tramos_columnas = tramos_de_columnas(posiciones)
+    pedidos = [encabezados[i] for i in sorted(set(posiciones))]
+    if not tramos_filas or not tramos_columnas:
+        return construir_dataframe(pedidos, [], fila_inicial=2)
+
+    tramos_filas = unir_tramos(tramos_filas, max(1, max_rangos * max_hilos // len(tramos_columnas)))
+    rangos = [
+        f"{letra_columna(c_ini + 1)}{f_ini}:{letra_columna(c_fin + 1)}{f_fin}"
+        for f_ini, f_fin in tramos_filas
+        for c_ini, c_fin in tramos_columnas
+    ]
+    grupos = [rangos[i:i + max_rangos] for i in range(0, len(rangos), max_rangos)]
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        respuestas = [v for valores in pool.map(worksheet.batch_get, grupos) for v in valores]
+
+    frames = []
+    for numero, (f_ini, f_fin) in enumerate(tramos_filas):
+        cantidad = f_fin - f_ini + 1
+        partes = [
+            _rellenar(respuestas[numero * len(tramos_columnas) + j], cantidad, c_fin - c_ini + 1)
+            for j, (c_ini, c_fin) in enumerate(tramos_columnas)
+        ]
+        filas = [sum(fila, []) for fila in zip(*partes)]
+        frames.append(construir_dataframe(pedidos, filas, fila_inicial=f_ini))
+    return concatenar(frames)
@@ -0,0 +1,261 @@
+"""
+Planificador de solicitudes a la API de Google Sheets
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import gspread
+import requests
+
+from config import (
+    CUOTA_LECTURAS_POR_MINUTO,
+    CUOTA_ESCRITURAS_POR_MINUTO,
+    RAFAGA_SOLICITUDES,
+    REINTENTOS_API,
+    ESPERA_BASE_REINTENTO,
+    ESPERA_MAXIMA_REINTENTO
+)
+from instrumentacion import contar, medir
+
+# Códigos HTTP que indican cuota agotada o un error transitorio del servidor
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Métodos de gspread que solo leen; se pueden coalescer y usan la cuota de lectura
+METODOS_LECTURA = {
+    'open_by_key', 'open', 'worksheet', 'worksheets', 'get_worksheet', 'fetch_sheet_metadata',
+    'get_lastUpdateTime', 'get_file_drive_metadata', 'values_get', 'values_batch_get',
+    'get', 'get_values', 'get_all_values', 'get_all_records', 'batch_get',
+    'col_values', 'row_values', 'acell', 'cell', 'find', 'findall', 'range'
+}
+
+# Escrituras que no se pueden repetir sin efecto: un 5xx o un timeout pueden
+# llegar después de que Sheets ya aplicó la solicitud, y repetir un append
+# duplicaría filas. Solo se reintentan ante un 429, que se rechaza antes de
+# aplicar nada. Las demás escrituras (update, batch_update...) son idempotentes.
+METODOS_NO_IDEMPOTENTES = {
+    'append_row', 'append_rows', 'insert_row', 'insert_rows', 'insert_cols',
+    'delete_rows', 'delete_columns', 'add_worksheet', 'duplicate_sheet', 'create', 'copy'
+}
+
+
+def codigo_http(error):
+    """Código HTTP de un error de la API (None si no es un error HTTP)"""
+    codigo = getattr(error, 'code', None)
+    if isinstance(codigo, int):
+        return codigo
+    respuesta = getattr(error, 'response', None)
+    return getattr(respuesta, 'status_code', None)
+
+
+def es_reintentable(error, idempotente=True):
+    """Indica si vale la pena reintentar la solicitud que produjo el error"""
+    if not idempotente:
+        return codigo_http(error) == 429
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return codigo_http(error) in CODIGOS_REINTENTABLES
+
+
+def _espera_sugerida(error):
+    """Segundos del encabezado Retry-After, si la respuesta lo trae"""
+    respuesta = getattr(error, 'response', None)
+    encabezados = getattr(respuesta, 'headers', None) or {}
+    try:
+        return float(encabezados.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class CubetaTokens:
+    """Token bucket: permite ráfagas de `capacidad` y un ritmo sostenido de `tasa` por segundo"""
+
+    def __init__(self, tasa, capacidad, reloj=time.monotonic, dormir=time.sleep):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.reloj = reloj
+        self.dormir = dormir
+        self._tokens = capacidad
+        self._ultimo = reloj()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Toma un token, esperando lo necesario si no hay disponibles"""
+        while True:
+            with self._lock:
+                ahora = self.reloj()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            self.dormir(espera)
+
+
+def _cubeta_por_minuto(cuota, rafaga):
+    # El ritmo sostenido descuenta la ráfaga: en cualquier minuto no se superan `cuota` solicitudes
+    rafaga = min(rafaga, cuota)
+    return CubetaTokens(tasa=max(cuota - rafaga, 1) / 60, capacidad=rafaga)
+
+
+class Planificador:
+    """Ejecuta las llamadas a la API respetando la cuota, con reintentos y coalescencia.
+
+    - Cada llamada toma un token de la cubeta de lectura o de escritura.
+    - Los errores 429/5xx y de red se reintentan con espera exponencial y
+      jitter (respetando Retry-After si viene); las escrituras no
+      idempotentes (appends), solo ante un 429.
+    - Las lecturas con la misma clave que ya están en curso no se repiten:
+      todas las llamadas esperan y reciben el resultado de la primera.
+    """
+
+    def __init__(self, lecturas=None, escrituras=None, reintentos=REINTENTOS_API,
+                 espera_base=ESPERA_BASE_REINTENTO, espera_maxima=ESPERA_MAXIMA_REINTENTO,
+                 dormir=time.sleep, aleatorio=random.random):
+        self.cubetas = {
+            'lectura': lecturas or _cubeta_por_minuto(CUOTA_LECTURAS_POR_MINUTO, RAFAGA_SOLICITUDES),
+            'escritura': escrituras or _cubeta_por_minuto(CUOTA_ESCRITURAS_POR_MINUTO, RAFAGA_SOLICITUDES)
+        }
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.dormir = dormir
+        self.aleatorio = aleatorio
+        self._en_curso = {}
+        self._lock = threading.Lock()
+
+    def _espera(self, intento, error):
+        espera = min(self.espera_maxima, self.espera_base * 2 ** intento)
+        # Jitter: entre la mitad y el total de la espera exponencial
+        espera *= 0.5 + self.aleatorio() / 2
+        sugerida = _espera_sugerida(error)
+        if sugerida is not None:
+            espera = max(espera, min(sugerida, self.espera_maxima))
+        return espera
+
+    def _con_reintentos(self, funcion, args, kwargs, tipo, idempotente=True):
+        nombre = getattr(funcion, '__name__', 'llamada')
+        intento = 0
+        while True:
+            with medir('api.espera_cuota'):
+                self.cubetas[tipo].adquirir()
+            contar('api.solicitudes')
+            contar(f"api.{tipo}")
+            try:
+                with medir(f"api.{nombre}"):
+                    return funcion(*args, **kwargs)
+            except Exception as e:
+                contar(f"api.errores.{codigo_http(e) or type(e).__name__}")
+                if intento >= self.reintentos or not es_reintentable(e, idempotente):
+                    raise
+                contar('api.reintentos')
+                self.dormir(self._espera(intento, e))
+                intento += 1
+
+    def ejecutar(self, funcion, *args, tipo='lectura', clave=None, idempotente=True, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) a través del planificador.
+
+        tipo es 'lectura' o 'escritura'. Si se da una clave (solo lecturas),
+        las llamadas concurrentes con la misma clave comparten una solicitud.
+        Con idempotente=False solo se reintenta ante un 429.
+        """
+        if clave is None:
+            return self._con_reintentos(funcion, args, kwargs, tipo, idempotente)
+
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            propio = futuro is None
+            if propio:
+                futuro = Future()
+                self._en_curso[clave] = futuro
+
+        if not propio:
+            contar('api.coalescidas')
+            return futuro.result()
+
+        try:
+            futuro.set_result(self._con_reintentos(funcion, args, kwargs, tipo))
+        except BaseException as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+        return futuro.result()
+
+
+class ObjetoPlanificado:
+    """Envuelve un objeto de gspread (cliente, spreadsheet o worksheet) para que
+    todas sus llamadas a la API pasen por el planificador.
+
+    Los atributos que no son métodos (id, title, row_count...) se leen
+    directamente. Los spreadsheets y worksheets que devuelvan los métodos
+    también se envuelven.
+    """
+
+    def __init__(self, objeto, planificador):
+        self._objeto = objeto
+        self._planificador = planificador
+
+    @property
+    def objeto_original(self):
+        return self._objeto
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._objeto, nombre)
+        if not callable(atributo):
+            return atributo
+
+        lectura = nombre in METODOS_LECTURA
+
+        def llamada(*args, **kwargs):
+            clave = None
+            if lectura:
+                clave = (id(self._objeto), nombre, repr(args), repr(sorted(kwargs.items())))
+            resultado = self._planificador.ejecutar(
+                atributo, *args,
+                tipo='lectura' if lectura else 'escritura',
+                clave=clave,
+                idempotente=nombre not in METODOS_NO_IDEMPOTENTES,
+                **kwargs
+            )
+            return envolver(resultado, self._planificador)
+
+        llamada.__name__ = nombre
+        return llamada
+
+    def __repr__(self):
+        return f"ObjetoPlanificado({self._objeto!r})"
+
+
+# Tipos cuyos objetos se envuelven al salir de una llamada (ver registrar_tipos_api)
+_tipos_api = (gspread.Spreadsheet, gspread.Worksheet, gspread.Client)
+
+
+def registrar_tipos_api(*tipos):
+    """Agrega tipos que imitan a los de gspread (p. ej. los de sheets_falso.py)"""
+    global _tipos_api
+    _tipos_api = _tipos_api + tuple(t for t in tipos if t not in _tipos_api)
+
+
+def envolver(resultado, planificador):
+    """Envuelve spreadsheets y worksheets (sueltos o en listas) con el planificador"""
+    if isinstance(resultado, _tipos_api):
+        return ObjetoPlanificado(resultado, planificador)
+    if isinstance(resultado, list) and resultado and isinstance(resultado[0], _tipos_api):
+        return [ObjetoPlanificado(w, planificador) for w in resultado]
+    return resultado
+
+
+_planificador = None
+_lock_planificador = threading.Lock()
+
+
+def obtener_planificador():
+    """Planificador compartido por todo el proceso (la cuota es de la cuenta de servicio)"""
+    global _planificador
+    with _lock_planificador:
+        if _planificador is None:
+            _planificador = Planificador()
+        return _planificador
@@ -0,0 +1,223 @@
+"""
+Materialización de estadísticas en la hoja Resumen
+"""
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from config import SHEET_NAMES, SNAPSHOT_DIR, USAR_SNAPSHOT_LOCAL
+from estadisticas import COLUMNAS_POR_IGLESIA, TODAS, construir_cubo
+from sincronizacion import SnapshotLocal, escribir_atomico, sincronizar
+
+# Marcadores de sección en la columna A de la hoja Resumen
+SECCION_GENERAL = 'GENERAL'
+SECCION_POR_IGLESIA = 'POR IGLESIA'
+SECCION_CUBO = 'CUBO'
+
+ANCHO = 10
+PREFIJO_RESPUESTA = 'respuesta:'
+
+
+def _filas_cubo(cubo):
+    """Aplana el cubo en filas (Iglesia, Métrica, Valor)"""
+    filas = [[TODAS, 'promedio_lideres_cero', cubo['promedio_lideres_cero']]]
+    for iglesia, metricas in cubo['por_iglesia'].items():
+        for metrica, valor in metricas.items():
+            if metrica == 'respuestas':
+                filas.extend([iglesia, PREFIJO_RESPUESTA + respuesta, cantidad] for respuesta, cantidad in valor)
+            elif isinstance(valor, dict):
+                filas.extend([iglesia, f"{metrica}.{clave}", v] for clave, v in valor.items())
+            else:
+                filas.append([iglesia, metrica, valor])
+    return filas
+
+
+def _cubo_desde_filas(filas):
+    """Reconstruye el cubo a partir de las filas (Iglesia, Métrica, Valor)"""
+    por_iglesia = {}
+    promedio = 0
+    for iglesia, metrica, valor in filas:
+        iglesia, metrica, valor = str(iglesia), str(metrica), int(float(valor or 0))
+        if metrica == 'promedio_lideres_cero':
+            promedio = valor
+            continue
+
+        metricas = por_iglesia.setdefault(iglesia, {'respuestas': []})
+        if metrica.startswith(PREFIJO_RESPUESTA):
+            metricas['respuestas'].append((metrica[len(PREFIJO_RESPUESTA):], valor))
+        elif '.' in metrica:
+            grupo, clave = metrica.split('.', 1)
+            metricas.setdefault(grupo, {})[clave] = valor
+        else:
+            metricas[metrica] = valor
+
+    return {
+        'iglesias': sorted(i for i in por_iglesia if i != TODAS),
+        'por_iglesia': por_iglesia,
+        'promedio_lideres_cero': promedio
+    }
+
+
+def _fila(*valores):
+    fila = [_valor(v) for v in valores]
+    return fila + [''] * (ANCHO - len(fila))
+
+
+def _valor(v):
+    if hasattr(v, 'item'):
+        return v.item()
+    return v
+
+
+def construir_matriz(estadisticas, cubo, version):
+    """Arma el contenido completo de la hoja Resumen"""
+    actualizado = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    matriz = [
+        _fila('Actualizado', actualizado, 'Versión', version or ''),
+        _fila(),
+        _fila(SECCION_GENERAL)
+    ]
+    matriz += [_fila(clave, valor) for clave, valor in estadisticas['general'].items()]
+
+    por_iglesia = estadisticas['por_iglesia']
+    matriz += [_fila(), _fila(SECCION_POR_IGLESIA), _fila(*COLUMNAS_POR_IGLESIA)]
+    matriz += [_fila(*fila) for fila in por_iglesia[COLUMNAS_POR_IGLESIA].itertuples(index=False)]
+
+    matriz += [_fila(), _fila(SECCION_CUBO), _fila('Iglesia', 'Métrica', 'Valor')]
+    matriz += [_fila(*fila) for fila in _filas_cubo(cubo)]
+    return matriz
+
+
+def _ruta_registro(directorio, spreadsheet_id):
+    return Path(directorio) / f"{spreadsheet_id}_resumen.json"
+
+
+def leer_registro(spreadsheet_id, directorio=SNAPSHOT_DIR):
+    """Versiones con las que se escribió el último resumen (None si no hay registro)"""
+    try:
+        with open(_ruta_registro(directorio, spreadsheet_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_registro(spreadsheet_id, registro, directorio):
+    Path(directorio).mkdir(parents=True, exist_ok=True)
+    escribir_atomico(
+        _ruta_registro(directorio, spreadsheet_id),
+        lambda f: f.write(json.dumps(registro).encode('utf-8'))
+    )
+
+
+def materializar_resumen(manager, hoja_resumen=SHEET_NAMES['RESUMEN'], snapshot=None, historial=None):
+    """Calcula las estadísticas y el cubo y los escribe en Resumen con una sola escritura.
+
+    Si se pasa un historial y todavía no se registró el día, se registra con
+    los mismos datos, sin otra lectura.
+
+    La versión de Drive es del spreadsheet entero, así que escribir el
+    Resumen la cambia. Por eso, además de la versión de los datos (la que se
+    guarda en la hoja), se registra junto a los snapshots la versión que
+    quedó después de escribir: mientras Drive siga en esa versión nada cambió
+    en Datos, el resumen está al día y el snapshot local también.
+
+    Devuelve el número de filas escritas (0 si no hay datos).
+    """
+    snapshot = snapshot or SnapshotLocal(manager.spreadsheet.id)
+    version = manager.obtener_version_remota()
+    if USAR_SNAPSHOT_LOCAL:
+        df = sincronizar(manager, snapshot=snapshot)
+    else:
+        df = manager.leer_datos()
+    if df.empty:
+        return 0
+    if historial is not None and not historial.registrado_hoy():
+        historial.registrar(df)
+
+    estadisticas = manager.obtener_estadisticas_de_dataframe(df)
+    matriz = construir_matriz(estadisticas, construir_cubo(df), version)
+
+    worksheet = manager._hoja(hoja_resumen)
+    filas_usadas = len(matriz)
+    if worksheet.row_count < filas_usadas or worksheet.col_count < ANCHO:
+        worksheet.resize(rows=max(worksheet.row_count, filas_usadas), cols=max(worksheet.col_count, ANCHO))
+
+    # Rellenar hasta el final de la hoja borra lo que quedara de un resumen más largo
+    matriz += [_fila()] * (worksheet.row_count - filas_usadas)
+    # Si alguien editó mientras se calculaba, el resumen ya nace viejo y no se
+    # registra una versión posterior con la que darlo por vigente
+    sin_cambios = manager.obtener_version_remota() == version
+    worksheet.batch_update([{
+        'range': f"A1:{rowcol_to_a1(len(matriz), ANCHO)}",
+        'values': matriz
+    }])
+
+    escrita = manager.obtener_version_remota() if sin_cambios else None
+    _guardar_registro(manager.spreadsheet.id, {'version': version, 'escrita': escrita}, snapshot.directorio)
+    if escrita and USAR_SNAPSHOT_LOCAL:
+        snapshot.adelantar_version(version, escrita)
+    return filas_usadas
+
+
+def interpretar_resumen(valores):
+    """Convierte los valores de la hoja Resumen en un dict, o None si no tiene resumen"""
+    if not valores or not valores[0] or valores[0][0] != 'Actualizado':
+        return None
+
+    secciones = {}
+    actual = None
+    for fila in valores[1:]:
+        primera = fila[0] if fila else ''
+        if primera in (SECCION_GENERAL, SECCION_POR_IGLESIA, SECCION_CUBO):
+            actual = secciones.setdefault(primera, [])
+        elif actual is not None and any(fila):
+            actual.append(fila)
+
+    general = {fila[0]: int(float(fila[1] or 0)) for fila in secciones.get(SECCION_GENERAL, [])}
+
+    tabla = secciones.get(SECCION_POR_IGLESIA, [])
+    por_iglesia = pd.DataFrame(
+        [fila[:len(COLUMNAS_POR_IGLESIA)] for fila in tabla[1:]],
+        columns=COLUMNAS_POR_IGLESIA
+    )
+    for columna in COLUMNAS_POR_IGLESIA[1:]:
+        por_iglesia[columna] = pd.to_numeric(por_iglesia[columna], errors='coerce').fillna(0).astype('int64')
+
+    cubo = _cubo_desde_filas(fila[:3] for fila in secciones.get(SECCION_CUBO, [])[1:])
+
+    return {
+        'actualizado': datetime.fromisoformat(valores[0][1]),
+        'version': valores[0][3] if len(valores[0]) > 3 else '',
+        'general': general,
+        'por_iglesia': por_iglesia,
+        'cubo': cubo
+    }
+
+
+def leer_resumen(manager, hoja_resumen=SHEET_NAMES['RESUMEN']):
+    """Lee el resumen materializado (una lectura de un rango pequeño)"""
+    valores = manager._hoja(hoja_resumen).get_values(value_render_option='UNFORMATTED_VALUE')
+    return interpretar_resumen(valores)
+
+
+def resumen_vigente(manager, resumen, directorio=SNAPSHOT_DIR):
+    """Indica si el spreadsheet no cambió desde que se escribió el resumen (una llamada de metadatos)"""
+    registro = leer_registro(manager.spreadsheet.id, directorio)
+    if not registro or not registro.get('escrita') or registro.get('version') != resumen['version']:
+        return False
+    return manager.obtener_version_remota() == registro['escrita']
+
+
+if __name__ == "__main__":
+    # Para ejecutar periódicamente (cron): python resumen.py
+    from config import HISTORIAL_AUTOMATICO
+    from historial import Historial
+    from sheets_manager import SheetsManager
+
+    manager = SheetsManager()
+    manager.conectar_sheet()
+    filas = materializar_resumen(manager, historial=Historial() if HISTORIAL_AUTOMATICO else None)
+    print(f"Resumen actualizado ({filas} filas)")
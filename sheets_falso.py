@@ -0,0 +1,442 @@
+"""
+Backend de Google Sheets en memoria para pruebas y benchmarks
+
+Imita la parte de gspread que usa el proyecto (cliente, spreadsheet y
+worksheet) sin credenciales ni red. Cada solicitud se cuenta, puede tener
+latencia simulada y puede fallar con un error de cuota (429) como la API
+real. Uso:
+
+    cliente = ClienteFalso(latencia=0.05)
+    cliente.crear_spreadsheet("prueba").hoja("Datos").cargar_valores(valores)
+    manager = SheetsManager(cliente=cliente)
+    manager.conectar_sheet("prueba")
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound, SpreadsheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+import planificador
+
+
+def _error_api(codigo, mensaje):
+    """APIError de gspread con una respuesta HTTP armada a mano"""
+    respuesta = requests.Response()
+    respuesta.status_code = codigo
+    respuesta._content = json.dumps({
+        'error': {'code': codigo, 'message': mensaje, 'status': 'RESOURCE_EXHAUSTED'}
+    }).encode('utf-8')
+    return APIError(respuesta)
+
+
+def _formatear(valor):
+    """Valor tal como lo devuelve la API con FORMATTED_VALUE"""
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'TRUE' if valor else 'FALSE'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _recortar(fila):
+    """Quita las celdas vacías del final de una fila, como la API"""
+    fin = len(fila)
+    while fin and fila[fin - 1] in ('', None):
+        fin -= 1
+    return fila[:fin]
+
+
+class _Celda:
+    """Lo mínimo de gspread.Cell que devuelve find()"""
+
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+    def __repr__(self):
+        return f"<Celda R{self.row}C{self.col} {self.value!r}>"
+
+
+class ClienteFalso:
+    """Cliente con la interfaz de gspread.Client sobre spreadsheets en memoria.
+
+    latencia: segundos de espera por solicitud.
+    latencia_por_celda: segundos extra por celda devuelta o escrita (simula
+        la transferencia, proporcional al tamaño).
+    probabilidad_error_cuota: probabilidad de que una solicitud falle con 429.
+    """
+
+    def __init__(self, latencia=0.0, latencia_por_celda=0.0, probabilidad_error_cuota=0.0, semilla=None):
+        self.latencia = latencia
+        self.latencia_por_celda = latencia_por_celda
+        self.probabilidad_error_cuota = probabilidad_error_cuota
+        self.contador = Counter()
+        self.celdas_transferidas = 0
+        self._aleatorio = random.Random(semilla)
+        self._fallos_pendientes = 0
+        self._spreadsheets = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Simulación de la API
+    # ------------------------------------------------------------
+
+    def _solicitud(self, metodo, celdas=0):
+        """Cuenta una solicitud, espera la latencia y, si toca, falla por cuota"""
+        with self._lock:
+            self.contador[metodo] += 1
+            self.celdas_transferidas += celdas
+            fallar = self._fallos_pendientes > 0 or (
+                self.probabilidad_error_cuota and self._aleatorio.random() < self.probabilidad_error_cuota
+            )
+            if self._fallos_pendientes > 0:
+                self._fallos_pendientes -= 1
+
+        espera = self.latencia + celdas * self.latencia_por_celda
+        if espera:
+            time.sleep(espera)
+        if fallar:
+            raise _error_api(429, "Quota exceeded for quota metric 'Read requests' (simulado)")
+
+    def fallar_proximas(self, cantidad):
+        """Hace fallar con 429 las próximas `cantidad` solicitudes"""
+        with self._lock:
+            self._fallos_pendientes = cantidad
+
+    @property
+    def solicitudes(self):
+        return sum(self.contador.values())
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.contador.clear()
+            self.celdas_transferidas = 0
+
+    # ------------------------------------------------------------
+    # Preparación de datos (sin contar como solicitudes)
+    # ------------------------------------------------------------
+
+    def crear_spreadsheet(self, spreadsheet_id, titulo=None, hojas=("Datos", "Resumen")):
+        """Crea un spreadsheet en memoria con las hojas dadas"""
+        spreadsheet = SpreadsheetFalso(self, spreadsheet_id, titulo or spreadsheet_id)
+        for hoja in hojas:
+            spreadsheet.agregar_hoja(hoja)
+        self._spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet
+
+    # ------------------------------------------------------------
+    # Interfaz de gspread.Client
+    # ------------------------------------------------------------
+
+    def open_by_key(self, key):
+        self._solicitud('open_by_key')
+        try:
+            return self._spreadsheets[key]
+        except KeyError:
+            raise SpreadsheetNotFound(f"Spreadsheet no encontrado: {key}") from None
+
+    def create(self, title, folder_id=None):
+        self._solicitud('create')
+        spreadsheet_id = f"falso-{len(self._spreadsheets) + 1}"
+        return self.crear_spreadsheet(spreadsheet_id, title, hojas=("Hoja 1",))
+
+
+class SpreadsheetFalso:
+    """Spreadsheet en memoria con la interfaz de gspread.Spreadsheet"""
+
+    def __init__(self, cliente, spreadsheet_id, titulo):
+        self.cliente = cliente
+        self.id = spreadsheet_id
+        self.title = titulo
+        self.url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
+        self._hojas = []
+        self._lock = threading.RLock()
+        self._modificado = datetime.now(timezone.utc)
+
+    def _marcar_modificado(self):
+        # Siempre avanza, aunque dos escrituras caigan en el mismo instante del reloj
+        self._modificado = max(datetime.now(timezone.utc), self._modificado + timedelta(microseconds=1))
+
+    def agregar_hoja(self, titulo, filas=1000, columnas=26):
+        """Agrega una hoja sin contar solicitudes (para preparar datos)"""
+        hoja = WorksheetFalso(self, titulo, filas, columnas, len(self._hojas))
+        self._hojas.append(hoja)
+        return hoja
+
+    def hoja(self, titulo):
+        """Devuelve una hoja sin contar solicitudes (para preparar datos)"""
+        for hoja in self._hojas:
+            if hoja.title == titulo:
+                return hoja
+        raise WorksheetNotFound(titulo)
+
+    # Interfaz de gspread.Spreadsheet
+
+    def worksheet(self, title):
+        self.cliente._solicitud('worksheet')
+        return self.hoja(title)
+
+    def worksheets(self, exclude_hidden=False):
+        self.cliente._solicitud('worksheets')
+        return list(self._hojas)
+
+    def get_worksheet(self, index):
+        self.cliente._solicitud('get_worksheet')
+        return self._hojas[index] if index < len(self._hojas) else None
+
+    def add_worksheet(self, title, rows, cols, index=None):
+        self.cliente._solicitud('add_worksheet')
+        with self._lock:
+            hoja = self.agregar_hoja(title, rows, cols)
+            self._marcar_modificado()
+        return hoja
+
+    def get_lastUpdateTime(self):
+        self.cliente._solicitud('get_lastUpdateTime')
+        return self._modificado.isoformat()
+
+
+class WorksheetFalso:
+    """Hoja en memoria con la interfaz de gspread.Worksheet que usa el proyecto"""
+
+    def __init__(self, spreadsheet, titulo, filas, columnas, indice):
+        self.spreadsheet = spreadsheet
+        self.title = titulo
+        self.index = indice
+        self.id = indice
+        self.row_count = filas
+        self.col_count = columnas
+        self._filas = []
+
+    @property
+    def _cliente(self):
+        return self.spreadsheet.cliente
+
+    @property
+    def _lock(self):
+        return self.spreadsheet._lock
+
+    # ------------------------------------------------------------
+    # Preparación de datos (sin contar como solicitudes)
+    # ------------------------------------------------------------
+
+    def cargar_valores(self, valores):
+        """Reemplaza el contenido de la hoja (lista de filas, encabezados incluidos)"""
+        with self._lock:
+            self._filas = [list(fila) for fila in valores]
+            self.row_count = max(self.row_count, len(self._filas))
+            self.col_count = max([self.col_count] + [len(f) for f in self._filas])
+            self.spreadsheet._marcar_modificado()
+
+    def valores(self):
+        """Copia del contenido sin contar solicitudes"""
+        with self._lock:
+            return [list(fila) for fila in self._filas]
+
+    # ------------------------------------------------------------
+    # Utilidades internas
+    # ------------------------------------------------------------
+
+    def _ultima_fila(self):
+        fin = len(self._filas)
+        while fin and not _recortar(self._filas[fin - 1]):
+            fin -= 1
+        return fin
+
+    def _grilla(self, rango):
+        """Índices (fila_ini, fila_fin, col_ini, col_fin) 0-indexados de un rango A1"""
+        grilla = a1_range_to_grid_range(rango.split('!')[-1])
+        return (
+            grilla.get('startRowIndex', 0),
+            grilla.get('endRowIndex', self.row_count),
+            grilla.get('startColumnIndex', 0),
+            grilla.get('endColumnIndex', self.col_count)
+        )
+
+    def _leer(self, rango, formateado=True):
+        """Valores de un rango como los devuelve values.get (sin relleno)"""
+        fila_ini, fila_fin, col_ini, col_fin = self._grilla(rango) if rango else (0, self.row_count, 0, self.col_count)
+        with self._lock:
+            filas = [
+                _recortar(fila[col_ini:col_fin])
+                for fila in self._filas[fila_ini:min(fila_fin, self._ultima_fila())]
+            ]
+        while filas and not filas[-1]:
+            filas.pop()
+        if formateado:
+            filas = [[_formatear(v) for v in fila] for fila in filas]
+        return filas
+
+    def _escribir(self, fila, columna, valores):
+        """Escribe una matriz de valores con la esquina en (fila, columna), 1-indexadas"""
+        for i, valores_fila in enumerate(valores):
+            r = fila - 1 + i
+            while len(self._filas) <= r:
+                self._filas.append([])
+            destino = self._filas[r]
+            fin = columna - 1 + len(valores_fila)
+            if len(destino) < fin:
+                destino.extend([''] * (fin - len(destino)))
+            destino[columna - 1:fin] = valores_fila
+        self.row_count = max(self.row_count, len(self._filas))
+        self.col_count = max(self.col_count, columna - 1 + max((len(v) for v in valores), default=0))
+        self.spreadsheet._marcar_modificado()
+
+    @staticmethod
+    def _celdas(valores):
+        return sum(len(fila) for fila in valores)
+
+    # ------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------
+
+    def get_values(self, range_name=None, value_render_option=None, **kwargs):
+        valores = self._leer(range_name, formateado=value_render_option != 'UNFORMATTED_VALUE')
+        self._cliente._solicitud('get_values', self._celdas(valores))
+        # gspread rellena las filas hasta dejar la matriz rectangular
+        ancho = max((len(fila) for fila in valores), default=0)
+        return [fila + [''] * (ancho - len(fila)) for fila in valores]
+
+    def get_all_values(self, **kwargs):
+        return self.get_values(**kwargs)
+
+    def get_all_records(self, head=1, **kwargs):
+        valores = self.get_values()
+        if len(valores) < head:
+            return []
+        encabezados = valores[head - 1]
+        return [dict(zip(encabezados, fila)) for fila in valores[head:]]
+
+    def batch_get(self, ranges, **kwargs):
+        resultado = [self._leer(rango) for rango in ranges]
+        self._cliente._solicitud('batch_get', sum(self._celdas(v) for v in resultado))
+        return resultado
+
+    def col_values(self, col, **kwargs):
+        with self._lock:
+            valores = [_formatear(fila[col - 1]) if len(fila) >= col else '' for fila in self._filas]
+        while valores and valores[-1] == '':
+            valores.pop()
+        self._cliente._solicitud('col_values', len(valores))
+        return valores
+
+    def row_values(self, row, **kwargs):
+        valores = self._leer(f"{row}:{row}")
+        self._cliente._solicitud('row_values', self._celdas(valores))
+        return valores[0] if valores else []
+
+    def find(self, query, in_row=None, in_column=None, case_sensitive=True):
+        with self._lock:
+            filas = [list(f) for f in self._filas]
+        self._cliente._solicitud('find', self._celdas(filas))
+        buscado = str(query)
+        for r, fila in enumerate(filas, start=1):
+            if in_row and r != in_row:
+                continue
+            for c, valor in enumerate(fila, start=1):
+                if in_column and c != in_column:
+                    continue
+                texto = _formatear(valor)
+                if texto == buscado or (not case_sensitive and texto.lower() == buscado.lower()):
+                    return _Celda(r, c, texto)
+        return None
+
+    # ------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------
+
+    def _respuesta_append(self, primera, cantidad, ancho):
+        rango = f"'{self.title}'!A{primera}:{rowcol_to_a1(primera + cantidad - 1, max(ancho, 1))}"
+        return {
+            'spreadsheetId': self.spreadsheet.id,
+            'tableRange': f"'{self.title}'!A1:{rowcol_to_a1(max(primera - 1, 1), max(self.col_count, 1))}",
+            'updates': {
+                'spreadsheetId': self.spreadsheet.id,
+                'updatedRange': rango,
+                'updatedRows': cantidad,
+                'updatedColumns': ancho,
+                'updatedCells': cantidad * ancho
+            }
+        }
+
+    def append_rows(self, values, value_input_option='RAW', **kwargs):
+        self._cliente._solicitud('append_rows', self._celdas(values))
+        with self._lock:
+            primera = self._ultima_fila() + 1
+            self._escribir(primera, 1, [list(fila) for fila in values])
+            ancho = max((len(fila) for fila in values), default=0)
+            return self._respuesta_append(primera, len(values), ancho)
+
+    def append_row(self, values, value_input_option='RAW', **kwargs):
+        self._cliente._solicitud('append_row', len(values))
+        with self._lock:
+            primera = self._ultima_fila() + 1
+            self._escribir(primera, 1, [list(values)])
+            return self._respuesta_append(primera, 1, len(values))
+
+    def update(self, range_name=None, values=None, **kwargs):
+        # Acepta update(rango, valores) y update(valores, rango) como gspread 5 y 6
+        if isinstance(range_name, list):
+            range_name, values = values, range_name
+        self._cliente._solicitud('update', self._celdas(values))
+        fila_ini, _, col_ini, _ = self._grilla(range_name or 'A1')
+        with self._lock:
+            self._escribir(fila_ini + 1, col_ini + 1, values)
+        return {'updatedRange': range_name}
+
+    def update_cell(self, row, col, value):
+        self._cliente._solicitud('update_cell', 1)
+        with self._lock:
+            self._escribir(row, col, [[value]])
+        return {'updatedRange': rowcol_to_a1(row, col)}
+
+    def batch_update(self, data, **kwargs):
+        self._cliente._solicitud('batch_update', sum(self._celdas(d['values']) for d in data))
+        with self._lock:
+            for datos in data:
+                fila_ini, _, col_ini, _ = self._grilla(datos['range'])
+                self._escribir(fila_ini + 1, col_ini + 1, datos['values'])
+        return {'totalUpdatedCells': sum(self._celdas(d['values']) for d in data)}
+
+    def resize(self, rows=None, cols=None):
+        self._cliente._solicitud('resize')
+        with self._lock:
+            if rows is not None:
+                self.row_count = rows
+                del self._filas[rows:]
+            if cols is not None:
+                self.col_count = cols
+                for fila in self._filas:
+                    del fila[cols:]
+
+    def sort(self, *specs, range=None):
+        self._cliente._solicitud('sort')
+        fila_ini, fila_fin, _, _ = self._grilla(range or f"A2:{rowcol_to_a1(self.row_count, self.col_count)}")
+        with self._lock:
+            filas = self._filas[fila_ini:fila_fin]
+            # Como en Sheets: orden estable y las filas vacías al final
+            for columna, orden in reversed(specs):
+                filas.sort(key=lambda f: _formatear(f[columna - 1]) if len(f) >= columna else '', reverse=orden == 'des')
+            filas.sort(key=lambda f: not _recortar(f))
+            self._filas[fila_ini:fila_ini + len(filas)] = filas
+            self.spreadsheet._marcar_modificado()
+
+    def update_title(self, title):
+        self._cliente._solicitud('update_title')
+        self.title = title
+
+    def format(self, ranges, format, **kwargs):
+        self._cliente._solicitud('format')
+
+
+# Los objetos falsos se envuelven con el planificador igual que los de gspread
+planificador.registrar_tipos_api(ClienteFalso, SpreadsheetFalso, WorksheetFalso)
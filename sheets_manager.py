@@ -1,46 +1,299 @@
 """
 Gestión de Google Sheets para Cero Referidos
 """
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import gspread
-from google.oauth2.service_account import Credentials
-from config import SERVICE_ACCOUNT_FILE, SCOPES, SPREADSHEET_ID
+from gspread.utils import rowcol_to_a1, a1_range_to_grid_range
+from config import (
+    SPREADSHEET_ID, SPREADSHEET_IDS, COLUMNAS, ENCABEZADOS,
+    COLUMNA_FUENTE, TAMANO_BLOQUE_LECTURA, MAX_HILOS_FUENTES, USAR_SNAPSHOT_LOCAL
+)
+from esquema import concatenar
+from lectura import leer_hoja, iterar_hoja, leer_tramos, letra_columna
+from estadisticas import AcumuladorEstadisticas, calcular_estadisticas
+from cola_escritura import ColaEscritura
+from credenciales import cargar_credenciales
+from indice_cedulas import IndiceCedulas, normalizar_cedula
+from directorio_iglesias import DirectorioIglesias
+from instrumentacion import contar, instrumentar, medir
+from planificador import ObjetoPlanificado, obtener_planificador
+import resumen
+from sincronizacion import sincronizar
+import numpy as np
 import pandas as pd
 
 
-class SheetsManager:
-    def __init__(self):
-        """Inicializa la conexión con Google Sheets"""
-        import streamlit as st
-        import os
-
-        # Prioridad 1: Usar archivo local si existe
-        if os.path.exists(SERVICE_ACCOUNT_FILE):
-            # Usar archivo local (desarrollo local)
-            self.creds = Credentials.from_service_account_file(
-                str(SERVICE_ACCOUNT_FILE),
-                scopes=SCOPES
-            )
-        # Prioridad 2: Intentar obtener credenciales desde Streamlit Secrets (Cloud)
-        elif hasattr(st, 'secrets') and 'gcp_service_account' in st.secrets:
-            # Usar credenciales desde Streamlit Secrets
-            self.creds = Credentials.from_service_account_info(
-                dict(st.secrets['gcp_service_account']),
-                scopes=SCOPES
-            )
+# Campos de una persona (claves de los dicts de entrada) y su columna en la hoja
+CAMPOS = {nombre.lower(): indice for nombre, indice in COLUMNAS.items()}
+
+VALORES_POR_DEFECTO = {
+    'contactado': 'NO',
+    'esta_en_infomira': 'NO',
+    'referidos_activos': 0,
+    'referidos_inactivos': 0
+}
+
+# Campos que actualizar_persona / actualizar_personas pueden modificar
+CAMPOS_ACTUALIZABLES = [
+    'contactado',
+    'fecha_contacto',
+    'observaciones',
+    'esta_en_infomira',
+    'referidos_activos',
+    'referidos_inactivos'
+]
+
+# Máximo de filas por solicitud en las escrituras masivas
+TAMANO_LOTE_ESCRITURA = 5000
+
+
+# Capa de conexión compartida por todo el proceso: un único cliente autorizado,
+# los spreadsheets ya abiertos, los handles de sus worksheets y sus índices de
+# cédulas y directorios de iglesias. Así un refresco del dashboard no vuelve a autenticar ni a pedir
+# metadatos a la API. El cliente (y todo lo que se obtiene de él) pasa por el
+# planificador de solicitudes, que respeta la cuota y reintenta los 429/5xx.
+_lock_conexion = threading.RLock()
+_credenciales = None
+_cliente = None
+_spreadsheets = {}
+_worksheets = {}
+_indices = {}
+_directorios = {}
+
+
+def obtener_cliente():
+    """Devuelve el cliente gspread autorizado del proceso, creándolo la primera vez"""
+    global _credenciales, _cliente
+    with _lock_conexion:
+        if _cliente is None:
+            with medir('conexion.autorizar'):
+                _credenciales = cargar_credenciales()
+                _cliente = ObjetoPlanificado(gspread.authorize(_credenciales), obtener_planificador())
+        return _cliente
+
+
+def obtener_spreadsheet(spreadsheet_id):
+    """Devuelve el spreadsheet abierto para el ID dado (open_by_key solo una vez)"""
+    with _lock_conexion:
+        spreadsheet = _spreadsheets.get(spreadsheet_id)
+        contar('cache.spreadsheets.' + ('aciertos' if spreadsheet else 'fallos'))
+        if spreadsheet is None:
+            with medir('conexion.open_by_key'):
+                spreadsheet = obtener_cliente().open_by_key(spreadsheet_id)
+            _spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet
+
+
+def obtener_worksheet(spreadsheet, hoja):
+    """Devuelve el handle cacheado de una hoja del spreadsheet"""
+    clave = (spreadsheet.id, hoja)
+    with _lock_conexion:
+        worksheet = _worksheets.get(clave)
+        contar('cache.worksheets.' + ('aciertos' if worksheet else 'fallos'))
+        if worksheet is None:
+            with medir('conexion.worksheet'):
+                worksheet = spreadsheet.worksheet(hoja)
+            _worksheets[clave] = worksheet
+        return worksheet
+
+
+def obtener_indice_cedulas(spreadsheet, hoja):
+    """Devuelve el índice de cédulas compartido de una hoja"""
+    clave = (spreadsheet.id, hoja)
+    with _lock_conexion:
+        indice = _indices.get(clave)
+        if indice is None:
+            indice = IndiceCedulas(obtener_worksheet(spreadsheet, hoja))
+            _indices[clave] = indice
+        return indice
+
+
+def obtener_directorio_iglesias(spreadsheet, hoja):
+    """Devuelve el directorio de filas por iglesia compartido de una hoja"""
+    clave = (spreadsheet.id, hoja)
+    with _lock_conexion:
+        directorio = _directorios.get(clave)
+        if directorio is None:
+            directorio = DirectorioIglesias(obtener_worksheet(spreadsheet, hoja))
+            _directorios[clave] = directorio
+        return directorio
+
+
+def invalidar_conexion(spreadsheet_id=None, hoja=None):
+    """Descarta handles cacheados.
+
+    Sin argumentos reinicia todo, incluido el cliente autorizado. Con
+    spreadsheet_id descarta ese spreadsheet y sus hojas; con hoja, solo el
+    handle, el índice y el directorio de esa hoja.
+    """
+    global _credenciales, _cliente
+    with _lock_conexion:
+        if spreadsheet_id is None:
+            _credenciales = None
+            _cliente = None
+            _spreadsheets.clear()
+            _worksheets.clear()
+            _indices.clear()
+            _directorios.clear()
+            return
+
+        if hoja is None:
+            _spreadsheets.pop(spreadsheet_id, None)
+            for cache in (_worksheets, _indices, _directorios):
+                for clave in [c for c in cache if c[0] == spreadsheet_id]:
+                    del cache[clave]
         else:
-            raise ValueError("No se encontraron credenciales de Google Cloud. Configura Streamlit Secrets o agrega service_account.json")
+            _worksheets.pop((spreadsheet_id, hoja), None)
+            _indices.pop((spreadsheet_id, hoja), None)
+            _directorios.pop((spreadsheet_id, hoja), None)
+
+
+def _valor_celda(valor):
+    """Convierte un valor de pandas/numpy en algo serializable para la API"""
+    if valor is None:
+        return ''
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if isinstance(valor, float):
+        if valor != valor:
+            return ''
+        if valor.is_integer():
+            return int(valor)
+    return valor
+
+
+def _como_registros(personas):
+    """Acepta una lista de dicts o un DataFrame y devuelve una lista de dicts.
+
+    Las celdas vacías (NaN) de un DataFrame se tratan como campos no enviados.
+    """
+    if isinstance(personas, pd.DataFrame):
+        return [
+            {campo: valor for campo, valor in registro.items() if not pd.isna(valor)}
+            for registro in personas.to_dict('records')
+        ]
+    return list(personas)
 
-        self.client = gspread.authorize(self.creds)
+
+def _preparar_fila(datos):
+    """Arma la fila de la hoja a partir del dict de una persona"""
+    fila = [''] * len(CAMPOS)
+    for campo, indice in CAMPOS.items():
+        fila[indice] = _valor_celda(datos.get(campo, VALORES_POR_DEFECTO.get(campo, '')))
+    return fila
+
+
+def _primera_fila_escrita(respuesta):
+    """Fila donde quedó el primer registro de un values.append, o None"""
+    rango = (respuesta or {}).get('updates', {}).get('updatedRange', '')
+    if not rango:
+        return None
+    return a1_range_to_grid_range(rango.split('!')[-1])['startRowIndex'] + 1
+
+
+def _rangos_actualizacion(fila, datos):
+    """Rangos A1 y valores a escribir para los campos presentes en datos"""
+    return [
+        {
+            'range': rowcol_to_a1(fila, CAMPOS[campo] + 1),
+            'values': [[_valor_celda(datos[campo])]]
+        }
+        for campo in CAMPOS_ACTUALIZABLES
+        if campo in datos
+    ]
+
+
+class SheetsManager:
+    def __init__(self, cliente=None, planificador=None):
+        """Inicializa la conexión con Google Sheets.
+
+        Sin argumentos usa el cliente compartido del proceso. Se puede pasar
+        otro cliente con la interfaz de gspread (p. ej. sheets_falso.ClienteFalso);
+        sus llamadas pasan por `planificador` (por defecto el compartido) y sus
+        handles se cachean en esta instancia, no en la cache del proceso.
+        """
+        if cliente is None:
+            self.client = obtener_cliente()
+            self.creds = _credenciales
+        else:
+            self.client = ObjetoPlanificado(cliente, planificador or obtener_planificador())
+            self.creds = None
+        self._cliente_propio = cliente is not None
+        self._planificador = planificador
+        self._worksheets = {}
+        self._indices = {}
+        self._directorios = {}
         self.spreadsheet = None
+        self.cola_escritura = None
 
+    @instrumentar()
     def conectar_sheet(self, spreadsheet_id=None):
         """Conecta con un Google Sheet específico"""
         sheet_id = spreadsheet_id or SPREADSHEET_ID
         if not sheet_id:
             raise ValueError("Debe proporcionar un SPREADSHEET_ID")
-        self.spreadsheet = self.client.open_by_key(sheet_id)
+        if self._cliente_propio:
+            self.spreadsheet = self.client.open_by_key(sheet_id)
+            self._worksheets.clear()
+            self._indices.clear()
+            self._directorios.clear()
+        else:
+            self.spreadsheet = obtener_spreadsheet(sheet_id)
         return self.spreadsheet
 
+    def _hoja(self, hoja):
+        """Devuelve el worksheet pedido usando la cache de handles"""
+        if not self.spreadsheet:
+            raise ValueError("Primero debe conectar con un spreadsheet")
+        if not self._cliente_propio:
+            return obtener_worksheet(self.spreadsheet, hoja)
+        if hoja not in self._worksheets:
+            self._worksheets[hoja] = self.spreadsheet.worksheet(hoja)
+        return self._worksheets[hoja]
+
+    def _hoja_actualizada(self, hoja):
+        """Vuelve a pedir el worksheet para tener sus dimensiones al día.
+
+        El handle cacheado guarda row_count y col_count de cuando se abrió;
+        descartarlo descarta también el índice y el directorio de la hoja.
+        """
+        if not self.spreadsheet:
+            raise ValueError("Primero debe conectar con un spreadsheet")
+        if self._cliente_propio:
+            for cache in (self._worksheets, self._indices, self._directorios):
+                cache.pop(hoja, None)
+        else:
+            invalidar_conexion(self.spreadsheet.id, hoja)
+        return self._hoja(hoja)
+
+    def _indice(self, hoja):
+        """Devuelve el índice de cédulas de la hoja"""
+        if not self.spreadsheet:
+            raise ValueError("Primero debe conectar con un spreadsheet")
+        if not self._cliente_propio:
+            return obtener_indice_cedulas(self.spreadsheet, hoja)
+        if hoja not in self._indices:
+            self._indices[hoja] = IndiceCedulas(self._hoja(hoja))
+        return self._indices[hoja]
+
+    def _directorio(self, hoja):
+        """Devuelve el directorio de filas por iglesia de la hoja"""
+        if not self.spreadsheet:
+            raise ValueError("Primero debe conectar con un spreadsheet")
+        if not self._cliente_propio:
+            return obtener_directorio_iglesias(self.spreadsheet, hoja)
+        if hoja not in self._directorios:
+            self._directorios[hoja] = DirectorioIglesias(self._hoja(hoja))
+        return self._directorios[hoja]
+
+    def _registrar_fila(self, hoja, datos, fila):
+        """Anota una fila recién agregada en el índice de cédulas y el directorio de iglesias"""
+        self._indice(hoja).registrar(datos.get('cedula', ''), fila)
+        self._directorio(hoja).registrar(datos.get('iglesia', ''), fila)
+
+    @instrumentar()
     def crear_plantilla(self, nombre_archivo="Cero Referidos - Plantilla"):
         """Crea una plantilla de Google Sheets con la estructura necesaria"""
         # Crear nuevo spreadsheet
@@ -51,19 +304,7 @@ class SheetsManager:
         worksheet_datos.update_title("Datos")
 
         # Encabezados
-        headers = [
-            "Iglesia",
-            "Municipio",
-            "Cédula",
-            "Nombre",
-            "Celular",
-            "Contactado",
-            "Fecha Contacto",
-            "Observaciones",
-            "¿Está en InfoMIRA?",
-            "Referidos Activos",
-            "Referidos Inactivos"
-        ]
+        headers = list(ENCABEZADOS.values())
 
         worksheet_datos.update('A1:K1', [headers])
 
@@ -83,119 +324,311 @@ class SheetsManager:
 
         return spreadsheet
 
+    @instrumentar()
     def leer_datos(self, hoja="Datos"):
-        """Lee todos los datos de una hoja"""
+        """Lee todos los datos de una hoja como DataFrame tipado (ver esquema.py).
+
+        Las hojas grandes se leen por bloques en paralelo (ver lectura.py).
+        """
+        df, _, _ = leer_hoja(self._hoja(hoja))
+        return df.reset_index(drop=True)
+
+    def directorio_iglesias(self, hoja="Datos"):
+        """Directorio de filas por iglesia de la hoja (ver directorio_iglesias.py)"""
+        return self._directorio(hoja)
+
+    @instrumentar()
+    def leer_datos_iglesia(self, iglesia, hoja="Datos", columnas=None):
+        """Lee solo las filas de una iglesia y, si se indican, solo esas columnas.
+
+        Las filas salen del directorio de iglesias y se piden con batch_get,
+        así que lo transferido es proporcional al tamaño de la iglesia y no
+        al de la hoja (con la hoja muy intercalada se leen también algunas
+        filas de otras iglesias para no pasar de unas pocas solicitudes; ver
+        ordenar_por_iglesia). Si la hoja cambió desde que se cargó el
+        directorio (una fila que debía ser de la iglesia ya no lo es), el
+        directorio se recarga y se lee otra vez. Devuelve un DataFrame
+        tipado como leer_datos.
+        """
+        worksheet = self._hoja(hoja)
+        directorio = self._directorio(hoja)
+        nombre = str(iglesia).strip()
+        if columnas is not None and 'Iglesia' not in columnas:
+            columnas = ['Iglesia'] + list(columnas)
+
+        for _ in range(2):
+            tramos = directorio.tramos(nombre)
+            df = leer_tramos(worksheet, directorio.encabezados(), tramos, columnas)
+            if df.empty:
+                break
+            propias = df['Iglesia'].astype(object).eq(nombre).to_numpy()
+            # Filas que el directorio ubica en la iglesia (las de los huecos no cuentan)
+            inicios = np.array([inicio for inicio, _ in tramos])
+            fines = np.array([fin for _, fin in tramos])
+            filas = df.index.to_numpy()
+            posicion = np.searchsorted(inicios, filas, side='right') - 1
+            esperadas = (posicion >= 0) & (filas <= fines[np.maximum(posicion, 0)])
+            if not (esperadas & ~propias).any():
+                break
+            contar('directorio_iglesias.desactualizado')
+            directorio.invalidar()
+
+        if not df.empty:
+            df = df[propias]
+        return df.reset_index(drop=True)
+
+    @instrumentar()
+    def ordenar_por_iglesia(self, hoja="Datos"):
+        """Ordena las filas de datos por iglesia en la propia hoja.
+
+        Con la hoja ordenada cada iglesia queda en un solo tramo de filas y
+        leer_datos_iglesia hace un rango por tramo de columnas. Mueve filas,
+        así que invalida el índice de cédulas y el directorio (el snapshot
+        local lo detecta y hace una sincronización completa). El rango se
+        arma con las dimensiones actuales de la hoja, no con las del handle
+        cacheado: otro proceso pudo agregar filas desde que se abrió.
+        """
+        worksheet = self._hoja_actualizada(hoja)
+        ultima_columna = letra_columna(max(worksheet.col_count, 1))
+        worksheet.sort((COLUMNAS['IGLESIA'] + 1, 'asc'), range=f"A2:{ultima_columna}{worksheet.row_count}")
+        self._indice(hoja).invalidar()
+        self._directorio(hoja).invalidar()
+
+    @instrumentar()
+    def leer_datos_fuentes(self, spreadsheet_ids=None, hoja="Datos", sincronizados=USAR_SNAPSHOT_LOCAL):
+        """Lee la hoja de varios spreadsheets en paralelo y une sus datos.
+
+        Cada fila lleva en COLUMNA_FUENTE el título de su spreadsheet. Si una
+        fuente falla se siguen usando las demás. Con sincronizados=True cada
+        fuente usa su propio snapshot local, así que una fuente que no cambió
+        no se vuelve a descargar.
+
+        Devuelve (df, errores), con errores = {spreadsheet_id: mensaje}.
+        """
+        ids = list(spreadsheet_ids or SPREADSHEET_IDS)
+        frames = []
+        errores = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_HILOS_FUENTES, len(ids)))) as pool:
+            futuros = [(i, pool.submit(self._leer_fuente, i, hoja, sincronizados)) for i in ids]
+            for spreadsheet_id, futuro in futuros:
+                try:
+                    frames.append(futuro.result())
+                except Exception as e:
+                    errores[spreadsheet_id] = str(e)
+
+        return concatenar(frames).reset_index(drop=True), errores
+
+    def _leer_fuente(self, spreadsheet_id, hoja, sincronizados):
+        """Datos de un spreadsheet, etiquetados con su título"""
+        if self._cliente_propio:
+            fuente = SheetsManager(self.client.objeto_original, self._planificador)
+        else:
+            fuente = SheetsManager()
+        fuente.conectar_sheet(spreadsheet_id)
+        if sincronizados:
+            df = fuente.leer_datos_sincronizados(hoja)
+        else:
+            df = fuente.leer_datos(hoja)
+        if df.empty:
+            return df
+        titulo = fuente.spreadsheet.title
+        return df.assign(**{COLUMNA_FUENTE: pd.Categorical([titulo] * len(df))})
+
+    def iter_datos(self, hoja="Datos", chunk_size=TAMANO_BLOQUE_LECTURA):
+        """Lee la hoja por bloques de chunk_size filas, como DataFrames tipados.
+
+        La memoria usada depende del tamaño del bloque, no del de la hoja. El
+        índice de cada bloque es el número de fila en la hoja.
+        """
+        return iterar_hoja(self._hoja(hoja), tamano_bloque=chunk_size)
+
+    @instrumentar()
+    def obtener_version_remota(self):
+        """Fecha de última modificación del spreadsheet según Drive (una llamada de metadatos)"""
+        if not self.spreadsheet:
+            raise ValueError("Primero debe conectar con un spreadsheet")
+        return self.spreadsheet.get_lastUpdateTime()
+
+    @instrumentar()
+    def leer_datos_sincronizados(self, hoja="Datos", forzar_completa=False):
+        """Como leer_datos, pero a partir del snapshot local puesto al día (ver sincronizacion.py)"""
         if not self.spreadsheet:
             raise ValueError("Primero debe conectar con un spreadsheet")
+        return sincronizar(self, hoja, forzar_completa=forzar_completa)
 
-        worksheet = self.spreadsheet.worksheet(hoja)
-        datos = worksheet.get_all_records()
-        df = pd.DataFrame(datos)
-        return df
+    @instrumentar()
+    def iniciar_escritura_diferida(self, hoja="Datos", **opciones):
+        """Activa el modo de escritura diferida para la hoja (ver cola_escritura.py).
 
-    def agregar_persona(self, datos, hoja="Datos"):
-        """Agrega una nueva persona al sheet"""
+        Desde ese momento agregar_persona y actualizar_persona encolan la
+        escritura y devuelven un Future en lugar de True/False.
+        """
         if not self.spreadsheet:
             raise ValueError("Primero debe conectar con un spreadsheet")
+        if self.cola_escritura is None:
+            self.cola_escritura = ColaEscritura(self, hoja, **opciones)
+        return self.cola_escritura
 
-        worksheet = self.spreadsheet.worksheet(hoja)
-
-        # Preparar fila
-        fila = [
-            datos.get('iglesia', ''),
-            datos.get('municipio', ''),
-            datos.get('cedula', ''),
-            datos.get('nombre', ''),
-            datos.get('celular', ''),
-            datos.get('contactado', 'NO'),
-            datos.get('fecha_contacto', ''),
-            datos.get('observaciones', ''),
-            datos.get('esta_en_infomira', 'NO'),
-            datos.get('referidos_activos', 0),
-            datos.get('referidos_inactivos', 0)
-        ]
+    @instrumentar()
+    def detener_escritura_diferida(self, vaciar=True):
+        """Desactiva la escritura diferida, enviando antes lo pendiente"""
+        if self.cola_escritura is not None:
+            self.cola_escritura.detener(vaciar=vaciar)
+            self.cola_escritura = None
+
+    def _diferir(self, hoja):
+        return self.cola_escritura is not None and self.cola_escritura.hoja == hoja
 
-        worksheet.append_row(fila)
+    @instrumentar()
+    def agregar_persona(self, datos, hoja="Datos"):
+        """Agrega una nueva persona al sheet"""
+        if self._diferir(hoja):
+            return self.cola_escritura.agregar(datos)
+
+        worksheet = self._hoja(hoja)
+        respuesta = worksheet.append_row(_preparar_fila(datos))
+
+        fila = _primera_fila_escrita(respuesta)
+        if fila:
+            self._registrar_fila(hoja, datos, fila)
         return True
 
+    @instrumentar()
+    def agregar_personas(self, personas, hoja="Datos", tamano_lote=TAMANO_LOTE_ESCRITURA):
+        """Agrega varias personas con una solicitud por lote.
+
+        Recibe una lista de dicts (mismas claves que agregar_persona) o un
+        DataFrame. Devuelve un resultado por persona, en el mismo orden:
+        {'indice', 'cedula', 'exito', 'fila', 'error'}.
+        """
+        worksheet = self._hoja(hoja)
+        registros = _como_registros(personas)
+        resultados = []
+
+        for inicio in range(0, len(registros), tamano_lote):
+            lote = registros[inicio:inicio + tamano_lote]
+            try:
+                respuesta = worksheet.append_rows([_preparar_fila(datos) for datos in lote])
+                primera_fila = _primera_fila_escrita(respuesta)
+                error = None
+            except Exception as e:
+                primera_fila = None
+                error = str(e)
+
+            for i, datos in enumerate(lote):
+                fila = primera_fila + i if primera_fila else None
+                if fila:
+                    self._registrar_fila(hoja, datos, fila)
+                resultados.append({
+                    'indice': inicio + i,
+                    'cedula': normalizar_cedula(datos.get('cedula', '')),
+                    'exito': error is None,
+                    'fila': fila,
+                    'error': error
+                })
+
+        return resultados
+
+    @instrumentar()
     def actualizar_persona(self, cedula, datos, hoja="Datos"):
         """Actualiza los datos de una persona existente"""
-        if not self.spreadsheet:
-            raise ValueError("Primero debe conectar con un spreadsheet")
+        if self._diferir(hoja):
+            return self.cola_escritura.actualizar(cedula, datos)
+
+        worksheet = self._hoja(hoja)
 
-        worksheet = self.spreadsheet.worksheet(hoja)
-
-        # Buscar la cédula
-        cell = worksheet.find(str(cedula))
-        if cell:
-            fila = cell.row
-            # Actualizar campos específicos
-            if 'contactado' in datos:
-                worksheet.update_cell(fila, 6, datos['contactado'])
-            if 'fecha_contacto' in datos:
-                worksheet.update_cell(fila, 7, datos['fecha_contacto'])
-            if 'observaciones' in datos:
-                worksheet.update_cell(fila, 8, datos['observaciones'])
-            if 'esta_en_infomira' in datos:
-                worksheet.update_cell(fila, 9, datos['esta_en_infomira'])
-            if 'referidos_activos' in datos:
-                worksheet.update_cell(fila, 10, datos['referidos_activos'])
-            if 'referidos_inactivos' in datos:
-                worksheet.update_cell(fila, 11, datos['referidos_inactivos'])
+        # Buscar la cédula en el índice (solo columna Cédula, sin ir a la API)
+        # y comprobar que siga en esa fila; si la hoja cambió, recargar una vez
+        indice = self._indice(hoja)
+        fila = indice.buscar(cedula)
+        if fila and not indice.verificar([cedula], [fila]):
+            fila = indice.buscar(cedula)
+        if fila:
+            # Actualizar campos específicos en una sola solicitud
+            rangos = _rangos_actualizacion(fila, datos)
+            if rangos:
+                worksheet.batch_update(rangos)
             return True
         return False
 
+    @instrumentar()
+    def actualizar_personas(self, actualizaciones, hoja="Datos", tamano_lote=TAMANO_LOTE_ESCRITURA):
+        """Actualiza varias personas con un batch_update por lote.
+
+        Cada elemento (dict o fila de DataFrame) lleva la 'cedula' y los campos
+        a modificar. Antes de escribir cada lote se verifica con una lectura
+        que las filas del índice sigan correspondiendo a sus cédulas. Devuelve
+        un resultado por elemento, en el mismo orden:
+        {'indice', 'cedula', 'exito', 'fila', 'error'}.
+        """
+        worksheet = self._hoja(hoja)
+        indice = self._indice(hoja)
+        registros = _como_registros(actualizaciones)
+
+        resultados = []
+        for inicio in range(0, len(registros), tamano_lote):
+            lote = registros[inicio:inicio + tamano_lote]
+            cedulas = [normalizar_cedula(datos.get('cedula', '')) for datos in lote]
+
+            # Ubicar las filas con el índice; si la hoja se reordenó, recargar una vez
+            filas = indice.buscar_varias(cedulas)
+            if not indice.verificar(cedulas, filas):
+                filas = indice.buscar_varias(cedulas)
+
+            rangos = []
+            resultados_lote = []
+            for i, (datos, cedula, fila) in enumerate(zip(lote, cedulas, filas)):
+                resultado = {'indice': inicio + i, 'cedula': cedula, 'exito': fila is not None, 'fila': fila, 'error': None}
+                if fila is None:
+                    resultado['error'] = "Cédula no encontrada"
+                else:
+                    rangos.extend(_rangos_actualizacion(fila, datos))
+                resultados_lote.append(resultado)
+
+            if rangos:
+                try:
+                    worksheet.batch_update(rangos)
+                except Exception as e:
+                    for resultado in resultados_lote:
+                        if resultado['exito']:
+                            resultado['exito'] = False
+                            resultado['error'] = str(e)
+
+            resultados.extend(resultados_lote)
+
+        return resultados
+
+    @instrumentar()
     def obtener_estadisticas(self):
         """Obtiene estadísticas generales y por iglesia"""
         df = self.leer_datos()
         return self.obtener_estadisticas_de_dataframe(df)
 
+    @instrumentar()
+    def obtener_estadisticas_por_bloques(self, hoja="Datos", chunk_size=TAMANO_BLOQUE_LECTURA, al_avanzar=None):
+        """Como obtener_estadisticas, pero sin tener la hoja entera en memoria.
+
+        Si se pasa al_avanzar, se llama después de cada bloque con el
+        resultado parcial (útil para mostrar el avance).
+        """
+        acumulador = AcumuladorEstadisticas()
+        for bloque in self.iter_datos(hoja, chunk_size):
+            acumulador.agregar(bloque)
+            if al_avanzar:
+                al_avanzar(acumulador.resultado())
+        return acumulador.resultado()
+
+    @instrumentar()
+    def materializar_resumen(self):
+        """Escribe estadísticas y cubo del dashboard en la hoja Resumen (ver resumen.py)"""
+        return resumen.materializar_resumen(self)
+
+    @instrumentar()
+    def leer_resumen(self):
+        """Lee el resumen materializado; None si la hoja Resumen no tiene uno"""
+        return resumen.leer_resumen(self)
+
+    @instrumentar()
     def obtener_estadisticas_de_dataframe(self, df):
         """Calcula estadísticas de cualquier dataframe (filtrado o completo)"""
-        if df.empty:
-            return None
-
-        # Asegurar que columnas numéricas sean realmente numéricas
-        df_copy = df.copy()
-        df_copy['Referidos Activos'] = pd.to_numeric(df_copy['Referidos Activos'], errors='coerce').fillna(0)
-        df_copy['Referidos Inactivos'] = pd.to_numeric(df_copy['Referidos Inactivos'], errors='coerce').fillna(0)
-
-        # Estadísticas generales
-        total_personas = len(df_copy)
-        total_contactados = len(df_copy[df_copy['Contactado'].str.upper() == 'SI'])
-        total_no_contactados = total_personas - total_contactados
-        total_en_infomira = len(df_copy[df_copy['¿Está en InfoMIRA?'].str.upper() == 'SI'])
-
-        # Estadísticas por iglesia
-        stats_por_iglesia = df_copy.groupby('Iglesia').agg({
-            'Cédula': 'count',
-            'Contactado': lambda x: (x.str.upper() == 'SI').sum(),
-            '¿Está en InfoMIRA?': lambda x: (x.str.upper() == 'SI').sum(),
-            'Referidos Activos': 'sum',
-            'Referidos Inactivos': 'sum'
-        }).reset_index()
-
-        stats_por_iglesia.columns = [
-            'Iglesia',
-            'Total Personas',
-            'Contactados',
-            'En InfoMIRA',
-            'Referidos Activos',
-            'Referidos Inactivos'
-        ]
-
-        stats_por_iglesia['No Contactados'] = stats_por_iglesia['Total Personas'] - stats_por_iglesia['Contactados']
-        stats_por_iglesia['Total Referidos'] = stats_por_iglesia['Referidos Activos'] + stats_por_iglesia['Referidos Inactivos']
-
-        return {
-            'general': {
-                'total_personas': total_personas,
-                'contactados': total_contactados,
-                'no_contactados': total_no_contactados,
-                'en_infomira': total_en_infomira,
-                'referidos_activos': int(df_copy['Referidos Activos'].sum()),
-                'referidos_inactivos': int(df_copy['Referidos Inactivos'].sum()),
-                'total_referidos': int(df_copy['Referidos Activos'].sum() + df_copy['Referidos Inactivos'].sum())
-            },
-            'por_iglesia': stats_por_iglesia
-        }
+        return calcular_estadisticas(df)
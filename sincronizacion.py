@@ -0,0 +1,229 @@
+"""
+Copia local de la hoja de Datos con sincronización incremental
+"""
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import ENCABEZADOS, SNAPSHOT_DIR, SNAPSHOT_RESINCRONIZACION_COMPLETA
+from esquema import construir_dataframe, concatenar, convertir_columna
+from instrumentacion import contar
+from lectura import leer_hoja, letra_columna as _letra
+
+# Las columnas desde "Contactado" hasta la última son las que se editan durante
+# la campaña y se releen en cada sincronización incremental. Las anteriores
+# (Iglesia, Municipio, Cédula, Nombre, Celular) identifican a la persona y solo
+# se releen en una sincronización completa, salvo Iglesia: un líder que cambia
+# de iglesia mueve los conteos por iglesia, así que también se relee siempre.
+# La completa ocurre cada SNAPSHOT_RESINCRONIZACION_COMPLETA o a pedido con
+# `python -m cli sincronizar --completa`; el botón Actualizar del dashboard
+# no la fuerza.
+PRIMERA_COLUMNA_EDITABLE = ENCABEZADOS['CONTACTADO']
+COLUMNA_IGLESIA = ENCABEZADOS['IGLESIA']
+
+
+def _texto(valor):
+    return str(valor).strip()
+
+
+class SnapshotLocal:
+    """Snapshot en disco de una hoja: datos en Parquet y metadatos en JSON"""
+
+    def __init__(self, spreadsheet_id, hoja="Datos", directorio=SNAPSHOT_DIR):
+        self.directorio = Path(directorio)
+        base = f"{spreadsheet_id}_{hoja}"
+        self.ruta_datos = self.directorio / f"{base}.parquet"
+        self.ruta_meta = self.directorio / f"{base}.json"
+
+    def cargar(self):
+        """Devuelve (df, metadatos) o (None, None) si no hay un snapshot válido"""
+        try:
+            with open(self.ruta_meta, encoding='utf-8') as f:
+                meta = json.load(f)
+            df = pd.read_parquet(self.ruta_datos)
+        except (OSError, ValueError):
+            return None, None
+
+        # Datos y metadatos se escriben por separado; si no coinciden se descarta
+        if len(df) != meta.get('registros'):
+            return None, None
+        return df, meta
+
+    def guardar(self, df, meta):
+        """Escribe el snapshot de forma atómica (archivo temporal + reemplazo)"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        self._reemplazar(self.ruta_datos, lambda f: df.to_parquet(f))
+        self._reemplazar(
+            self.ruta_meta,
+            lambda f: f.write(json.dumps(dict(meta, registros=len(df)), ensure_ascii=False).encode('utf-8'))
+        )
+
+    def _reemplazar(self, ruta, escribir):
+        escribir_atomico(ruta, escribir)
+
+    def adelantar_version(self, anterior, nueva):
+        """Marca el snapshot con la versión nueva si estaba en la anterior.
+
+        Sirve para que una escritura propia fuera de la hoja (el Resumen)
+        no obligue a releer Datos en la próxima sincronización.
+        """
+        try:
+            with open(self.ruta_meta, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta.get('version') != anterior:
+            return False
+        self._reemplazar(
+            self.ruta_meta,
+            lambda f: f.write(json.dumps(dict(meta, version=nueva), ensure_ascii=False).encode('utf-8'))
+        )
+        return True
+
+    def borrar(self):
+        """Elimina el snapshot; la próxima sincronización será completa"""
+        for ruta in (self.ruta_datos, self.ruta_meta):
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+
+def escribir_atomico(ruta, escribir):
+    """Escribe un archivo de forma atómica (temporal en el mismo directorio + reemplazo)"""
+    ruta = Path(ruta)
+    # Temporal con nombre único: dos procesos pueden escribir a la vez
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=ruta.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _descarga_incremental(worksheet, df, encabezados, ultima_fila):
+    """Trae solo lo necesario para poner al día el snapshot.
+
+    En una única solicitud batch_get lee la fila de encabezados, las columnas
+    Cédula e Iglesia y las columnas editables de las filas conocidas, y las filas
+    agregadas después de ultima_fila. Devuelve (df, última fila) o None
+    cuando la hoja cambió de forma (columnas nuevas, filas insertadas,
+    borradas o reordenadas) y hace falta una descarga completa.
+    """
+    nombre_cedula = ENCABEZADOS['CEDULA']
+    if ultima_fila < 2 or nombre_cedula not in encabezados or PRIMERA_COLUMNA_EDITABLE not in encabezados:
+        return None
+    if COLUMNA_IGLESIA not in encabezados:
+        return None
+
+    ancho = len(encabezados)
+    col_cedula = _letra(encabezados.index(nombre_cedula) + 1)
+    col_iglesia = _letra(encabezados.index(COLUMNA_IGLESIA) + 1)
+    primera_editable = encabezados.index(PRIMERA_COLUMNA_EDITABLE)
+    ultima_col = _letra(ancho)
+
+    encabezado, cedulas, iglesias, editables, nuevas = worksheet.batch_get([
+        '1:1',
+        f"{col_cedula}2:{col_cedula}{ultima_fila}",
+        f"{col_iglesia}2:{col_iglesia}{ultima_fila}",
+        f"{_letra(primera_editable + 1)}2:{ultima_col}{ultima_fila}",
+        f"A{ultima_fila + 1}:{ultima_col}"
+    ])
+
+    if [_texto(e) for e in (encabezado[0] if encabezado else [])] != encabezados:
+        return None
+
+    # Cada fila conocida debe conservar su cédula (y las filas vacías seguir vacías)
+    conocidas = ultima_fila - 1
+    posiciones = (df.index.to_numpy() - 2).tolist()
+    esperadas = [''] * conocidas
+    for posicion, cedula in zip(posiciones, df[nombre_cedula]):
+        esperadas[posicion] = _texto(cedula)
+    leidas = [_texto(fila[0]) if fila else '' for fila in cedulas]
+    leidas += [''] * (conocidas - len(leidas))
+    if leidas != esperadas:
+        return None
+
+    editables = list(editables) + [[]] * (conocidas - len(editables))
+    posiciones_conocidas = set(posiciones)
+    for posicion, fila in enumerate(editables):
+        if posicion not in posiciones_conocidas and any(_texto(v) for v in fila):
+            return None
+
+    # Reemplazar la iglesia y las columnas editables de las filas conocidas
+    df = df.copy()
+    iglesias = list(iglesias) + [[]] * (conocidas - len(iglesias))
+    df[COLUMNA_IGLESIA] = convertir_columna(COLUMNA_IGLESIA, [iglesias[p][0] if iglesias[p] else '' for p in posiciones])
+    for j, nombre in enumerate(encabezados[primera_editable:]):
+        if nombre not in df.columns:
+            continue
+        valores = [
+            editables[p][j] if j < len(editables[p]) else ''
+            for p in posiciones
+        ]
+        df[nombre] = convertir_columna(nombre, valores)
+
+    # Agregar las filas nuevas
+    if nuevas:
+        agregadas = construir_dataframe(encabezados, nuevas, fila_inicial=ultima_fila + 1)
+        df = concatenar([df, agregadas])
+        ultima_fila += len(nuevas)
+
+    return df, ultima_fila
+
+
+def sincronizar(manager, hoja="Datos", snapshot=None, forzar_completa=False):
+    """Pone al día el snapshot local de la hoja y devuelve sus datos.
+
+    Primero consulta a Drive la fecha de modificación del spreadsheet (una
+    llamada de metadatos). Si no cambió desde la última sincronización se
+    devuelve el snapshot sin leer valores. Si cambió, se intenta una
+    sincronización incremental y, si la hoja cambió de forma o pasó
+    SNAPSHOT_RESINCRONIZACION_COMPLETA desde la última, una completa.
+    """
+    snapshot = snapshot or SnapshotLocal(manager.spreadsheet.id, hoja)
+    df, meta = snapshot.cargar()
+
+    # La versión se toma antes de leer: un cambio durante la lectura se verá la próxima vez
+    version = manager.obtener_version_remota()
+    ahora = time.time()
+
+    if df is not None and not forzar_completa and meta.get('version') == version:
+        contar('snapshot.sin_cambios')
+        return df.reset_index(drop=True)
+
+    worksheet = manager._hoja(hoja)
+    resultado = None
+    completa_en = None
+    if df is not None and not forzar_completa:
+        completa_en = meta.get('sincronizacion_completa', 0)
+        if ahora - completa_en < SNAPSHOT_RESINCRONIZACION_COMPLETA:
+            resultado = _descarga_incremental(worksheet, df, meta['encabezados'], meta['ultima_fila'])
+
+    if resultado is None:
+        contar('snapshot.completa')
+        df, encabezados, ultima_fila = leer_hoja(worksheet)
+        completa_en = ahora
+    else:
+        contar('snapshot.incremental')
+        df, ultima_fila = resultado
+        encabezados = meta['encabezados']
+
+    snapshot.guardar(df, {
+        'version': version,
+        'encabezados': encabezados,
+        'ultima_fila': ultima_fila,
+        'sincronizacion_completa': completa_en,
+        'sincronizado': ahora
+    })
+    return df.reset_index(drop=True)
@@ -0,0 +1,45 @@
+"""
+Configuración de pytest: los módulos del proyecto están en la raíz del repositorio
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from benchmark import generar_valores
+from planificador import CubetaTokens, Planificador
+from sheets_falso import ClienteFalso
+from sheets_manager import SheetsManager
+
+SPREADSHEET_PRUEBA = 'prueba'
+
+
+@pytest.fixture
+def planificador():
+    # Sin cuota ni esperas reales: las pruebas miden el comportamiento, no el tiempo
+    return Planificador(
+        lecturas=CubetaTokens(tasa=1e9, capacidad=1e9),
+        escrituras=CubetaTokens(tasa=1e9, capacidad=1e9),
+        dormir=lambda segundos: None
+    )
+
+
+@pytest.fixture
+def cliente():
+    cliente = ClienteFalso()
+    cliente.crear_spreadsheet(SPREADSHEET_PRUEBA, 'Prueba').hoja('Datos').cargar_valores(generar_valores(60))
+    return cliente
+
+
+@pytest.fixture
+def hoja(cliente):
+    return cliente.open_by_key(SPREADSHEET_PRUEBA).hoja('Datos')
+
+
+@pytest.fixture
+def manager(cliente, planificador):
+    manager = SheetsManager(cliente=cliente, planificador=planificador)
+    manager.conectar_sheet(SPREADSHEET_PRUEBA)
+    return manager
@@ -0,0 +1,39 @@
+"""
+Cache compartida en disco
+"""
+import pandas as pd
+import pyarrow as pa
+
+from benchmark import generar_valores
+from cache_compartida import CacheCompartida
+from esquema import construir_dataframe
+from estadisticas import construir_cubo
+
+
+def _datos():
+    valores = generar_valores(500)
+    return construir_dataframe(valores[0], valores[1:], fila_inicial=2)
+
+
+def test_mapear_no_copia_al_heap(tmp_path):
+    df = _datos()
+    escritora = CacheCompartida('datos', directorio=tmp_path)
+    escritora.guardar(df)
+
+    antes = pa.total_allocated_bytes()
+    mapeado = CacheCompartida('datos', directorio=tmp_path).obtener(lambda: None)
+
+    # Las columnas siguen respaldadas por el archivo mapeado
+    assert pa.total_allocated_bytes() == antes
+    assert isinstance(mapeado['Cédula'].dtype, pd.ArrowDtype)
+    assert isinstance(mapeado['Iglesia'].dtype, pd.CategoricalDtype)
+    assert construir_cubo(mapeado) == construir_cubo(df)
+    assert mapeado['Cédula'].tolist() == df['Cédula'].tolist()
+
+
+def test_el_que_refresca_tambien_mapea(tmp_path):
+    cache = CacheCompartida('datos', directorio=tmp_path)
+    df = cache.obtener(_datos)
+
+    assert isinstance(df['Contactado'].dtype, pd.ArrowDtype)
+    assert cache.obtener(lambda: None) is df
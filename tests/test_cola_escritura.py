@@ -0,0 +1,106 @@
+"""
+Cola de escritura diferida: fusión, reintentos y recuperación del diario
+"""
+import os
+import time
+
+import pytest
+
+from cola_escritura import ColaEscritura
+from config import COLUMNAS
+
+
+@pytest.fixture
+def crear_cola(manager, tmp_path):
+    colas = []
+
+    def crear(**opciones):
+        # Sin vaciado automático: las pruebas llaman a vaciar() cuando corresponde
+        cola = ColaEscritura(manager, directorio_diario=tmp_path, intervalo=3600, max_items=10**6, **opciones)
+        colas.append(cola)
+        return cola
+
+    yield crear
+    for cola in colas:
+        cola.detener(vaciar=False)
+
+
+def _fila(hoja, cedula):
+    return next(f for f in hoja.valores() if f[COLUMNAS['CEDULA']] == cedula)
+
+
+def _cedula(hoja, fila):
+    return hoja.valores()[fila - 1][COLUMNAS['CEDULA']]
+
+
+def _diario(cola):
+    with open(cola.ruta_diario, encoding='utf-8') as f:
+        return f.readlines()
+
+
+def test_actualizaciones_de_la_misma_cedula_se_fusionan(crear_cola, cliente, hoja):
+    cola = crear_cola()
+    cedula = _cedula(hoja, 5)
+
+    primero = cola.actualizar(cedula, {'observaciones': 'primera'})
+    segundo = cola.actualizar(cedula, {'observaciones': 'segunda', 'referidos_activos': 7})
+    nuevo = cola.agregar({'cedula': '999', 'nombre': 'Nueva', 'iglesia': 'IGLESIA 01'})
+    cola.actualizar('999', {'observaciones': 'ya agregada'})
+    assert len(cola) == 2
+
+    cliente.reiniciar_contadores()
+    assert cola.vaciar() == 2
+
+    assert primero.result()['exito'] and segundo.result()['exito'] and nuevo.result()['exito']
+    assert _fila(hoja, cedula)[COLUMNAS['OBSERVACIONES']] == 'segunda'
+    assert str(_fila(hoja, cedula)[COLUMNAS['REFERIDOS_ACTIVOS']]) == '7'
+    assert _fila(hoja, '999')[COLUMNAS['OBSERVACIONES']] == 'ya agregada'
+    assert cliente.contador['append_rows'] == 1
+    assert _diario(cola) == []
+
+
+def test_vuelven_a_la_cola_si_la_cuota_se_agota(crear_cola, cliente, hoja, planificador):
+    cola = crear_cola()
+    cedula = _cedula(hoja, 3)
+    futuro = cola.actualizar(cedula, {'observaciones': 'tras el 429'})
+
+    cliente.fallar_proximas(planificador.reintentos + 5)
+    assert cola.vaciar() == 0
+    assert len(cola) == 1 and not futuro.done()
+    assert len(_diario(cola)) == 1
+
+    cliente.fallar_proximas(0)
+    assert cola.vaciar() == 1
+    assert futuro.result()['exito']
+    assert _fila(hoja, cedula)[COLUMNAS['OBSERVACIONES']] == 'tras el 429'
+
+
+def test_recupera_el_diario_de_un_proceso_que_termino(crear_cola, hoja):
+    caida = crear_cola()
+    caida.agregar({'cedula': '888', 'nombre': 'Pendiente', 'iglesia': 'IGLESIA 02'})
+    caida.actualizar(_cedula(hoja, 2), {'observaciones': 'pendiente'})
+    # Cierre inesperado: nada se envió y el diario dejó de tocarse hace rato
+    vencido = time.time() - 3600
+    os.utime(caida.ruta_diario, (vencido, vencido))
+
+    nueva = crear_cola()
+
+    assert len(nueva) == 2
+    assert not caida.ruta_diario.exists()
+    assert len(_diario(nueva)) == 2
+    nueva.vaciar()
+    assert _fila(hoja, '888')[COLUMNAS['NOMBRE']] == 'Pendiente'
+    assert _fila(hoja, _cedula(hoja, 2))[COLUMNAS['OBSERVACIONES']] == 'pendiente'
+
+
+def test_no_borra_el_diario_de_otro_proceso_activo(crear_cola, hoja):
+    una = crear_cola()
+    una.actualizar(_cedula(hoja, 2), {'observaciones': 'de la primera'})
+
+    otra = crear_cola()
+    otra.actualizar(_cedula(hoja, 3), {'observaciones': 'de la segunda'})
+    otra.vaciar()
+
+    assert len(una) == 1 and len(otra) == 0
+    assert len(_diario(una)) == 1
+    assert list(una.directorio_diario.glob('*.tmp')) == []
@@ -0,0 +1,65 @@
+"""
+Lectura de una sola iglesia con el directorio de filas
+"""
+import copy
+
+import pandas as pd
+
+from config import COLUMNAS
+
+
+def test_leer_datos_iglesia_coincide_con_la_lectura_completa(manager):
+    completo = manager.leer_datos()
+    iglesia = manager.directorio_iglesias().iglesias()[2]
+
+    df = manager.leer_datos_iglesia(iglesia)
+
+    esperado = completo[completo['Iglesia'] == iglesia].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, esperado, check_categorical=False)
+
+
+def test_ultimas_filas_sin_iglesia(manager, hoja):
+    # La API recorta la columna Iglesia antes que la de Referidos Activos
+    valores = hoja.valores()
+    for fila in valores[-3:]:
+        fila[COLUMNAS['IGLESIA']] = ''
+    hoja.cargar_valores(valores)
+
+    directorio = manager.directorio_iglesias()
+
+    assert sum(fin - inicio + 1 for iglesia in directorio.iglesias() for inicio, fin in directorio.tramos(iglesia)) == len(valores) - 4
+    assert directorio.promedio_lideres_cero() > 0
+
+
+def test_filas_agregadas_por_otro_proceso_tras_invalidar(manager, hoja):
+    directorio = manager.directorio_iglesias()
+    assert 'IGLESIA NUEVA' not in directorio.iglesias()
+
+    # Otro proceso agrega filas: el directorio vigente no las ve hasta invalidarlo
+    valores = hoja.valores()
+    nueva = list(valores[1])
+    nueva[COLUMNAS['IGLESIA']] = 'IGLESIA NUEVA'
+    nueva[COLUMNAS['CEDULA']] = '2000000'
+    hoja.cargar_valores(valores + [nueva])
+    assert 'IGLESIA NUEVA' not in directorio.iglesias()
+
+    directorio.invalidar()
+
+    assert 'IGLESIA NUEVA' in directorio.iglesias()
+    assert directorio.tramos('IGLESIA NUEVA') == [(len(valores) + 1, len(valores) + 1)]
+    assert manager.leer_datos_iglesia('IGLESIA NUEVA')['Cédula'].tolist() == ['2000000']
+
+
+def test_ordenar_usa_las_dimensiones_actuales(manager, hoja, cliente):
+    # El handle cacheado se abrió cuando la hoja tenía 10 filas
+    viejo = copy.copy(hoja)
+    viejo.row_count = 10
+    manager._worksheets['Datos'] = viejo
+    cliente.reiniciar_contadores()
+
+    manager.ordenar_por_iglesia()
+
+    iglesias = [fila[COLUMNAS['IGLESIA']] for fila in hoja.valores()[1:]]
+    assert iglesias == sorted(iglesias)
+    assert cliente.contador['worksheet'] == 1
+    assert manager._hoja('Datos').row_count == hoja.row_count
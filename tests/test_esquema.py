@@ -0,0 +1,27 @@
+"""
+Conversión de columnas y unión de DataFrames de varias fuentes
+"""
+import numpy as np
+import pandas as pd
+
+from benchmark import generar_valores
+from esquema import concatenar, dataframe_desde_valores, normalizar_dataframe
+from estadisticas import construir_cubo, TODAS
+
+
+def test_si_no_conserva_los_booleanos():
+    df = normalizar_dataframe(pd.DataFrame({'Contestaron': [True, False, np.nan, 'SI', ' si ', 'NO']}))
+    assert df['Contestaron'].tolist() == [True, False, False, True, True, False]
+
+
+def test_concatenar_fuentes_con_columnas_distintas():
+    # Una fuente trae "Contestaron" y "Respuesta"; la otra no
+    con = dataframe_desde_valores(generar_valores(100))
+    sin = dataframe_desde_valores([fila[:-2] for fila in generar_valores(50, semilla=2)])
+
+    union = concatenar([con, sin])
+
+    assert union['Contestaron'].dtype == bool
+    assert union['Contestaron'].sum() == con['Contestaron'].sum()
+    assert isinstance(union['Respuesta'].dtype, pd.CategoricalDtype)
+    assert construir_cubo(union)['por_iglesia'][TODAS]['contactados'] == con['Contestaron'].sum()
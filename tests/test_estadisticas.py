@@ -0,0 +1,110 @@
+"""
+calcular_estadisticas debe dar los mismos números que la implementación original
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from esquema import dataframe_desde_valores
+from estadisticas import AcumuladorEstadisticas, calcular_estadisticas
+
+
+def estadisticas_referencia(df):
+    """obtener_estadisticas_de_dataframe tal como estaba antes del motor vectorizado"""
+    if df.empty:
+        return None
+
+    df_copy = df.copy()
+    df_copy['Referidos Activos'] = pd.to_numeric(df_copy['Referidos Activos'], errors='coerce').fillna(0)
+    df_copy['Referidos Inactivos'] = pd.to_numeric(df_copy['Referidos Inactivos'], errors='coerce').fillna(0)
+
+    total_personas = len(df_copy)
+    total_contactados = len(df_copy[df_copy['Contactado'].str.upper() == 'SI'])
+    total_no_contactados = total_personas - total_contactados
+    total_en_infomira = len(df_copy[df_copy['¿Está en InfoMIRA?'].str.upper() == 'SI'])
+
+    stats_por_iglesia = df_copy.groupby('Iglesia').agg({
+        'Cédula': 'count',
+        'Contactado': lambda x: (x.str.upper() == 'SI').sum(),
+        '¿Está en InfoMIRA?': lambda x: (x.str.upper() == 'SI').sum(),
+        'Referidos Activos': 'sum',
+        'Referidos Inactivos': 'sum'
+    }).reset_index()
+
+    stats_por_iglesia.columns = [
+        'Iglesia',
+        'Total Personas',
+        'Contactados',
+        'En InfoMIRA',
+        'Referidos Activos',
+        'Referidos Inactivos'
+    ]
+
+    stats_por_iglesia['No Contactados'] = stats_por_iglesia['Total Personas'] - stats_por_iglesia['Contactados']
+    stats_por_iglesia['Total Referidos'] = stats_por_iglesia['Referidos Activos'] + stats_por_iglesia['Referidos Inactivos']
+
+    return {
+        'general': {
+            'total_personas': total_personas,
+            'contactados': total_contactados,
+            'no_contactados': total_no_contactados,
+            'en_infomira': total_en_infomira,
+            'referidos_activos': int(df_copy['Referidos Activos'].sum()),
+            'referidos_inactivos': int(df_copy['Referidos Inactivos'].sum()),
+            'total_referidos': int(df_copy['Referidos Activos'].sum() + df_copy['Referidos Inactivos'].sum())
+        },
+        'por_iglesia': stats_por_iglesia
+    }
+
+
+ENCABEZADOS = [
+    'Cédula', 'Nombre', 'Iglesia', 'Contactado', '¿Está en InfoMIRA?',
+    'Referidos Activos', 'Referidos Inactivos'
+]
+
+FILAS = [
+    ['101', 'Ana', 'SAN DIEGO', 'SI', 'si', '3', '1'],
+    ['102', 'Luis', 'SAN DIEGO', 'si', 'NO', '0', 'abc'],
+    ['103', 'Marta', 'SAN DIEGO', 'No', 'Si', '', '2'],
+    ['104', 'Pedro', 'BELLO', 'no', 'sI', '5', '0'],
+    ['105', 'Rosa', 'BELLO', 'Si', '', 'n/a', ' '],
+    ['106', 'Juan', None, 'SI', 'SI', '7', '4'],
+    ['107', 'Sara', 'ENVIGADO', '', 'no', '2.0', '1'],
+    ['108', 'Raúl', 'BELLO', 'NO', 'SI', '1', '-'],
+]
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(FILAS, columns=ENCABEZADOS)
+
+
+def _comparar(resultado, esperado):
+    assert resultado['general'] == esperado['general']
+    pd.testing.assert_frame_equal(
+        resultado['por_iglesia'].sort_values('Iglesia').reset_index(drop=True),
+        esperado['por_iglesia'].sort_values('Iglesia').reset_index(drop=True),
+        check_dtype=False
+    )
+
+
+def test_coincide_con_la_implementacion_original(df):
+    _comparar(calcular_estadisticas(df), estadisticas_referencia(df))
+
+
+def test_coincide_con_el_dataframe_normalizado():
+    # Como llega de la hoja: celdas vacías como '' y columnas ya convertidas
+    filas = [['' if v is None else v for v in fila] for fila in FILAS]
+    normalizado = dataframe_desde_valores([ENCABEZADOS] + filas)
+    _comparar(calcular_estadisticas(normalizado), estadisticas_referencia(pd.DataFrame(filas, columns=ENCABEZADOS)))
+
+
+def test_por_bloques_coincide(df):
+    acumulador = AcumuladorEstadisticas()
+    for bloque in np.array_split(np.arange(len(df)), 3):
+        acumulador.agregar(df.iloc[bloque])
+    _comparar(acumulador.resultado(), estadisticas_referencia(df))
+
+
+def test_dataframe_vacio():
+    assert calcular_estadisticas(pd.DataFrame(columns=ENCABEZADOS)) is None
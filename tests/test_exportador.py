@@ -0,0 +1,37 @@
+"""
+Exportación de un libro por iglesia
+"""
+import io
+import zipfile
+
+import pytest
+
+from benchmark import generar_valores
+from esquema import dataframe_desde_valores
+from estadisticas import calcular_estadisticas
+from exportador import exportar_zip, nombres_archivo
+
+
+def test_nombres_de_archivo_no_se_repiten():
+    nombres = nombres_archivo(['IGLESIA #1', 'IGLESIA 1', 'iglesia 1', 'BELLO'])
+    assert nombres == {
+        'IGLESIA #1': 'IGLESIA 1.xlsx',
+        'IGLESIA 1': 'IGLESIA 1 (2).xlsx',
+        'iglesia 1': 'iglesia 1 (3).xlsx',
+        'BELLO': 'BELLO.xlsx'
+    }
+
+
+@pytest.mark.parametrize('max_procesos', [1, 2])
+def test_zip_con_iglesias_de_nombre_parecido(max_procesos):
+    valores = generar_valores(200, iglesias=4)
+    for fila in valores[1:]:
+        fila[0] = {'IGLESIA 01': 'IGLESIA #1', 'IGLESIA 02': 'IGLESIA 1'}.get(fila[0], fila[0])
+    df = dataframe_desde_valores(valores)
+
+    destino = io.BytesIO()
+    cantidad = exportar_zip(df, calcular_estadisticas(df), destino, max_procesos=max_procesos)
+
+    nombres = zipfile.ZipFile(destino).namelist()
+    assert cantidad == 4
+    assert sorted(nombres) == ['IGLESIA 03.xlsx', 'IGLESIA 04.xlsx', 'IGLESIA 1 (2).xlsx', 'IGLESIA 1.xlsx']
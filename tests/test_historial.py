@@ -0,0 +1,89 @@
+"""
+Historial diario: registro, partición por mes y consultas
+"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from benchmark import generar_valores
+from esquema import construir_dataframe
+from historial import ALTA, BAJA, Historial
+from resumen import materializar_resumen
+from sincronizacion import SnapshotLocal
+
+
+@pytest.fixture
+def datos():
+    valores = generar_valores(200)
+    return construir_dataframe(valores[0], valores[1:], fila_inicial=2)
+
+
+@pytest.fixture
+def historial(tmp_path):
+    return Historial(tmp_path / 'historial')
+
+
+def _contactar(df, cedula):
+    df = df.copy()
+    df.loc[df['Cédula'] == cedula, 'Contactado'] = True
+    return df
+
+
+def test_mismo_dia_reemplaza_los_agregados(historial, datos):
+    historial.registrar(datos, fecha='2026-03-10')
+    sin_contactar = datos[~datos['Contactado']]['Cédula'].iloc[0]
+    resultado = historial.registrar(_contactar(datos, sin_contactar), fecha='2026-03-10')
+
+    tendencia = historial.tendencia()
+    assert list(tendencia.index) == [pd.Timestamp('2026-03-10')]
+    assert tendencia.loc['2026-03-10', 'contactados'] == datos['Contactado'].sum() + 1
+    # Los cambios del segundo registro del día se acumulan
+    assert resultado['cambios'] == 1
+    cambios = historial.cambios()
+    assert cambios[['cedula', 'campo', 'anterior', 'nuevo']].values.tolist() == [[sin_contactar, 'Contactado', 'NO', 'SI']]
+
+
+def test_particion_por_mes(historial, datos):
+    historial.registrar(datos, fecha='2026-01-31')
+    historial.registrar(datos.iloc[1:], fecha='2026-02-01')
+    # Volver a registrar el 31 solo reescribe enero
+    febrero = historial.directorio / 'agregados' / '2026-02.parquet'
+    antes = febrero.read_bytes()
+    historial.registrar(datos, fecha='2026-01-31')
+
+    assert sorted(r.name for r in (historial.directorio / 'agregados').iterdir()) == ['2026-01.parquet', '2026-02.parquet']
+    assert febrero.read_bytes() == antes
+    assert list(historial.tendencia().index) == [pd.Timestamp('2026-01-31'), pd.Timestamp('2026-02-01')]
+    assert list(historial.tendencia(desde='2026-02-01').index) == [pd.Timestamp('2026-02-01')]
+    assert historial.tendencia(hasta='2026-01-31')['lideres'].tolist() == [200]
+
+    # La baja del 1 de febrero y la alta al volver a registrar el 31
+    baja = historial.cambios(desde='2026-02-01', hasta='2026-02-28')
+    assert baja[['cedula', 'campo']].values.tolist() == [[datos['Cédula'].iloc[0], BAJA]]
+    alta = historial.cambios(hasta='2026-01-31', campo=ALTA)
+    assert alta['cedula'].tolist() == [datos['Cédula'].iloc[0]]
+    assert historial.cambios(cedula=datos['Cédula'].iloc[0])['campo'].tolist() == [ALTA, BAJA]
+
+
+def test_tendencia_de_una_iglesia(historial, datos):
+    historial.registrar(datos, fecha='2026-01-31')
+    historial.registrar(datos, fecha='2026-02-01')
+
+    iglesia = datos['Iglesia'].iloc[0]
+    tendencia = historial.tendencia(iglesia, ['lideres', 'contactados'])
+
+    de_la_iglesia = datos[datos['Iglesia'] == iglesia]
+    assert tendencia['lideres'].tolist() == [len(de_la_iglesia)] * 2
+    assert tendencia['contactados'].tolist() == [de_la_iglesia['Contactado'].sum()] * 2
+
+
+def test_el_resumen_registra_una_vez_por_dia(manager, historial, tmp_path):
+    snapshot = SnapshotLocal('prueba', directorio=tmp_path / 'snapshots')
+    materializar_resumen(manager, snapshot=snapshot, historial=historial)
+    registrado = historial.ruta_meta.read_text()
+    materializar_resumen(manager, snapshot=snapshot, historial=historial)
+
+    assert historial.ultimo_dia() == date.today().isoformat()
+    assert historial.ruta_meta.read_text() == registrado
+    assert historial.tendencia()['lideres'].tolist() == [60]
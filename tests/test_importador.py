@@ -0,0 +1,98 @@
+"""
+Importación de listados contra la hoja falsa
+"""
+import pytest
+from openpyxl import Workbook
+
+from config import COLUMNAS
+from importador import importar
+
+ENCABEZADOS_ARCHIVO = ['Documento', 'Nombres', 'Iglesia', 'Teléfono', 'Contactado', 'Observaciones']
+
+
+@pytest.fixture
+def crear_xlsx(tmp_path):
+    def crear(filas):
+        libro = Workbook()
+        hoja = libro.active
+        # Los listados suelen traer un título encima de los encabezados
+        hoja.append(['Listado de líderes - campaña'])
+        hoja.append([])
+        hoja.append(ENCABEZADOS_ARCHIVO)
+        for fila in filas:
+            hoja.append(fila)
+        ruta = tmp_path / 'listado.xlsx'
+        libro.save(ruta)
+        return ruta
+    return crear
+
+
+def _por_cedula(hoja):
+    return {fila[COLUMNAS['CEDULA']]: fila for fila in hoja.valores()[1:]}
+
+
+def test_actualiza_existentes_y_agrega_nuevas(manager, hoja, crear_xlsx):
+    ruta = crear_xlsx([
+        [1000000, 'Otro Nombre', 'OTRA IGLESIA', '3001112233', True, 'Llamado'],
+        [2000000, 'Nueva Persona', 'IGLESIA 01', '3009998877', 'no', ''],
+        [None, 'Sin cédula', 'IGLESIA 01', '', '', ''],
+    ])
+
+    resumen = importar(manager, ruta)
+
+    assert resumen['leidas'] == 3
+    assert (resumen['actualizadas'], resumen['agregadas'], resumen['omitidas'], resumen['errores']) == (1, 1, 1, 0)
+    filas = _por_cedula(hoja)
+    assert len(filas) == 61
+
+    existente = filas['1000000']
+    # Solo cambian los campos de seguimiento (CAMPOS_ACTUALIZABLES)
+    assert existente[COLUMNAS['CONTACTADO']] == 'SI'
+    assert existente[COLUMNAS['OBSERVACIONES']] == 'Llamado'
+    assert existente[COLUMNAS['NOMBRE']] == 'Persona 0'
+    assert existente[COLUMNAS['CELULAR']] == '3000000000'
+    assert existente[COLUMNAS['IGLESIA']] != 'OTRA IGLESIA'
+
+    nueva = filas['2000000']
+    assert nueva[COLUMNAS['NOMBRE']] == 'Nueva Persona'
+    assert nueva[COLUMNAS['IGLESIA']] == 'IGLESIA 01'
+    assert nueva[COLUMNAS['CONTACTADO']] == 'NO'
+
+
+def test_duplicadas_en_el_archivo_se_agregan_una_vez(manager, hoja, crear_xlsx):
+    ruta = crear_xlsx([
+        [2000000, 'Nueva Persona', 'IGLESIA 01', '', '', ''],
+        [' 2000000 ', None, None, '3009998877', 'SI', 'Segunda fila'],
+    ])
+
+    resumen = importar(manager, ruta)
+
+    assert (resumen['agregadas'], resumen['sin_cambios']) == (1, 1)
+    cedulas = [fila[COLUMNAS['CEDULA']] for fila in hoja.valores()[1:]]
+    assert cedulas.count('2000000') == 1
+    nueva = _por_cedula(hoja)['2000000']
+    # Los datos de las dos filas se combinan
+    assert nueva[COLUMNAS['NOMBRE']] == 'Nueva Persona'
+    assert nueva[COLUMNAS['OBSERVACIONES']] == 'Segunda fila'
+
+
+def test_varios_lotes(manager, hoja, cliente, crear_xlsx):
+    filas = [[2000000 + i, f'Nueva {i}', 'IGLESIA 01', '', '', ''] for i in range(5)]
+    filas += [[1000000 + i, '', '', '', 'SI', f'Lote {i}'] for i in range(3)]
+    # Una cédula agregada en un lote y repetida en otro se actualiza, no se duplica
+    filas.append([2000000, '', '', '', 'SI', 'Repetida en otro lote'])
+    ruta = crear_xlsx(filas)
+    avances = []
+    cliente.reiniciar_contadores()
+
+    resumen = importar(manager, ruta, tamano_lote=2, al_avanzar=lambda r: avances.append(dict(r)))
+
+    assert len(avances) == 5
+    assert [a['leidas'] for a in avances] == [2, 4, 6, 8, 9]
+    assert (resumen['agregadas'], resumen['actualizadas'], resumen['errores']) == (5, 4, 0)
+    assert cliente.contador['append_rows'] == 3
+    datos = _por_cedula(hoja)
+    assert len(datos) == 65
+    assert [fila[COLUMNAS['CEDULA']] for fila in hoja.valores()[1:]].count('2000000') == 1
+    assert datos['2000000'][COLUMNAS['OBSERVACIONES']] == 'Repetida en otro lote'
+    assert datos['1000002'][COLUMNAS['OBSERVACIONES']] == 'Lote 2'
@@ -0,0 +1,70 @@
+"""
+Índice cédula → fila y verificación antes de escribir
+"""
+from config import COLUMNAS
+from indice_cedulas import IndiceCedulas
+
+
+def _contar_rangos(hoja):
+    """Anota cuántos rangos lleva cada batch_get de la hoja"""
+    pedidos = []
+    original = hoja.batch_get
+
+    def batch_get(ranges, **kwargs):
+        pedidos.append(len(ranges))
+        return original(ranges, **kwargs)
+
+    hoja.batch_get = batch_get
+    return pedidos
+
+
+def _cedula(hoja, fila):
+    return hoja.valores()[fila - 1][COLUMNAS['CEDULA']]
+
+
+def test_verificar_muchas_filas_en_una_solicitud(hoja):
+    indice = IndiceCedulas(hoja)
+    filas = list(range(2, 62, 2)) * 5  # 150 filas salteadas (con repetidas)
+    cedulas = [_cedula(hoja, fila) for fila in filas]
+    pedidos = _contar_rangos(hoja)
+
+    assert indice.verificar(cedulas, filas)
+    assert len(pedidos) == 1 and pedidos[0] <= 100
+
+
+def test_verificar_detecta_una_fila_corrida(hoja):
+    indice = IndiceCedulas(hoja)
+    filas = list(range(2, 62))
+    cedulas = [_cedula(hoja, fila) for fila in filas]
+
+    valores = hoja.valores()
+    del valores[30]
+    hoja.cargar_valores(valores)
+
+    assert not indice.verificar(cedulas, filas)
+
+
+def test_actualizar_personas_lote_grande(manager, hoja):
+    cedulas = [fila[COLUMNAS['CEDULA']] for fila in hoja.valores()[1:]]
+    actualizaciones = [{'cedula': c, 'observaciones': f"obs {c}"} for c in cedulas[::-1] * 3]
+
+    resultados = manager.actualizar_personas(actualizaciones)
+
+    assert all(r['exito'] for r in resultados)
+    for fila in hoja.valores()[1:]:
+        assert fila[COLUMNAS['OBSERVACIONES']] == f"obs {fila[COLUMNAS['CEDULA']]}"
+
+
+def test_actualizar_persona_tras_borrar_una_fila(manager, hoja):
+    cedula = _cedula(hoja, 4)
+    manager._indice('Datos').buscar(cedula)
+
+    # Otro editor borra una fila de más arriba
+    valores = hoja.valores()
+    del valores[1]
+    hoja.cargar_valores(valores)
+
+    assert manager.actualizar_persona(cedula, {'observaciones': 'para ella'})
+    fila = next(f for f in hoja.valores() if f[COLUMNAS['CEDULA']] == cedula)
+    assert fila[COLUMNAS['OBSERVACIONES']] == 'para ella'
+    assert sum(f[COLUMNAS['OBSERVACIONES']] == 'para ella' for f in hoja.valores() if len(f) > COLUMNAS['OBSERVACIONES']) == 1
@@ -0,0 +1,93 @@
+"""
+Lectura por bloques contra la hoja falsa
+"""
+import pandas as pd
+import pytest
+
+from esquema import concatenar
+from lectura import iterar_hoja, leer_hoja, rangos_por_bloques
+
+FILAS = 60  # filas de datos de la hoja de prueba (61 con encabezados)
+
+
+def _lectura_de_referencia(hoja):
+    # Con un bloque más grande que la hoja se lee todo en un solo get_values
+    return leer_hoja(hoja, tamano_bloque=10**6)
+
+
+def _vaciar_filas(hoja, primera, ultima):
+    valores = hoja.valores()
+    for fila in range(primera, ultima + 1):
+        valores[fila - 1] = [''] * len(valores[fila - 1])
+    hoja.cargar_valores(valores)
+
+
+def test_rangos_por_bloques_deja_abierto_el_ultimo():
+    assert rangos_por_bloques(61, 13, 25) == [(2, 'A2:M26'), (27, 'A27:M51'), (52, 'A52:M')]
+    assert rangos_por_bloques(26, 13, 25) == [(2, 'A2:M')]
+
+
+@pytest.mark.parametrize('tamano_bloque', [7, 13, 59, 60])
+def test_bloques_que_no_dividen_las_filas(hoja, tamano_bloque):
+    esperado, encabezados_esperados, _ = _lectura_de_referencia(hoja)
+
+    df, encabezados, ultima_fila = leer_hoja(hoja, tamano_bloque=tamano_bloque, max_hilos=3)
+
+    assert encabezados == encabezados_esperados
+    assert ultima_fila == FILAS + 1
+    assert list(df.index) == list(range(2, FILAS + 2))
+    pd.testing.assert_frame_equal(df, esperado)
+
+
+def test_filas_vacias_intermedias(hoja):
+    # Un bloque entero vacío (filas 9 a 15) y filas sueltas dentro de otro
+    _vaciar_filas(hoja, 9, 15)
+    _vaciar_filas(hoja, 20, 21)
+    esperado, _, ultima_esperada = _lectura_de_referencia(hoja)
+
+    df, _, ultima_fila = leer_hoja(hoja, tamano_bloque=7)
+
+    assert ultima_fila == ultima_esperada == FILAS + 1
+    pd.testing.assert_frame_equal(df, esperado)
+    # Las filas vacías se descartan y las demás conservan su número de fila
+    vacias = set(range(9, 16)) | {20, 21}
+    assert list(df.index) == [f for f in range(2, FILAS + 2) if f not in vacias]
+    assert df.loc[22, 'Cédula'] == hoja.valores()[21][2]
+
+
+def test_bloques_finales_vacios(hoja, cliente):
+    # La hoja tiene muchas más filas que datos: los últimos bloques llegan vacíos
+    hoja.resize(rows=200)
+    _vaciar_filas(hoja, 55, FILAS + 1)
+    esperado, _, _ = _lectura_de_referencia(hoja)
+    cliente.reiniciar_contadores()
+
+    df, _, ultima_fila = leer_hoja(hoja, tamano_bloque=10)
+
+    assert ultima_fila == 54
+    assert cliente.contador['get_values'] == 1 + 20  # encabezados + bloques
+    pd.testing.assert_frame_equal(df, esperado)
+    assert df.index.max() == 54
+
+
+def test_hoja_sin_datos(hoja):
+    hoja.cargar_valores([hoja.valores()[0]])
+    hoja.resize(rows=50)
+
+    df, encabezados, ultima_fila = leer_hoja(hoja, tamano_bloque=10)
+
+    assert df.empty
+    assert ultima_fila == 1
+    assert len(encabezados) == len(hoja.valores()[0])
+
+
+def test_iterar_hoja_omite_bloques_vacios(hoja):
+    hoja.resize(rows=200)
+    _vaciar_filas(hoja, 9, 15)
+    esperado, _, _ = _lectura_de_referencia(hoja)
+
+    bloques = list(iterar_hoja(hoja, tamano_bloque=7))
+
+    assert [bloque.index[0] for bloque in bloques] == [2] + list(range(16, FILAS + 2, 7))
+    assert all(len(bloque) <= 7 for bloque in bloques)
+    pd.testing.assert_frame_equal(concatenar(bloques), esperado)
@@ -0,0 +1,98 @@
+"""
+Planificador: reintentos ante 429/5xx y coalescencia de lecturas
+"""
+import threading
+
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+from planificador import ObjetoPlanificado
+from sheets_falso import ClienteFalso, _error_api
+
+
+def _worksheet(cliente, planificador):
+    return ObjetoPlanificado(cliente, planificador).open_by_key('prueba').worksheet('Datos')
+
+
+def _fallar(cliente, errores):
+    """Hace que las próximas solicitudes del cliente fallen con estos errores, en orden"""
+    original = cliente._solicitud
+
+    def solicitud(metodo, celdas=0):
+        if errores:
+            cliente.contador[metodo] += 1
+            raise errores.pop(0)
+        original(metodo, celdas)
+
+    cliente._solicitud = solicitud
+
+
+def test_lectura_se_reintenta_ante_429(cliente, planificador):
+    worksheet = _worksheet(cliente, planificador)
+    cliente.reiniciar_contadores()
+    cliente.fallar_proximas(2)
+
+    valores = worksheet.get_values('A1:C3')
+
+    assert len(valores) == 3
+    assert cliente.contador['get_values'] == 3
+
+
+def test_se_rinde_despues_de_los_reintentos(cliente, planificador):
+    worksheet = _worksheet(cliente, planificador)
+    cliente.fallar_proximas(planificador.reintentos + 1)
+
+    with pytest.raises(APIError):
+        worksheet.get_values('A1:C3')
+
+
+def test_append_se_reintenta_ante_429(cliente, planificador, hoja):
+    worksheet = _worksheet(cliente, planificador)
+    filas = len(hoja.valores())
+    cliente.fallar_proximas(1)
+
+    worksheet.append_row(['IGLESIA 01', 'MEDELLIN', '999'])
+
+    assert len(hoja.valores()) == filas + 1
+
+
+@pytest.mark.parametrize('error', [
+    _error_api(503, "Backend Error"),
+    requests.exceptions.ReadTimeout("timeout"),
+])
+def test_append_no_se_reintenta_ante_5xx_ni_timeout(cliente, planificador, error):
+    # La fila pudo haberse agregado antes del error: repetir el append la duplicaría
+    worksheet = _worksheet(cliente, planificador)
+    cliente.reiniciar_contadores()
+    _fallar(cliente, [error])
+
+    with pytest.raises(type(error)):
+        worksheet.append_rows([['IGLESIA 01', 'MEDELLIN', '999']])
+    assert cliente.contador['append_rows'] == 1
+
+
+def test_update_se_reintenta_ante_5xx(cliente, planificador, hoja):
+    worksheet = _worksheet(cliente, planificador)
+    _fallar(cliente, [_error_api(503, "Backend Error")])
+
+    worksheet.update_cell(2, 1, 'IGLESIA NUEVA')
+
+    assert hoja.valores()[1][0] == 'IGLESIA NUEVA'
+
+
+def test_lecturas_simultaneas_se_coalescen(planificador):
+    cliente = ClienteFalso(latencia=0.2)
+    cliente.crear_spreadsheet('prueba').hoja('Datos').cargar_valores([['a', 'b'], ['1', '2']])
+    worksheet = _worksheet(cliente, planificador)
+    cliente.reiniciar_contadores()
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(worksheet.get_values('A1:B2'))) for _ in range(5)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == [[['a', 'b'], ['1', '2']]] * 5
+    assert cliente.contador['get_values'] == 1
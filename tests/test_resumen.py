@@ -0,0 +1,56 @@
+"""
+Vigencia del resumen materializado
+"""
+import pytest
+
+import resumen
+from config import COLUMNAS
+from resumen import leer_registro, leer_resumen, materializar_resumen, resumen_vigente
+from sincronizacion import SnapshotLocal, sincronizar
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    return SnapshotLocal('prueba', directorio=tmp_path)
+
+
+def test_resumen_vigente_tras_escribirlo(manager, cliente, snapshot):
+    materializar_resumen(manager, snapshot=snapshot)
+
+    # La escritura del Resumen cambió la versión de Drive, pero no Datos
+    assert resumen_vigente(manager, leer_resumen(manager), snapshot.directorio)
+    cliente.reiniciar_contadores()
+    sincronizar(manager, snapshot=snapshot)
+    assert cliente.contador['get_values'] == 0
+    assert cliente.contador['batch_get'] == 0
+
+
+def test_resumen_vencido_tras_editar(manager, hoja, snapshot):
+    materializar_resumen(manager, snapshot=snapshot)
+    hoja.update_cell(2, COLUMNAS['CONTACTADO'] + 1, 'No')
+
+    assert not resumen_vigente(manager, leer_resumen(manager), snapshot.directorio)
+
+
+def test_edicion_durante_el_calculo_no_se_da_por_vigente(manager, hoja, snapshot, monkeypatch):
+    calcular = manager.obtener_estadisticas_de_dataframe
+
+    def calcular_y_editar(df):
+        hoja.update_cell(2, COLUMNAS['IGLESIA'] + 1, 'IGLESIA NUEVA')
+        return calcular(df)
+
+    monkeypatch.setattr(manager, 'obtener_estadisticas_de_dataframe', calcular_y_editar)
+    materializar_resumen(manager, snapshot=snapshot)
+
+    assert leer_registro('prueba', snapshot.directorio)['escrita'] is None
+    assert not resumen_vigente(manager, leer_resumen(manager), snapshot.directorio)
+    # El snapshot conserva su versión y la próxima sincronización ve la edición
+    assert sincronizar(manager, snapshot=snapshot).loc[0, 'Iglesia'] == 'IGLESIA NUEVA'
+
+
+def test_sin_snapshot_tambien_registra(manager, snapshot, monkeypatch):
+    monkeypatch.setattr(resumen, 'USAR_SNAPSHOT_LOCAL', False)
+    materializar_resumen(manager, snapshot=snapshot)
+
+    assert resumen_vigente(manager, leer_resumen(manager), snapshot.directorio)
+    assert snapshot.cargar() == (None, None)
@@ -0,0 +1,46 @@
+"""
+Sincronización incremental del snapshot local
+"""
+import threading
+
+import pandas as pd
+
+from config import COLUMNAS
+from sincronizacion import SnapshotLocal, sincronizar
+
+
+def test_incremental_relee_la_iglesia(manager, cliente, hoja, tmp_path):
+    snapshot = SnapshotLocal('prueba', directorio=tmp_path)
+    sincronizar(manager, snapshot=snapshot)
+
+    # Otro editor cambia de iglesia a un líder
+    hoja.update_cell(2, COLUMNAS['IGLESIA'] + 1, 'IGLESIA NUEVA')
+    cliente.reiniciar_contadores()
+    df = sincronizar(manager, snapshot=snapshot)
+
+    assert cliente.contador['get_values'] == 0  # fue incremental
+    assert df.loc[0, 'Iglesia'] == 'IGLESIA NUEVA'
+    assert (df['Iglesia'] == 'IGLESIA NUEVA').sum() == 1
+
+
+def test_guardar_en_paralelo_no_choca(tmp_path):
+    snapshot = SnapshotLocal('prueba', directorio=tmp_path)
+    df = pd.DataFrame({'a': range(1000)})
+    errores = []
+
+    def guardar():
+        try:
+            for _ in range(20):
+                snapshot.guardar(df, {'version': 'x'})
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=guardar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert list(tmp_path.glob('*.tmp')) == []
+    assert len(snapshot.cargar()[0]) == 1000